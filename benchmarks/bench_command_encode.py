@@ -0,0 +1,119 @@
+"""命令编码性能对比：原十六进制字符串拼接 与 预计算前缀 + struct 打包
+
+用法: python benchmarks/bench_command_encode.py
+"""
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from homeassistant.components.climate.const import HVACMode  # noqa: E402
+from custom_components.savant_lighting.command_helper import (  # noqa: E402
+    ClimateCommand,
+    LightCommand,
+    SwitchCommand,
+)
+
+HOST = "192.168.1.10"
+
+
+class LegacyCommand:
+    """原 command_helper 的编码方式（每次拼接十六进制字符串再 bytes.fromhex）"""
+
+    def __init__(self, host, module_address, loop_address, gradient_time=2):
+        self.host_hex = f"AC{int(host.split('.')[-1]):02X}0010"
+        self.module_hex = f"{int(module_address):02X}"
+        self.loop_hex = f"{int(loop_address):02X}"
+        self.time_hex = f"{int(gradient_time):02X}"
+        self.host_bytes = bytes.fromhex(self.host_hex)
+        self.module_bytes = bytes.fromhex(self.module_hex)
+        self.loop_bytes = bytes.fromhex(self.loop_hex)
+
+    def light_turnonoff(self, command):
+        command_hex = f"{self.loop_hex}000401000001CA" if command == "on" else f"{self.loop_hex}000400000001CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def brightness(self, brightness_percentage):
+        brightness_hex = f"{int(brightness_percentage):02X}" if brightness_percentage is not None else "00"
+        command_hex = f"{self.loop_hex}0004{brightness_hex}{self.time_hex}FF10CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def dali01_color_temp(self, color_temp_kelvin_value):
+        loop_hex_original = f"{int(self.loop_hex, 16) + 1:02X}"
+        color_temp_hex = f"{int(color_temp_kelvin_value):02X}" if color_temp_kelvin_value is not None else "00"
+        command_hex = f"{loop_hex_original}0004{color_temp_hex}000000CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def dali02_color_temp(self, color_temp_kelvin_value):
+        color_temp_hex = f"{int(color_temp_kelvin_value):02X}" if color_temp_kelvin_value is not None else "00"
+        command_hex = f"{self.loop_hex}0004FF00{color_temp_hex}10CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def rgb_color(self, r=0, g=0, b=0):
+        loop_hex_original = f"{int(self.loop_hex, 16) + 2:02X}"
+        r, g, b = max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b))
+        command_hex = f"{loop_hex_original}0004{r:02X}{g:02X}{b:02X}13CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def switch_turnonoff(self, command):
+        command_hex = "000401000000CA" if command == "on" else "000400000000CA"
+        return self.host_bytes + self.module_bytes + self.loop_bytes + bytes.fromhex(command_hex)
+
+    def hvac_mode(self, command):
+        loop_hex_value = int(self.loop_hex, 16)
+        command_list = []
+        if command == HVACMode.OFF:
+            command_list.append(f"{loop_hex_value * 9 - 287:02X}000400002020CA")
+        elif command == HVACMode.COOL:
+            command_list.append(f"{loop_hex_value * 9 - 287:02X}000401000000CA")
+            command_list.append(f"{loop_hex_value * 9 - 286:02X}000405000000CA")
+        return [self.host_bytes + self.module_bytes + bytes.fromhex(cmd) for cmd in command_list]
+
+    def temperature(self, temperature):
+        temperature_hex = f"{int(float(temperature.split(':')[1])):02X}"
+        command_hex = f"{int(self.loop_hex, 16) * 9 - 284:02X}0004{temperature_hex}000000CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+    def fan_mode(self, command):
+        fan_speed_map = {"low": "04", "medium": "02", "high": "01", "auto": "00"}
+        command_hex = f"{int(self.loop_hex, 16) * 9 - 285:02X}0004{fan_speed_map[command]}000000CA"
+        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+
+
+def cases():
+    """(命令名, 原实现, 新实现)"""
+    legacy_light = LegacyCommand(HOST, 7, 3)
+    legacy_climate = LegacyCommand(HOST, 10, 33)
+    light = LightCommand(HOST, 7, 3, 2)
+    switch = SwitchCommand(HOST, 7, 3)
+    climate = ClimateCommand(HOST, 10, 33)
+    return [
+        ("light.turnonoff", lambda: legacy_light.light_turnonoff("on"), lambda: light.turnonoff("on")),
+        ("light.brightness", lambda: legacy_light.brightness(55), lambda: light.brightness(55)),
+        ("light.dali01_color_temp", lambda: legacy_light.dali01_color_temp("27"), lambda: light.dali01_color_temp("27")),
+        ("light.dali02_color_temp", lambda: legacy_light.dali02_color_temp("40"), lambda: light.dali02_color_temp("40")),
+        ("light.rgb_color", lambda: legacy_light.rgb_color(255, 128, 0), lambda: light.rgb_color(255, 128, 0)),
+        ("switch.turnonoff", lambda: legacy_light.switch_turnonoff("off"), lambda: switch.turnonoff("off")),
+        ("climate.hvac_mode", lambda: legacy_climate.hvac_mode(HVACMode.COOL), lambda: climate.hvac_mode(HVACMode.COOL)),
+        ("climate.temperature", lambda: legacy_climate.temperature("temp:26"), lambda: climate.temperature("temp:26")),
+        ("climate.fan_mode", lambda: legacy_climate.fan_mode("medium"), lambda: climate.fan_mode("medium")),
+    ]
+
+
+def run(func, number=200000, repeat=5):
+    return number / min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def main():
+    print(f"{'命令':<26}{'原实现 次/秒':>16}{'新实现 次/秒':>16}{'提升':>8}")
+    for name, legacy, current in cases():
+        assert legacy() == current(), name
+        before = run(legacy)
+        after = run(current)
+        print(f"{name:<26}{before:>16,.0f}{after:>16,.0f}{after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
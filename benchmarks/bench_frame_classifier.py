@@ -0,0 +1,109 @@
+"""单帧分类性能对比：原 elif 链 与 预计算分类表
+
+用法: python benchmarks/bench_frame_classifier.py [帧样本文件]
+"""
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from custom_components.savant_lighting.frame_classifier import classify_frame  # noqa: E402
+
+
+def load_corpus(path):
+    frames = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                frames.append(bytes.fromhex(line))
+    return frames
+
+
+def legacy_classify(response_str):
+    """原 _parse_response 的分类部分（不含实体查找）"""
+    hvac_off = [0x01, 0x0A, 0x13, 0x1C, 0x25, 0x2E, 0x37, 0x40, 0x49, 0x52, 0x5B, 0x64, 0x6D, 0x76, 0x7F, 0x88]
+    hvac_mode = [0x02, 0x0B, 0x14, 0x1D, 0x26, 0x2F, 0x38, 0x41, 0x4A, 0x53, 0x5C, 0x65, 0x6E, 0x77, 0x80, 0x89]
+    hvac_fan = [0x03, 0x0C, 0x15, 0x1E, 0x27, 0x30, 0x39, 0x42, 0x4B, 0x54, 0x5D, 0x66, 0x6F, 0x78, 0x81, 0x8A]
+    hvac_current_set_point = [0x04, 0x0D, 0x16, 0x1F, 0x28, 0x31, 0x3A, 0x43, 0x4C, 0x55, 0x5E, 0x67, 0x70, 0x79, 0x82, 0x8B]
+    floor_heat_mode = [0x05, 0x0E, 0x17, 0x20, 0x29, 0x32, 0x3B, 0x44, 0x4D, 0x56, 0x5F, 0x68, 0x71, 0x7A, 0x83, 0x8C]
+    floor_heat_temperature = [0x06, 0x0F, 0x18, 0x21, 0x2A, 0x33, 0x3C, 0x45, 0x4E, 0x57, 0x60, 0x69, 0x72, 0x7B, 0x84, 0x8D]
+    hvac_fan_mode = [0x07, 0x10, 0x19, 0x22, 0x2B, 0x34, 0x3D, 0x46, 0x4F, 0x58, 0x61, 0x6A, 0x73, 0x7C, 0x85, 0x8E]
+    hvac_fan_speed = [0x08, 0x11, 0x1A, 0x23, 0x2C, 0x35, 0x3E, 0x47, 0x50, 0x59, 0x62, 0x6B, 0x74, 0x7D, 0x86, 0x8F]
+    hvac_current_temperature = [0x09, 0x12, 0x1B, 0x24, 0x2D, 0x36, 0x3F, 0x48, 0x51, 0x5A, 0x63, 0x6C, 0x75, 0x7E, 0x87, 0x90]
+    shade_address = [0x14, 0x17, 0x1A, 0x1D, 0x20, 0x23, 0x26, 0x29, 0x2C, 0x2F, 0x32, 0x35, 0x38, 0x3B, 0x3E]
+    loop, data2, data3, data4 = response_str[5], response_str[9], response_str[10], response_str[11]
+    if data2 == 0x00 and data3 == 0x00 and data4 == 0x00:
+        return "switch", loop
+    elif data2 == 0x04 and data3 == 0x00 and data4 == 0x00 and loop in shade_address:
+        return "curtain", (loop - 17) // 3
+    elif loop == 0x00 and data3 == 0x00 and data4 == 0x00:
+        return "person_sensor", data2
+    elif loop == 0x00 and data4 == 0x00:
+        return "8button", data3
+    elif data2 == 0x00 and data3 == 0x00 and data4 == 0x11:
+        return "light", loop
+    elif data2 == 0x00 and data3 == 0x00 and data4 == 0x12:
+        return "light", loop - 1
+    elif data4 == 0x15:
+        return "light", loop
+    elif data4 == 0x13:
+        return "light", loop - 2
+    elif data2 == 0x00 and data3 == 0x00 and data4 == 0x10:
+        return "light", loop
+    elif data2 == 0x00 and data4 == 0x20 and loop in hvac_off:
+        return "climate", data3
+    elif data2 == 0x00 and data4 == 0x20 and loop in hvac_mode:
+        return "climate", data3
+    elif data2 == 0x00 and data4 == 0x20 and loop in hvac_fan:
+        return "climate", data3
+    elif data2 == 0x00 and data4 == 0x20 and loop in hvac_current_set_point:
+        return "climate", data3
+    elif data2 == 0x00 and data4 == 0x20 and loop in hvac_current_temperature:
+        return "climate", data3
+    elif data2 == 0x00 and data4 == 0x21 and loop in floor_heat_mode:
+        return "floor_heating", data3
+    elif data2 == 0x00 and data4 == 0x21 and loop in floor_heat_temperature:
+        return "floor_heating", data3
+    elif data2 == 0x00 and data4 == 0x22 and loop in hvac_fan_mode:
+        return "fresh_air", data3
+    elif data2 == 0x00 and data4 == 0x22 and loop in hvac_fan_speed:
+        return "fresh_air", data3
+    return "", loop
+
+
+def table_classify(response_str):
+    loop, data2, data3 = response_str[5], response_str[9], response_str[10]
+    rule = classify_frame(data2, data3, response_str[11], loop)
+    if rule is None:
+        return "", loop
+    return rule.device_type, rule.loop_transform(loop, data2, data3)[0]
+
+
+def run(func, frames, repeat=5):
+    def loop():
+        for frame in frames:
+            func(frame)
+    number = max(1, 200000 // len(frames))
+    best = min(timeit.repeat(loop, number=number, repeat=repeat))
+    return number * len(frames) / best
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(HERE, "frames_corpus.txt")
+    frames = load_corpus(path)
+    for frame in frames:
+        assert legacy_classify(frame) == table_classify(frame), frame.hex()
+
+    before = run(legacy_classify, frames)
+    after = run(table_classify, frames)
+    print(f"样本帧数: {len(frames)}")
+    print(f"elif 链:   {before:>12,.0f} 帧/秒")
+    print(f"分类表:    {after:>12,.0f} 帧/秒")
+    print(f"提升:      {after / before:>12.2f} 倍")
+
+
+if __name__ == "__main__":
+    main()
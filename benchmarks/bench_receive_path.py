@@ -0,0 +1,94 @@
+"""接收热路径的单帧开销：拼帧、解析、分发到实体 update_state
+
+模拟网关以 500 帧/秒推送状态帧（每 20 毫秒 10 帧），调试日志关闭（HA 默认级别），
+统计处理每帧消耗的 CPU 时间。实体的 print 输出重定向到 /dev/null，与 HA 以服务运行时相当。
+
+用法: python benchmarks/bench_receive_path.py [帧样本文件]
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from custom_components.savant_lighting.climate import SavantClimate  # noqa: E402
+from custom_components.savant_lighting.cover import SavantFreshCurtain  # noqa: E402
+from custom_components.savant_lighting.light import SavantLight  # noqa: E402
+from custom_components.savant_lighting.switch import SavantSwitch  # noqa: E402
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager  # noqa: E402
+from bench_frame_classifier import load_corpus  # noqa: E402
+
+HOST = "192.168.1.10"
+FRAMES_PER_SECOND = 500
+BURST = 10
+DURATION = 4
+
+
+def build_manager(frames):
+    """按样本中出现的地址创建实体并订阅，状态写入替换为空操作"""
+    manager = TCPConnectionManager(HOST, 8080)
+    for data in frames:
+        frame = manager._parse_response(data)
+        uid = frame.unique_id
+        if uid in manager._subscribers:
+            continue
+        args = (uid, frame.module_address, frame.loop_address)
+        if frame.device_type == "switch":
+            entity = SavantSwitch(*args, HOST, 8080, manager)
+        elif frame.device_type == "curtain":
+            entity = SavantFreshCurtain(*args, HOST, 8080, manager)
+        elif frame.device_type == "climate":
+            entity = SavantClimate(*args, HOST, 8080, manager)
+        elif frame.device_type == "light":
+            entity = SavantLight(*args, 2, HOST, 8080, frame.sub_device_type or "DALI-02", manager)
+        else:
+            manager.subscribe(uid, lambda frame: None)
+            continue
+        entity.async_write_ha_state = lambda: None
+        manager.subscribe(uid, entity.update_state)
+    return manager
+
+
+async def paced_feed(manager, stream):
+    """每 20 毫秒推送 10 帧，返回 (帧数, CPU 秒)"""
+    count = 0
+    cpu = 0.0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DURATION
+    index = 0
+    while loop.time() < deadline:
+        chunk = b"".join(stream[(index + i) % len(stream)] for i in range(BURST))
+        index += BURST
+        start = time.process_time()
+        for frame in manager._decoder.feed(chunk):
+            manager._handle_frame(frame)
+            count += 1
+        cpu += time.process_time() - start
+        await asyncio.sleep(BURST / FRAMES_PER_SECOND)
+    return count, cpu
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(HERE, "frames_corpus.txt")
+    stream = load_corpus(path)
+    logging.basicConfig(level=logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager = build_manager(stream)
+        count, cpu = asyncio.run(paced_feed(manager, stream))
+
+        data = b"".join(stream) * 50
+        start = time.perf_counter()
+        for frame in manager._decoder.feed(data):
+            manager._handle_frame(frame)
+        tight = (time.perf_counter() - start) / (len(stream) * 50)
+
+    print(f"500 帧/秒推送 {count} 帧: 每帧 CPU {cpu / count * 1e6:.1f} us，占用单核 {cpu / DURATION * 100:.2f}%")
+    print(f"连续处理: 每帧 {tight * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
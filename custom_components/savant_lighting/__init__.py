@@ -5,7 +5,10 @@ from .const import DOMAIN
 from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.entity_platform import async_get_platforms
 from homeassistant.const import Platform
-from .tcp_manager import TCPConnectionManager
+from .connection_pool import connection_options, pool
+from .device_catalog import DeviceCatalog
+from homeassistant.helpers.storage import Store
+from .state_store import STORAGE_VERSION, FrameStore, legacy_storage_key
 
 PLATFORMS = [Platform.LIGHT, Platform.SWITCH, Platform.CLIMATE, Platform.FAN, Platform.COVER, Platform.BINARY_SENSOR, Platform.SENSOR]
 tcp_manager = None
@@ -20,25 +23,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if DOMAIN not in hass.data:
         hass.data[DOMAIN] = {}
 
-    # 保存配置信息
-    tcp_manager = TCPConnectionManager(entry.data.get("host"), entry.data.get("port"))
+    # 保存配置信息，同一网关共用连接池中的连接，重新加载时复用在线的连接；
+    # 连接设置变化后连接池在全部配置条目释放时按新设置重建连接
+    options = connection_options(entry)
+    tcp_manager = await pool.acquire(entry.data.get("host"), entry.data.get("port"), options)
     tcp_manager.set_hass(hass)
 
+    # 上次保存的状态由各平台在创建实体前载入，实体加入时即可回放，不必等网关连接；
+    # 复用的连接沿用内存中的状态缓存
+    state_store = tcp_manager.state_store
+    if state_store is None:
+        state_store = FrameStore(hass, entry.data.get("host"), entry.data.get("port"), entry.entry_id)
+        tcp_manager.set_state_store(state_store)
+
     hass.data[DOMAIN][entry.entry_id] = {
         "host": entry.data.get("host"),
         "port": entry.data.get("port"),
         "tcp_manager": tcp_manager,
-        "devices": entry.data.get("devices", []),
+        "state_store": state_store,
+        "catalog": DeviceCatalog(entry.data.get("devices", [])),
+        "platforms": {},  # 平台 -> (create_entities, async_add_entities)，选项流程增删设备时使用
+        "entities": {},  # 设备键 -> 实体列表
+        "connection_options": options,
     }
+    tcp_manager.attach(entry)
+    entry.async_on_unload(entry.add_update_listener(async_entry_updated))
 
     @callback
     def handle_ha_started(event):
         hass.async_create_task(tcp_manager.connect(entry))
 
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, handle_ha_started)
+    if hass.is_running:
+        # 重新加载时 HA 已启动，不会再收到启动事件
+        hass.async_create_task(tcp_manager.connect(entry))
+    else:
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, handle_ha_started)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
+async def async_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """连接设置变化时重新加载配置条目；选项流程增删设备只改 entry.data，不重新加载"""
+    config = hass.data[DOMAIN].get(entry.entry_id)
+    if config is not None and config["connection_options"] != connection_options(entry):
+        await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_update_config_entry(hass: HomeAssistant, entry_id: str, new_data: dict) -> None:
     """Update the config entry data in the Home Assistant database."""
     entry = hass.config_entries.async_get_entry(entry_id)
@@ -53,7 +81,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     if unload_ok:
         # Clean up the integration data
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await pool.release(entry_data["tcp_manager"], entry.entry_id)
+        await entry_data["state_store"].async_flush()
 
         # Clean up the device registry data
         device_registry = dr.async_get(hass)
@@ -68,4 +98,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         for entity_entry in entity_entries:
             entity_registry.async_remove(entity_entry.entity_id)
 
-    return unload_ok
\ No newline at end of file
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """删除配置条目：删除它的旧版状态缓存，同一网关没有其他配置条目时删除网关的状态缓存"""
+    await Store(hass, STORAGE_VERSION, legacy_storage_key(entry.entry_id)).async_remove()
+    host, port = entry.data.get("host"), entry.data.get("port")
+    for other in hass.config_entries.async_entries(DOMAIN):
+        if other.entry_id != entry.entry_id and (other.data.get("host"), other.data.get("port")) == (host, port):
+            return
+    # 保持中的连接可能还持有缓存，先解除，避免删除后又被延迟写盘重新写出
+    manager = pool.get(host, port)
+    state_store = manager.state_store if manager is not None else None
+    if manager is not None:
+        manager.set_state_store(None)
+    await (state_store or FrameStore(hass, host, port)).async_remove()
@@ -7,6 +7,8 @@ from homeassistant.const import STATE_ON, STATE_OFF
 from datetime import timedelta
 
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
 from .send_command import *
 
 _LOGGER = logging.getLogger(__name__)
@@ -14,24 +16,25 @@ SCAN_INTERVAL = timedelta(seconds=60)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Fresh Air entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
-    
-    person_sensors = [
+    await async_setup_platform(hass, entry, "binary_sensor", create_entities, async_add_entities)
+
+def create_entities(device, tcp_manager):
+    """按设备配置创建人体感应实体，选项流程增加设备时也调用"""
+    if device["type"] != "person_sensor":
+        return []
+    return [
         SavantPersonSensor(
             name=device["name"],
             module_address=device["module_address"],
             loop_address=device["loop_address"],
             host=device["host"],
             port=device["port"],
-            tcp_manager=config["tcp_manager"]
+            tcp_manager=tcp_manager
         )
-        for device in devices if device["type"] == "person_sensor"
     ]
-    async_add_entities(person_sensors, update_before_add=True)
 
 
-class SavantPersonSensor(BinarySensorEntity):
+class SavantPersonSensor(StateWriteMixin, BinarySensorEntity):
     """Representation of a human presence sensor."""
 
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
@@ -43,7 +46,10 @@ class SavantPersonSensor(BinarySensorEntity):
         self._port = port
         self._state = STATE_OFF  # 初始状态为“没有人”
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("person_sensor", self.update_state)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
 
     @property
     def unique_id(self):
@@ -81,15 +87,14 @@ class SavantPersonSensor(BinarySensorEntity):
         response = {"state": STATE_OFF}  # 假设返回有人
         return response
 
-    def update_state(self, response_dict):
+    def update_state(self, frame):
         """Update the state of the sensor based on the response."""
-        print('感应收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict["data1"] == 0x01:  
-            device._state = STATE_ON
-        elif response_dict["data1"] == 0x02:  
-            device._state = STATE_OFF 
+        _LOGGER.debug("感应收到状态响应: %s", frame)
+        if frame.data1 == 0x01:  
+            self._state = STATE_ON
+        elif frame.data1 == 0x02:  
+            self._state = STATE_OFF 
 
         # _LOGGER.debug(f"Human Presence Sensor received state response: {response_dict}")
         # self._state = response_dict.get("state", STATE_OFF)
-        device.async_write_ha_state()
\ No newline at end of file
+        self.async_write_ha_state_if_changed()
\ No newline at end of file
@@ -12,6 +12,9 @@ from homeassistant.core import HomeAssistant
 from .floor_heating import SavantFloorHeating
 from .fresh_air import SavantFreshAirAC
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
+from .frame_record import HvacType
 from .command_helper import ClimateCommand
 from .send_command import *
 
@@ -23,38 +26,32 @@ SUPPORTED_FAN_MODES = [FAN_LOW, FAN_MEDIUM, FAN_HIGH, FAN_AUTO]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Climate entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
-    
-    climates = [
-        SavantClimate(
+    await async_setup_platform(hass, entry, "climate", create_entities, async_add_entities)
+
+def create_entities(device, tcp_manager):
+    """按设备配置创建空调、地暖实体，选项流程增加设备时也调用"""
+    if device["type"] == "climate":
+        entity_class = SavantClimate
+    elif device["type"] == "floor_heating":
+        entity_class = SavantFloorHeating
+    else:
+        return []
+    return [
+        entity_class(
             name=device["name"],
             module_address=device["module_address"],
             loop_address=device["loop_address"],
             host=device["host"],
             port=device["port"],
-            tcp_manager=config["tcp_manager"]
+            tcp_manager=tcp_manager
         )
-        for device in devices if device["type"] == "climate"
     ]
-    
-    floor_heatings = [
-        SavantFloorHeating(
-            name=device["name"],
-            module_address=device["module_address"],
-            loop_address=device["loop_address"],
-            host=device["host"],
-            port=device["port"],
-            tcp_manager=config["tcp_manager"]
-        )
-        for device in devices if device["type"] == "floor_heating"
-    ]
-    
-    async_add_entities(climates + floor_heatings, update_before_add=True)
 
-class SavantClimate(ClimateEntity):
+class SavantClimate(StateWriteMixin, ClimateEntity):
     """Representation of a Savant Climate (AC)."""
 
+    _written_fields = ("_state", "_target_temperature", "_current_temperature", "_fan_mode")
+
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
         """Initialize the climate entity."""
         self._attr_name = name
@@ -67,13 +64,13 @@ class SavantClimate(ClimateEntity):
         self._target_temperature = 24.0
         self._fan_mode = "auto"
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("climate", self.update_state)
         self.command = ClimateCommand(host,module_address,loop_address)
         
     async def async_added_to_hass(self):
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
         self.hass.async_create_task(self.async_update())
         self.async_write_ha_state()
-        
+
     @property
     def unique_id(self):
         """Return a unique ID for this climate entity."""
@@ -147,17 +144,14 @@ class SavantClimate(ClimateEntity):
         if hvac_mode in SUPPORTED_HVAC_MODES:
             self._state = hvac_mode
             command = self.command.hvac_mode(hvac_mode)
-            for cmd in command:
-                await self.tcp_manager.send_command(cmd)
-                await asyncio.sleep(0.5)
+            await self.tcp_manager.send_command_list(command, context=self._context)
             self.async_write_ha_state()
 
     async def async_set_fan_mode(self, fan_mode):
         if fan_mode in SUPPORTED_FAN_MODES:
             self._fan_mode = fan_mode
             command = self.command.fan_mode(fan_mode)
-            await self.tcp_manager.send_command(command)
-            await asyncio.sleep(0.5)
+            await self.tcp_manager.send_command(command, context=self._context)
             self.async_write_ha_state()
 
     async def async_set_temperature(self, **kwargs):
@@ -165,8 +159,7 @@ class SavantClimate(ClimateEntity):
         if temperature is not None:
             self._target_temperature = temperature
             command = self.command.temperature(f"temp:{temperature}")
-            await self.tcp_manager.send_command(command)
-            await asyncio.sleep(0.5)
+            await self.tcp_manager.send_command(command, context=self._context)
             self.async_write_ha_state()
 
     async def async_update(self):
@@ -187,32 +180,31 @@ class SavantClimate(ClimateEntity):
     #     response, is_online = await self.tcp_manager.send_command(hex_command)
     #     return response
 
-    def update_state(self, response_dict):
-        print('空调收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict['hvac_type'] == "hvac_01":
-            if response_dict["data1"] == 0x00:
-                device._state = HVACMode.OFF
-        elif response_dict['hvac_type'] == "hvac_02":
-            if response_dict["data1"] == 0x01:
-                device._state = HVACMode.COOL
-            elif response_dict["data1"] == 0x08:
-                device._state = HVACMode.HEAT
-            elif response_dict["data1"] == 0x04:
-                device._state = HVACMode.AUTO
-            elif response_dict["data1"] == 0X02:
-                device._state = HVACMode.DRY
-        elif response_dict['hvac_type'] == "hvac_04":
-            device._target_temperature = response_dict["data1"]
-        elif response_dict['hvac_type'] == "hvac_09":
-            device._current_temperature = response_dict["data1"]
-        elif response_dict['hvac_type'] == "hvac_03":
-            if response_dict["data1"] == 0x04:
-                device._fan_mode = FAN_LOW
-            elif response_dict["data1"] == 0x02:
-                device._fan_mode = FAN_MEDIUM
-            elif response_dict["data1"] == 0x01:
-                device._fan_mode = FAN_HIGH
-            elif response_dict["data1"] == 0x00:
-                device._fan_mode = FAN_AUTO
-        device.async_write_ha_state()
+    def update_state(self, frame):
+        _LOGGER.debug("空调收到状态响应: %s", frame)
+        if frame.hvac_type == HvacType.OFF:
+            if frame.data1 == 0x00:
+                self._state = HVACMode.OFF
+        elif frame.hvac_type == HvacType.MODE:
+            if frame.data1 == 0x01:
+                self._state = HVACMode.COOL
+            elif frame.data1 == 0x08:
+                self._state = HVACMode.HEAT
+            elif frame.data1 == 0x04:
+                self._state = HVACMode.AUTO
+            elif frame.data1 == 0X02:
+                self._state = HVACMode.DRY
+        elif frame.hvac_type == HvacType.SET_POINT:
+            self._target_temperature = frame.data1
+        elif frame.hvac_type == HvacType.CURRENT_TEMP:
+            self._current_temperature = frame.data1
+        elif frame.hvac_type == HvacType.FAN:
+            if frame.data1 == 0x04:
+                self._fan_mode = FAN_LOW
+            elif frame.data1 == 0x02:
+                self._fan_mode = FAN_MEDIUM
+            elif frame.data1 == 0x01:
+                self._fan_mode = FAN_HIGH
+            elif frame.data1 == 0x00:
+                self._fan_mode = FAN_AUTO
+        self.async_write_ha_state_if_changed()
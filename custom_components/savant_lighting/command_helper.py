@@ -1,16 +1,44 @@
+import struct
+
 from homeassistant.components.climate.const import HVACMode
 
+# 控制帧：AC host 00 10 模块 回路 00 04 d1 d2 d3 d4 CA
+# 每个命令对象在初始化时预先算好前 8 个字节（到 00 04 为止），
+# 发送时只把 d1~d4 打包到前缀后面，不再拼接十六进制字符串再 bytes.fromhex。
+_CONTROL = struct.Struct("8s4BB")
+_TAIL = 0xCA
+
+
+def _host_bytes(host):
+    """AC + 网关 IP 末段 + 00 10"""
+    return bytes((0xAC, int(host.split('.')[-1]), 0x00, 0x10))
+
+
+def _prefix(host_bytes, module, loop):
+    """控制帧的固定前缀，回路地址越界时返回 None，发送时才报错"""
+    if not 0 <= loop <= 0xFF:
+        return None
+    return host_bytes + bytes((module, loop, 0x00, 0x04))
+
+
+def _level(value):
+    return int(value) if value is not None else 0
+
 
 class LightCommand:
     def __init__(self, host, module_address, loop_address, gradient_time):
-        self.host_hex = f"AC{int(host.split('.')[-1]):02X}0010"
-        self.module_hex = f"{int(module_address):02X}"
-        self.loop_hex = f"{int(loop_address):02X}"
-        self.time_hex = f"{int(gradient_time):02X}"
-
-        self.host_bytes = bytes.fromhex(self.host_hex)
-        self.module_bytes = bytes.fromhex(self.module_hex)
-        self.loop_bytes = bytes.fromhex(self.loop_hex)
+        self.host_bytes = _host_bytes(host)
+        self.module_bytes = bytes((int(module_address),))
+        self.loop_bytes = bytes((int(loop_address),))
+        self.time = int(gradient_time)
+
+        module = int(module_address)
+        loop = int(loop_address)
+        self._prefix = _prefix(self.host_bytes, module, loop)
+        # DALI-01 / RGB 的色温在下一个回路，RGB 颜色在下两个回路
+        self._prefix_1 = _prefix(self.host_bytes, module, loop + 1)
+        self._prefix_2 = _prefix(self.host_bytes, module, loop + 2)
+        self._query_prefix = self.host_bytes + b"\xB0" + self.module_bytes
 
     # def query_state(self):
     #     command_bytes = bytes.fromhex('01000108CA')
@@ -18,233 +46,119 @@ class LightCommand:
     #     return command
 
     def turnonoff(self, command):
-        command_hex = ""
-        if command == "on":
-            command_hex = f"{self.loop_hex}000401000001CA"  # 状态开启
-        elif command == "off":
-            command_hex = f"{self.loop_hex}000400000001CA"  # 状态关闭
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        # 状态开启 / 状态关闭
+        return _CONTROL.pack(self._prefix, 0x01 if command == "on" else 0x00, 0x00, 0x00, 0x01, _TAIL)
 
     def brightness(self, brightness_percentage):
-        brightness_hex = (
-            f"{int(brightness_percentage):02X}"
-            if brightness_percentage is not None
-            else "00"
-        )
-        command_hex = f"{self.loop_hex}0004{brightness_hex}{self.time_hex}FF10CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix, _level(brightness_percentage), self.time, 0xFF, 0x10, _TAIL)
 
     def dali01_brightness(self, brightness_percentage):
-        brightness_hex = (
-            f"{int(brightness_percentage):02X}"
-            if brightness_percentage is not None
-            else "00"
-        )
-        command_hex = f"{self.loop_hex}0004{brightness_hex}{self.time_hex}0010CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix, _level(brightness_percentage), self.time, 0x00, 0x10, _TAIL)
 
     def dali01_color_temp(self, color_temp_kelvin_value):
-        loop_hex_value = int(self.loop_hex, 16)
-        loop_hex_value += 1
-        loop_hex_original = f"{loop_hex_value:02X}"
-        color_temp_hex = (
-            f"{int(color_temp_kelvin_value):02X}"
-            if color_temp_kelvin_value is not None
-            else "00"
-        )
-        command_hex = f"{loop_hex_original}0004{color_temp_hex}000000CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix_1, _level(color_temp_kelvin_value), 0x00, 0x00, 0x00, _TAIL)
 
     def dali02_brightness(self, brightness_percentage):
-        brightness_hex = (
-            f"{int(brightness_percentage):02X}"
-            if brightness_percentage is not None
-            else "00"
-        )
-        command_hex = f"{self.loop_hex}0004{brightness_hex}{self.time_hex}FF10CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix, _level(brightness_percentage), self.time, 0xFF, 0x10, _TAIL)
 
     def dali02_color_temp(self, color_temp_kelvin_value):
-        color_temp_hex = (
-            f"{int(color_temp_kelvin_value):02X}"
-            if color_temp_kelvin_value is not None
-            else "00"
-        )
-        command_hex = f"{self.loop_hex}0004FF00{color_temp_hex}10CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix, 0xFF, 0x00, _level(color_temp_kelvin_value), 0x10, _TAIL)
 
     def rgb_color_temp(self, color_temp_kelvin_value):
-        loop_hex_value = int(self.loop_hex, 16)
-        loop_hex_value += 1
-        loop_hex_original = f"{loop_hex_value:02X}"
-        color_temp_hex = (
-            f"{int(color_temp_kelvin_value):02X}"
-            if color_temp_kelvin_value is not None
-            else "00"
-        )
-        command_hex = f"{loop_hex_original}0004{color_temp_hex}000012CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix_1, _level(color_temp_kelvin_value), 0x00, 0x00, 0x12, _TAIL)
 
     def rgb_color(self, r=0, g=0, b=0):
-        loop_hex_value = int(self.loop_hex, 16)
-        loop_hex_value += 2
-        loop_hex_original = f"{loop_hex_value:02X}"
         r = max(0, min(255, r))
         g = max(0, min(255, g))
         b = max(0, min(255, b))
-        command_hex = f"{loop_hex_original}0004{r:02X}{g:02X}{b:02X}13CA"
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return _CONTROL.pack(self._prefix_2, r, g, b, 0x13, _TAIL)
 
     def query_0603d_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("01000106CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x01\x00\x01\x06\xCA"
 
     def query_dali01_01_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("01000120CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x01\x00\x01\x20\xCA"
 
     def query_dali01_02_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("21000120CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x21\x00\x01\x20\xCA"
 
     def query_dali02_01_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("01000110CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x01\x00\x01\x10\xCA"
 
     def query_dali02_02_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("11000120CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x11\x00\x01\x20\xCA"
 
     def query_dali02_03_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("21000120CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x21\x00\x01\x20\xCA"
 
     def query_dali02_04_state(self):
-        command_01_bytes = bytes.fromhex("B0")
-        command_bytes = bytes.fromhex("31000120CA")
-        command = self.host_bytes + command_01_bytes + self.module_bytes + command_bytes
-        return command
+        return self._query_prefix + b"\x31\x00\x01\x20\xCA"
 
 
 class SwitchCommand:
     def __init__(self, host, module_address, loop_address):
-        self.host_hex = f"AC{int(host.split('.')[-1]):02X}0010"
-        self.module_hex = f"{int(module_address):02X}"
-        self.loop_hex = f"{int(loop_address):02X}"
-        self.host_bytes = bytes.fromhex(self.host_hex)
-        self.module_bytes = bytes.fromhex(self.module_hex)
-        self.loop_bytes = bytes.fromhex(self.loop_hex)
+        self.host_bytes = _host_bytes(host)
+        self.module_bytes = bytes((int(module_address),))
+        self.loop_bytes = bytes((int(loop_address),))
+        self._prefix = _prefix(self.host_bytes, int(module_address), int(loop_address))
+        self._on = _CONTROL.pack(self._prefix, 0x01, 0x00, 0x00, 0x00, _TAIL)
+        self._off = _CONTROL.pack(self._prefix, 0x00, 0x00, 0x00, 0x00, _TAIL)
 
     def turnonoff(self, command):
-        command_hex = ""
-        if command == "on":
-            command_hex = "000401000000CA"  # 状态开启
-        elif command == "off":
-            command_hex = "000400000000CA"  # 状态关闭
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.module_bytes + self.loop_bytes + command_bytes
-        return command
+        # 状态开启 / 状态关闭，两帧都是固定的，初始化时已生成
+        return self._on if command == "on" else self._off
 
     # 在HA添加了模块地址回路  再下发此模块查询
     def query_state(self):
-        command_bytes = bytes.fromhex("01000108CA")
-        command = self.host_bytes + self.module_bytes + command_bytes
-        return command
+        return self.host_bytes + self.module_bytes + b"\x01\x00\x01\x08\xCA"
 
 
 class ClimateCommand:
+    # 每个内机占 9 个地址，偏移量与原来的 回路 * 9 - 287 等计算一致
+    _OFF, _MODE, _FAN, _TEMP, _FLOOR_MODE, _FLOOR_TEMP = range(6)
+    _FAN_SPEED = {"low": 0x04, "medium": 0x02, "high": 0x01, "auto": 0x00}
+    _HVAC_MODE = {
+        HVACMode.COOL: (0x05, 0x00, 0x00, 0x00),
+        HVACMode.HEAT: (0x08, 0x00, 0x20, 0x20),
+        HVACMode.AUTO: (0x04, 0x00, 0x00, 0x00),
+        HVACMode.DRY: (0x02, 0x00, 0x00, 0x00),
+    }
+
     def __init__(self, host, module_address, loop_address):
-        self.host_hex = f"AC{int(host.split('.')[-1]):02X}0010"
-        self.module_hex = f"{int(module_address):02X}"
-        self.loop_hex = f"{int(loop_address):02X}"
-        self.host_bytes = bytes.fromhex(self.host_hex)
-        self.module_bytes = bytes.fromhex(self.module_hex)
+        self.host_bytes = _host_bytes(host)
+        self.module_bytes = bytes((int(module_address),))
+        module = int(module_address)
+        base = int(loop_address) * 9 - 287
+        self._prefixes = [_prefix(self.host_bytes, module, base + offset) for offset in range(6)]
+
+    def _pack(self, register, d1, d2=0x00, d3=0x00, d4=0x00):
+        return _CONTROL.pack(self._prefixes[register], d1, d2, d3, d4, _TAIL)
 
     def hvac_mode(self, command):
-        loop_hex_value = int(self.loop_hex, 16)
-        command_list = []
         if command == HVACMode.OFF:
-            loop_hex_modeaddress = loop_hex_value * 9 - 287
-            loop_hex_original = f"{loop_hex_modeaddress:02X}"
-            command_list.append(f"{loop_hex_original}000400002020CA")
-        elif command == HVACMode.COOL:
-            command_list.append(f"{loop_hex_value * 9 - 287:02X}000401000000CA")
-            command_list.append(f"{loop_hex_value * 9 - 286:02X}000405000000CA")
-        elif command == HVACMode.HEAT:
-            command_list.append(f"{loop_hex_value * 9 - 287:02X}000401000000CA")
-            command_list.append(f"{loop_hex_value * 9 - 286:02X}000408002020CA")
-        elif command == HVACMode.AUTO:
-            command_list.append(f"{loop_hex_value * 9 - 287:02X}000401000000CA")
-            command_list.append(f"{loop_hex_value * 9 - 286:02X}000404000000CA")
-        elif command == HVACMode.DRY:
-            command_list.append(f"{loop_hex_value * 9 - 287:02X}000401000000CA")
-            command_list.append(f"{loop_hex_value * 9 - 286:02X}000402000000CA")
-        return [self.host_bytes + self.module_bytes + bytes.fromhex(cmd) for cmd in command_list]
+            return [self._pack(self._OFF, 0x00, 0x00, 0x20, 0x20)]
+        mode = self._HVAC_MODE.get(command)
+        if mode is None:
+            return []
+        return [self._pack(self._OFF, 0x01), self._pack(self._MODE, *mode)]
 
     def temperature(self, temperature):
         if temperature.startswith("temp:"):
-            temperature_str = temperature.split(":")[1]
-            temperature_hex = f"{int(float(temperature_str)):02X}"
-            command_hex = (
-                f"{int(self.loop_hex, 16) * 9 - 284:02X}0004{temperature_hex}000000CA"
-            )
-            return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+            return self._pack(self._TEMP, int(float(temperature.split(":")[1])))
 
     def fan_mode(self, command):
-        fan_speed_map = {"low": "04", "medium": "02", "high": "01", "auto": "00"}
-        command_hex = f"{int(self.loop_hex, 16) * 9 - 285:02X}0004{fan_speed_map[command]}000000CA"
-        return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+        return self._pack(self._FAN, self._FAN_SPEED[command])
 
     def floor_heat_mode(self, command):
-        loop_hex_value = int(self.loop_hex, 16)
-        command_list = []
         if command == HVACMode.OFF:
-            loop_hex_modeaddress = loop_hex_value * 9 - 283
-            loop_hex_original = f"{loop_hex_modeaddress:02X}"
-            command_list.append(f"{loop_hex_original}000400002020CA")
+            return [self._pack(self._FLOOR_MODE, 0x00, 0x00, 0x20, 0x20)]
         elif command == HVACMode.HEAT:
-            command_list.append(f"{loop_hex_value * 9 - 283:02X}000401000000CA")
-        return [
-            self.host_bytes + self.module_bytes + bytes.fromhex(cmd)
-            for cmd in command_list
-        ]
+            return [self._pack(self._FLOOR_MODE, 0x01)]
+        return []
 
     def floor_heat_temperature(self, temperature):
         if temperature.startswith("temp:"):
-            temperature_str = temperature.split(":")[1]
-            temperature_hex = f"{int(float(temperature_str)):02X}"
-            command_hex = (
-                f"{int(self.loop_hex, 16) * 9 - 282:02X}0004{temperature_hex}000000CA"
-            )
-            return self.host_bytes + self.module_bytes + bytes.fromhex(command_hex)
+            return self._pack(self._FLOOR_TEMP, int(float(temperature.split(":")[1])))
 
     def _command_to_bytes(self, command_hex):
         return bytes.fromhex(command_hex)
@@ -270,10 +184,10 @@ class CurtainCommand:
 
 class SwitchSceneCommand:
     def __init__(self, host, scene_number):
-        self.host_hex = f"AC{int(host.split('.')[-1]):02X}101000"
-        self.host_bytes = bytes.fromhex(self.host_hex)
-        self.scene_hex = f"{int(scene_number):02X}"
-        self.scene_bytes = bytes.fromhex(self.scene_hex)
+        self.host_bytes = bytes((0xAC, int(host.split('.')[-1]), 0x10, 0x10, 0x00))
+        self.scene_bytes = bytes((int(scene_number),))
+        # 场景开、关下发的是同一帧
+        self._trigger = self.host_bytes + self.scene_bytes + b"\x00\x04\x01\x00\x00\x00\xCA"
 
     # def __init__(self, host, module_address, loop_address):
     #     self.host_hex = f"AC{int(host.split('.')[-1]):02X}0010"
@@ -284,11 +198,4 @@ class SwitchSceneCommand:
     #     self.loop_bytes = bytes.fromhex(self.loop_hex)
 
     def turnonoff(self, command):
-        command_hex = ""
-        if command == "on":
-            command_hex = f"000401000000CA"  # 状态开启
-        elif command == "off":
-            command_hex = f"000401000000CA"  # 状态关闭
-        command_bytes = bytes.fromhex(command_hex)
-        command = self.host_bytes + self.scene_bytes + command_bytes
-        return command
+        return self._trigger
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from .const import (
+    CONF_ACK_PACING,
+    CONF_COLLECT_WINDOW_MS,
+    CONF_ENERGY_POLL_INTERVAL,
+    CONF_ENERGY_POLL_MAX_INTERVAL,
+    CONF_ENERGY_POLL_MIN_INTERVAL,
+    CONF_ENERGY_RECORD_INTERVAL,
+    CONF_FRAME_GAP_MS,
+    CONF_FRAME_TRACE_SIZE,
+    DEFAULT_ACK_PACING,
+    DEFAULT_COLLECT_WINDOW_MS,
+    DEFAULT_ENERGY_POLL_INTERVAL,
+    DEFAULT_ENERGY_POLL_MAX_INTERVAL,
+    DEFAULT_ENERGY_POLL_MIN_INTERVAL,
+    DEFAULT_ENERGY_RECORD_INTERVAL,
+    DEFAULT_FRAME_TRACE_SIZE,
+    POOL_LINGER,
+)
+from .tcp_manager import TCPConnectionManager
+
+_LOGGER = logging.getLogger(__name__)
+
+# 连接设置：选项键与 TCPConnectionManager 的参数同名，帧间隔为 None 时按应答往返时间自动校准
+CONNECTION_DEFAULTS = {
+    CONF_FRAME_GAP_MS: None,
+    CONF_ACK_PACING: DEFAULT_ACK_PACING,
+    CONF_COLLECT_WINDOW_MS: DEFAULT_COLLECT_WINDOW_MS,
+    CONF_ENERGY_POLL_INTERVAL: DEFAULT_ENERGY_POLL_INTERVAL,
+    CONF_ENERGY_POLL_MIN_INTERVAL: DEFAULT_ENERGY_POLL_MIN_INTERVAL,
+    CONF_ENERGY_POLL_MAX_INTERVAL: DEFAULT_ENERGY_POLL_MAX_INTERVAL,
+    CONF_ENERGY_RECORD_INTERVAL: DEFAULT_ENERGY_RECORD_INTERVAL,
+    CONF_FRAME_TRACE_SIZE: DEFAULT_FRAME_TRACE_SIZE,
+}
+
+
+def connection_options(entry):
+    """配置条目的连接设置，选项流程保存在 entry.options 中，早期写在 entry.data 中的值仍然有效"""
+    settings = {**entry.data, **entry.options}
+    return {key: settings.get(key, default) for key, default in CONNECTION_DEFAULTS.items()}
+
+
+class ConnectionPool:
+    """按网关 host:port 共享 TCPConnectionManager 的进程级连接池
+
+    同一网关的多个配置条目和 send_command.py 的辅助函数共用一个连接，按引用计数管理。
+    最后一个使用者释放后连接再保持 linger 秒，选项流程重新加载配置条目时直接复用在线的 socket，
+    不必断开重连、重新查询全部状态。
+    """
+
+    def __init__(self, linger=POOL_LINGER):
+        self.linger = linger
+        self._managers = {}  # (host, port) -> TCPConnectionManager
+        self._options = {}  # (host, port) -> 创建连接时的参数
+        self._refs = {}  # (host, port) -> 引用计数
+        self._closing = {}  # (host, port) -> 延迟关闭任务
+
+    @staticmethod
+    def _key(host, port):
+        return host, int(port)
+
+    def get(self, host, port):
+        """已有的连接，没有时返回 None"""
+        return self._managers.get(self._key(host, port))
+
+    async def acquire(self, host, port, options=None):
+        """取得网关连接并增加引用计数
+
+        options 为 TCPConnectionManager 的参数，与现有连接不同且无人使用时重建连接；
+        为 None 时直接使用现有连接。
+        """
+        key = self._key(host, port)
+        task = self._closing.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+        manager = self._managers.get(key)
+        if manager is not None and options is not None and self._options[key] != options:
+            if self._refs.get(key):
+                _LOGGER.warning("%s:%s 的连接仍在使用，新的连接参数在全部释放后生效", host, port)
+            else:
+                del self._managers[key]
+                await manager.close()
+                manager = None
+        if manager is None:
+            options = options or {}
+            manager = self._managers[key] = TCPConnectionManager(host, port, **options)
+            self._options[key] = options
+        self._refs[key] = self._refs.get(key, 0) + 1
+        return manager
+
+    async def release(self, manager, entry_id=None):
+        """减少引用计数，配置条目释放时同时移除它的设备，计数归零后延迟关闭"""
+        key = self._key(manager.host, manager.port)
+        if self._managers.get(key) is not manager:
+            await manager.close()
+            return
+        if entry_id is not None:
+            manager.detach(entry_id)
+        self._refs[key] -= 1
+        if self._refs[key] > 0:
+            return
+        if self.linger > 0:
+            self._closing[key] = asyncio.create_task(self._close_later(key))
+        else:
+            await self._close(key)
+
+    async def _close_later(self, key):
+        await asyncio.sleep(self.linger)
+        self._closing.pop(key, None)
+        if not self._refs.get(key):
+            await self._close(key)
+
+    async def _close(self, key):
+        manager = self._managers.pop(key)
+        self._options.pop(key, None)
+        self._refs.pop(key, None)
+        await manager.close()
+
+    @asynccontextmanager
+    async def connection(self, host, port):
+        """临时使用网关连接，没有连接时建立一个"""
+        manager = await self.acquire(host, port)
+        try:
+            if not manager.is_connected:
+                await manager.connect()
+            yield manager
+        finally:
+            await self.release(manager)
+
+
+pool = ConnectionPool()
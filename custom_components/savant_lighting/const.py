@@ -1,3 +1,80 @@
 """Constants for the Savant Lighting integration."""
 
-DOMAIN = "savant_lighting"
\ No newline at end of file
+DOMAIN = "savant_lighting"
+
+# 出站帧节拍：相邻两帧的最小间隔（毫秒），在选项流程的连接设置中调整；
+# 不填时按网关实际的应答往返时间自动校准，从 DEFAULT_FRAME_GAP_MS 开始，限制在 MIN~MAX 之间
+CONF_FRAME_GAP_MS = "frame_gap_ms"
+CONF_ACK_PACING = "ack_pacing"
+DEFAULT_FRAME_GAP_MS = 50
+FRAME_GAP_MIN_MS = 10
+FRAME_GAP_MAX_MS = 200
+DEFAULT_ACK_PACING = False
+# 收集窗口（毫秒）：同一时刻发出的命令先收集，合并同一寄存器的修改，同一模块的帧拼接成一次写入，0 表示不收集
+CONF_COLLECT_WINDOW_MS = "collect_window_ms"
+DEFAULT_COLLECT_WINDOW_MS = 5
+ACK_TIMEOUT_MS = 500
+
+# 出站命令优先级，数值越小越先发送
+PRIORITY_USER = 0        # 用户在界面上的操作
+PRIORITY_SCHEDULED = 1   # 自动化、脚本等非用户直接触发的命令
+PRIORITY_BACKGROUND = 2  # 心跳、状态查询等后台轮询
+# 低优先级命令排队超过该时长后提前发送，避免被持续的高优先级命令饿死
+STARVATION_MS = 2000
+
+# 断线重连：指数退避的初始与最大等待时间（秒），实际等待带随机抖动
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# 断线期间最多缓存的命令数，超出后丢弃最早的命令
+OFFLINE_BUFFER_SIZE = 64
+
+# 批量写入：同一模块的控制帧合并为一次写入，每次最多 16 帧（与 0x40 状态上报的回路数一致）
+MAX_BATCH_FRAMES = 16
+
+# 启动同步：最多同时等待应答的模块查询数，以及单个模块的应答超时（秒）
+SYNC_CONCURRENCY = 4
+SYNC_TIMEOUT = 2
+
+# 计量开关 (switch_with_energy) 轮询：每个模块按基础间隔查询，读数稳定时逐步加倍到最大间隔，
+# 功率变化时回到最小间隔；继电器动作后 ENERGY_POLL_AFTER_TOGGLE 秒补查一次（单位均为秒）
+CONF_ENERGY_POLL_INTERVAL = "energy_poll_interval"
+CONF_ENERGY_POLL_MIN_INTERVAL = "energy_poll_min_interval"
+CONF_ENERGY_POLL_MAX_INTERVAL = "energy_poll_max_interval"
+DEFAULT_ENERGY_POLL_INTERVAL = 60
+DEFAULT_ENERGY_POLL_MIN_INTERVAL = 10
+DEFAULT_ENERGY_POLL_MAX_INTERVAL = 300
+ENERGY_POLL_AFTER_TOGGLE = 2
+# 功率相对上次读数的变化超过该比例才算“正在变化”
+ENERGY_POWER_TOLERANCE = 0.05
+
+# 计量回路的内存历史：每个回路保留的最近读数条数，按最小轮询间隔 10 秒约为 1 小时
+ENERGY_HISTORY_SIZE = 360
+# 诊断信息中导出每个计量回路最近多少秒的读数
+ENERGY_DIAGNOSTICS_WINDOW = 600
+# 计量传感器写入 HA 状态（即记录器）的最小间隔（秒），其余读数只保存在内存历史中
+CONF_ENERGY_RECORD_INTERVAL = "energy_record_interval"
+DEFAULT_ENERGY_RECORD_INTERVAL = 60
+
+# 收发帧记录：保留最近的帧数，在诊断信息中导出，0 表示关闭
+CONF_FRAME_TRACE_SIZE = "frame_trace_size"
+DEFAULT_FRAME_TRACE_SIZE = 0
+
+# 连接池：最后一个配置条目释放连接后保持连接的时长（秒），重新加载时直接复用现有连接
+POOL_LINGER = 30
+
+# 各平台创建实体的设备类型
+PLATFORM_DEVICE_TYPES = {
+    "light": ("light",),
+    "switch": ("switch", "8button", "scene_switch", "switch_with_energy"),
+    "climate": ("climate", "floor_heating"),
+    "fan": ("fresh_air",),
+    "cover": ("curtain",),
+    "binary_sensor": ("person_sensor",),
+    "sensor": ("switch_with_energy",),
+}
+
+# 总线发现：默认扫描的模块地址范围、同时扫描的模块数、每个模块等待应答的时长（秒）
+DISCOVERY_MODULE_MIN = 1
+DISCOVERY_MODULE_MAX = 64
+DISCOVERY_CONCURRENCY = 4
+DISCOVERY_TIMEOUT = 1.5
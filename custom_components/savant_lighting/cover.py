@@ -6,6 +6,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.const import STATE_ON, STATE_OFF
 from datetime import timedelta
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
 from .command_helper import CurtainCommand
 from .send_command import *
 
@@ -14,26 +16,29 @@ SCAN_INTERVAL = timedelta(seconds=60)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Fresh Air entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
-    
-    curtains = [
+    await async_setup_platform(hass, entry, "cover", create_entities, async_add_entities)
+
+def create_entities(device, tcp_manager):
+    """按设备配置创建窗帘实体，选项流程增加设备时也调用"""
+    if device["type"] != "curtain":
+        return []
+    return [
         SavantFreshCurtain(
             name=device["name"],
             module_address=device["module_address"],
             loop_address=device["loop_address"],
             host=device["host"],
             port=device["port"],
-            tcp_manager=config["tcp_manager"]
+            tcp_manager=tcp_manager
         )
-        for device in devices if device["type"] == "curtain"
     ]
-    async_add_entities(curtains, update_before_add=True)
 
 
-class SavantFreshCurtain(CoverEntity):
+class SavantFreshCurtain(StateWriteMixin, CoverEntity):
     """Representation of an automatic curtain with open, close, and position control."""
 
+    _written_fields = ("_state", "_position")
+
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
         """Initialize the fresh air fan."""
         self._attr_name = name
@@ -45,9 +50,12 @@ class SavantFreshCurtain(CoverEntity):
         self._state = STATE_OFF  # Curtain is initially closed
         self._attr_is_closed = True
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("curtain", self.update_state)
         self.command = CurtainCommand(host, module_address, loop_address)
 
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+
     @property
     def unique_id(self):
         """Return a unique ID for this curtain."""
@@ -114,20 +122,19 @@ class SavantFreshCurtain(CoverEntity):
         else:
             raise ValueError("Unsupported command")
 
-        await self.tcp_manager.send_command(hex_command)
+        await self.tcp_manager.send_command(hex_command, context=self._context)
         _LOGGER.debug(f"Sent command to curtain: {command}")
 
-    def update_state(self, response_dict):
+    def update_state(self, frame):
         """Update the state of the curtain based on the response from the device."""
-        print('窗帘收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
+        _LOGGER.debug("窗帘收到状态响应: %s", frame)
 
-        if response_dict["data1"] == 0x00:
-            device._state = STATE_OFF
-            device._position = 0
+        if frame.data1 == 0x00:
+            self._state = STATE_OFF
+            self._position = 0
         else:
-            device._state = STATE_ON
-            device._position = response_dict["data1"]
+            self._state = STATE_ON
+            self._position = frame.data1
 
-        device._attr_is_closed = device._position == 0 
-        device.async_write_ha_state() 
+        self._attr_is_closed = self._position == 0 
+        self.async_write_ha_state_if_changed()
@@ -0,0 +1,151 @@
+from .const import PLATFORM_DEVICE_TYPES
+
+# 与 option_flow 原有的地址查重规则一致：这些类型只与同类型设备冲突，其余类型与任何设备冲突
+SHARED_ADDRESS_TYPES = ("fresh_air", "floor_heating", "climate", "switch_with_energy", "switch")
+
+_ENERGY_SENSORS = ("voltage", "current", "power", "energy")
+
+
+def _address(value):
+    """模块、回路地址统一为 int；场景开关的地址是 'scene<场景号>'，保持原样"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def device_key(device):
+    """配置条目中一个设备的键，与选项流程中的地址查重规则一致"""
+    return f"{device['module_address']}_{device['loop_address']}_{device['type']}"
+
+
+def device_param(device):
+    """选项流程下拉框中设备的值：名称|模块|回路|类型"""
+    return f"{device.get('name', '')}|{device['module_address']}|{device['loop_address']}|{device['type']}"
+
+
+def unique_ids(device):
+    """设备在各平台创建的实体的 unique_id，与各实体类的 unique_id 属性一致"""
+    base = f"{device['module_address']}_{device['loop_address']}"
+    device_type = device["type"]
+    if device_type == "8button":
+        return [f"{base}_{button}_8button" for button in device.get("selected_buttons", [])]
+    if device_type == "scene_switch":
+        return [f"{base}_{device['scene_number']}_scene_switch"]
+    if device_type == "switch_with_energy":
+        return [f"{base}_switch_with_energy"] + [
+            f"{base}_switch_with_energy_{sensor}_sensor" for sensor in _ENERGY_SENSORS
+        ]
+    return [f"{base}_{device_type}"]
+
+
+class DeviceCatalog:
+    """配置条目设备列表的索引
+
+    entry.data["devices"] 仍然是可以直接保存的 dict 列表，目录在每个配置条目加载时建立一次，
+    按类型、模块、(模块, 回路)、unique_id 和选项流程的选择值建立索引，
+    平台创建实体、选项流程查重和查找、连接生成状态查询都从这里查，不再逐个扫描列表。
+    增删改都经过 add / remove / replace，索引与列表保持一致。
+    """
+
+    def __init__(self, devices=()):
+        self._devices = {}  # 设备键 -> 设备，保持加入顺序
+        self._by_type = {}
+        self._by_module = {}
+        self._by_address = {}
+        self._by_unique_id = {}
+        self._by_param = {}
+        for device in devices:
+            self.add(device)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __contains__(self, device):
+        return device_key(device) in self._devices
+
+    @property
+    def devices(self):
+        """写回 entry.data 的设备列表（新列表，原地修改不会被 async_update_entry 保存）"""
+        return list(self._devices.values())
+
+    def add(self, device):
+        """加入设备，同一设备键已存在时替换"""
+        key = device_key(device)
+        if key in self._devices:
+            self._unindex(self._devices[key])
+        self._devices[key] = device
+        module = _address(device["module_address"])
+        self._by_type.setdefault(device["type"], {})[key] = device
+        self._by_module.setdefault(module, {})[key] = device
+        self._by_address.setdefault((module, _address(device["loop_address"])), {})[key] = device
+        for unique_id in unique_ids(device):
+            self._by_unique_id[unique_id] = device
+        self._by_param[device_param(device)] = device
+
+    def remove(self, device):
+        """移除设备，返回被移除的设备，不存在时返回 None"""
+        existing = self._devices.pop(device_key(device), None)
+        if existing is not None:
+            self._unindex(existing)
+        return existing
+
+    def replace(self, old_device, new_device):
+        """修改设备配置，设备键改变时原位置不保留"""
+        self.remove(old_device)
+        self.add(new_device)
+
+    def _unindex(self, device):
+        key = device_key(device)
+        module = _address(device["module_address"])
+        address = (module, _address(device["loop_address"]))
+        for index, value in ((self._by_type, device["type"]), (self._by_module, module), (self._by_address, address)):
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[value]
+        for unique_id in unique_ids(device):
+            if self._by_unique_id.get(unique_id) is device:
+                del self._by_unique_id[unique_id]
+        if self._by_param.get(device_param(device)) is device:
+            del self._by_param[device_param(device)]
+
+    def of_type(self, *device_types):
+        """指定类型的设备"""
+        return [device for device_type in device_types for device in self._by_type.get(device_type, {}).values()]
+
+    def for_platform(self, platform):
+        """在指定平台创建实体的设备"""
+        return self.of_type(*PLATFORM_DEVICE_TYPES.get(platform, ()))
+
+    def in_module(self, module_address):
+        """模块上的全部设备"""
+        return list(self._by_module.get(_address(module_address), {}).values())
+
+    @property
+    def modules(self):
+        """已配置的模块地址"""
+        return self._by_module.keys()
+
+    def at(self, module_address, loop_address):
+        """(模块, 回路) 上的全部设备"""
+        return list(self._by_address.get((_address(module_address), _address(loop_address)), {}).values())
+
+    def by_unique_id(self, unique_id):
+        """实体 unique_id 所属的设备"""
+        return self._by_unique_id.get(unique_id)
+
+    def by_param(self, param):
+        """选项流程选择值（名称|模块|回路|类型）对应的设备"""
+        return self._by_param.get(param)
+
+    def conflict(self, device_type, module_address, loop_address):
+        """与新设备地址冲突的已有设备，没有冲突时返回 None"""
+        for device in self.at(module_address, loop_address):
+            if device_type not in SHARED_ADDRESS_TYPES or device["type"] == device_type:
+                return device
+        return None
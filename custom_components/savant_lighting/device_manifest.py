@@ -0,0 +1,162 @@
+import csv
+import io
+
+import yaml
+
+from .const import PLATFORM_DEVICE_TYPES
+from .device_catalog import DeviceCatalog
+
+# 清单的列，导入和导出使用同一格式：
+# type 设备类型，sub_type 灯光子类型，module/loop 模块、回路地址，name 名称，
+# gradient_time 灯光渐变时间，buttons 8 键开关启用的按键（空格分隔），scene 场景号
+FIELDS = ("type", "sub_type", "module", "loop", "name", "gradient_time", "buttons", "scene")
+
+DEVICE_TYPES = sorted({device_type for types in PLATFORM_DEVICE_TYPES.values() for device_type in types})
+LIGHT_SUB_TYPES = ("single", "0603D", "rgb", "DALI-01", "DALI-02")
+BUTTONS = tuple(str(i) for i in range(1, 9))
+
+FORMAT_CSV = "csv"
+FORMAT_YAML = "yaml"
+
+
+class ManifestError(ValueError):
+    """清单内容有误，errors 为逐行的错误说明"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _rows(text):
+    """按内容判断格式：以 type 表头开始的是 CSV，否则按 YAML 设备列表解析"""
+    stripped = text.lstrip()
+    if stripped.startswith("type,"):
+        return list(csv.DictReader(io.StringIO(stripped)))
+    try:
+        rows = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ManifestError([f"YAML 格式错误: {e}"]) from e
+    if rows is None:
+        return []
+    if isinstance(rows, dict):
+        rows = rows.get("devices")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ManifestError(["清单应为 CSV（首行为表头）或 YAML 设备列表"])
+    return rows
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _int(row, field):
+    value = _text(row.get(field))
+    if not value:
+        raise ValueError(f"缺少 {field}")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{field} 应为整数: {value}") from None
+
+
+def _device(row, host, port):
+    """清单中的一行转换为 entry.data["devices"] 中的设备，字段与选项流程添加的设备一致"""
+    device_type = _text(row.get("type"))
+    if device_type not in DEVICE_TYPES:
+        raise ValueError(f"未知设备类型: {device_type or '（空）'}")
+    name = _text(row.get("name"))
+    if not name:
+        raise ValueError("缺少 name")
+
+    sub_type = _text(row.get("sub_type")) or None
+    if device_type == "light":
+        if sub_type not in LIGHT_SUB_TYPES:
+            raise ValueError(f"灯光 sub_type 应为 {'/'.join(LIGHT_SUB_TYPES)}: {sub_type or '（空）'}")
+    else:
+        sub_type = None
+
+    if device_type == "scene_switch":
+        scene = _int(row, "scene")
+        module = loop = f"scene{scene}"
+    else:
+        module = _int(row, "module")
+        loop = _int(row, "loop")
+
+    device = {
+        "type": device_type,
+        "sub_device_type": sub_type,
+        "name": name,
+        "module_address": module,
+        "loop_address": loop,
+        "host": host,
+        "port": port,
+    }
+    if device_type == "light":
+        device["gradient_time"] = _int(row, "gradient_time")
+    if device_type == "8button":
+        buttons = row.get("buttons")
+        if not isinstance(buttons, list):
+            buttons = _text(buttons).replace(";", " ").replace(",", " ").split()
+        buttons = [_text(button) for button in buttons]
+        if not buttons or any(button not in BUTTONS for button in buttons):
+            raise ValueError(f"buttons 应为 1-8 的按键号: {' '.join(buttons) or '（空）'}")
+        device["selected_buttons"] = buttons
+    if device_type == "scene_switch":
+        device["scene_number"] = scene
+    return device
+
+
+def parse_manifest(text, host, port, existing=()):
+    """解析并一次性校验整份清单，返回设备列表
+
+    清单内各行之间、以及与配置条目已有设备之间的地址冲突按选项流程添加设备的规则检查，
+    有任何错误时抛出 ManifestError，列出全部出错的行，不导入任何设备。
+    """
+    catalog = DeviceCatalog(existing)
+    devices = []
+    errors = []
+    for line, row in enumerate(_rows(text), start=1):
+        try:
+            device = _device(row, host, port)
+        except ValueError as e:
+            errors.append(f"第 {line} 行: {e}")
+            continue
+        exist_device = catalog.conflict(device["type"], device["module_address"], device["loop_address"])
+        if exist_device is not None:
+            errors.append(f"第 {line} 行: 地址重复，当前已分配[{exist_device['type']}：{exist_device['name']}]")
+            continue
+        catalog.add(device)
+        devices.append(device)
+    if errors:
+        raise ManifestError(errors)
+    return devices
+
+
+def _row(device):
+    device_type = device["type"]
+    return {
+        "type": device_type,
+        "sub_type": device.get("sub_device_type") if device_type == "light" else None,
+        "module": None if device_type == "scene_switch" else device["module_address"],
+        "loop": None if device_type == "scene_switch" else device["loop_address"],
+        "name": device["name"],
+        "gradient_time": device.get("gradient_time"),
+        "buttons": device.get("selected_buttons"),
+        "scene": device.get("scene_number"),
+    }
+
+
+def dump_manifest(devices, fmt=FORMAT_CSV):
+    """把设备列表导出为清单，parse_manifest 可以原样导入"""
+    rows = [_row(device) for device in devices]
+    if fmt == FORMAT_YAML:
+        rows = [{key: value for key, value in row.items() if value is not None} for row in rows]
+        return yaml.safe_dump(rows, allow_unicode=True, sort_keys=False)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        if row["buttons"] is not None:
+            row["buttons"] = " ".join(row["buttons"])
+        writer.writerow({key: "" if value is None else value for key, value in row.items()})
+    return output.getvalue()
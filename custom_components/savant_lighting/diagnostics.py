@@ -0,0 +1,12 @@
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """返回网关连接和发送管道的诊断信息"""
+    tcp_manager = hass.data[DOMAIN][entry.entry_id]["tcp_manager"]
+    return {
+        "gateway": tcp_manager.diagnostics(),
+        "device_count": len(entry.data.get("devices", [])),
+    }
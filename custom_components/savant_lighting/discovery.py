@@ -0,0 +1,97 @@
+import asyncio
+import logging
+
+from .const import DISCOVERY_CONCURRENCY, DISCOVERY_TIMEOUT
+from .frame_record import EnergyFrame, HvacType
+
+_LOGGER = logging.getLogger(__name__)
+
+# 每个模块发送的状态查询，与 update_all_device_state 使用的查询相同：(起始地址, 寄存器类型)
+PROBES = (
+    (0x01, 0x08),  # 继电器，应答 0x20：8 个回路
+    (0x01, 0x10), (0x11, 0x10), (0x21, 0x10), (0x31, 0x10),  # DALI-02，应答 0x40：每帧 16 个回路
+    (0x01, 0x09),  # 空调 / 地暖 / 新风，应答 0x24：一个内机的 9 项
+    (0x01, 0x14),  # 计量继电器，应答 0x50：4 个回路
+)
+
+# 空调类应答中表示该设备存在的项
+_HVAC_PRESENCE = (HvacType.OFF, HvacType.FLOOR_MODE, HvacType.FRESH_AIR_MODE)
+
+# 发现结果的默认名称，导入前可以在清单中修改
+NAMES = {
+    "switch": "继电器",
+    "switch_with_energy": "计量继电器",
+    "light": "灯光",
+    "climate": "空调",
+    "floor_heating": "地暖",
+    "fresh_air": "新风",
+}
+
+
+def probe_commands(host, module):
+    """一个模块的全部发现查询帧"""
+    header = bytes((0xAC, int(host.split('.')[-1]), 0x00, 0xB0, module))
+    return [header + bytes((start, 0x00, 0x01, register, 0xCA)) for start, register in PROBES]
+
+
+def classify_responses(manager, module, responses):
+    """按 parse_response_array 解析出的帧归纳模块上的设备
+
+    返回 {键: (类型, 子类型)}，键为 (模块, 回路)，空调类为 (模块, 回路, 类型)。
+    """
+    found = {}
+    for response in responses:
+        for frame in manager.parse_response_array(response):
+            if isinstance(frame, EnergyFrame):
+                found[(module, frame.loop_address)] = ("switch_with_energy", None)
+                continue
+            if frame.sub_device_type == "DALI-02" and not (frame.data1 or frame.data2 or frame.data3 or frame.data4):
+                # 未分配短地址的 DALI 回路应答全 0
+                continue
+            if frame.hvac_type in _HVAC_PRESENCE:
+                # 同一内机地址上可以同时有空调、地暖、新风，按各自的开关项识别
+                found[(module, frame.loop_address, frame.device_type)] = (frame.device_type, None)
+            elif frame.hvac_type == HvacType.NONE:
+                found.setdefault((module, frame.loop_address), (frame.device_type, frame.sub_device_type or None))
+    # 计量继电器也应答普通继电器查询，同一模块有计量应答时以计量为准
+    if any(value[0] == "switch_with_energy" for value in found.values()):
+        found = {key: value for key, value in found.items() if value[0] != "switch"}
+    return found
+
+
+def _device(manager, key, device_type, sub_device_type):
+    module, loop = key[0], key[1]
+    device = {
+        "type": device_type,
+        "sub_device_type": sub_device_type,
+        "name": f"{NAMES.get(device_type, device_type)} {module}-{loop}",
+        "module_address": module,
+        "loop_address": loop,
+        "host": manager.host,
+        "port": manager.port,
+    }
+    if device_type == "light":
+        device["gradient_time"] = 0
+    return device
+
+
+async def discover(manager, modules, concurrency=DISCOVERY_CONCURRENCY, timeout=DISCOVERY_TIMEOUT):
+    """扫描模块地址范围，按应答帧的形状识别设备，返回可以批量导入的设备列表
+
+    查询帧以后台优先级进入发送管道，按帧间隔依次发出，不挤占用户命令；
+    同时最多扫描 concurrency 个模块，每个模块从第一帧查询写出起最多等待 timeout 秒。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan(module):
+        async with semaphore:
+            responses = await manager.probe_module(module, probe_commands(manager.host, module), timeout)
+        return classify_responses(manager, module, responses)
+
+    results = await asyncio.gather(*(scan(module) for module in modules))
+    devices = []
+    for found in results:
+        for key, (device_type, sub_device_type) in sorted(found.items(), key=lambda item: item[0][:2]):
+            devices.append(_device(manager, key, device_type, sub_device_type))
+    _LOGGER.debug("发现扫描完成：%s 个模块，%s 个设备", len(results), len(devices))
+    return devices
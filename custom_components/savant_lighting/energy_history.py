@@ -0,0 +1,144 @@
+import logging
+from array import array
+from collections import deque
+
+from .const import ENERGY_HISTORY_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+# 环形缓冲区中的列，顺序与 append 的参数一致
+FIELDS = ("voltage", "current", "power", "energy")
+# 维护滚动统计的列，电量是累计值，不做统计
+STAT_FIELDS = ("voltage", "current", "power")
+
+
+class EnergyHistory:
+    """单个计量回路最近读数的环形缓冲区
+
+    每列是一个定长的 array('d')，新读数覆盖最旧的读数。电压、电流、功率的平均值用滚动和维护，
+    最小/最大值用单调队列维护，读取统计信息时不需要遍历缓冲区，也不需要查询记录器。
+    """
+
+    def __init__(self, capacity=ENERGY_HISTORY_SIZE):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._columns = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self._count = 0  # 累计写入的读数条数，取模即写入位置
+        self._sums = dict.fromkeys(STAT_FIELDS, 0.0)
+        self._mins = {field: deque() for field in STAT_FIELDS}  # (序号, 值)，值单调递增
+        self._maxs = {field: deque() for field in STAT_FIELDS}  # (序号, 值)，值单调递减
+        self.last_published = None  # 上次写入 HA 状态的读数时间
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp, voltage, current, power, energy):
+        """追加一条读数，缓冲区满时覆盖最旧的一条"""
+        seq = self._count
+        index = seq % self.capacity
+        values = (voltage or 0.0, current or 0.0, power or 0.0, energy or 0.0)
+        expired = seq - self.capacity  # 本次被覆盖的读数序号
+        for field, value in zip(FIELDS, values):
+            column = self._columns[field]
+            if field in self._sums:
+                if expired >= 0:
+                    self._sums[field] -= column[index]
+                self._sums[field] += value
+                mins = self._mins[field]
+                while mins and mins[-1][1] >= value:
+                    mins.pop()
+                mins.append((seq, value))
+                if mins[0][0] <= expired:
+                    mins.popleft()
+                maxs = self._maxs[field]
+                while maxs and maxs[-1][1] <= value:
+                    maxs.pop()
+                maxs.append((seq, value))
+                if maxs[0][0] <= expired:
+                    maxs.popleft()
+            column[index] = value
+        self._times[index] = timestamp
+        self._count = seq + 1
+
+    def latest(self):
+        """最新一条读数 (时间, 电压, 电流, 功率, 电量)，没有读数时返回 None"""
+        if not self._count:
+            return None
+        index = (self._count - 1) % self.capacity
+        return (self._times[index], *(self._columns[field][index] for field in FIELDS))
+
+    def stats(self, field):
+        """缓冲区内某列的最小、最大和平均值"""
+        if not self._count:
+            return None
+        return {
+            "min": self._mins[field][0][1],
+            "max": self._maxs[field][0][1],
+            "mean": self._sums[field] / len(self),
+        }
+
+    def samples(self, since=None):
+        """按时间顺序返回缓冲区内的读数，用于短时曲线"""
+        size = len(self)
+        start = self._count - size
+        result = []
+        for seq in range(start, self._count):
+            index = seq % self.capacity
+            if since is not None and self._times[index] < since:
+                continue
+            result.append((self._times[index], *(self._columns[field][index] for field in FIELDS)))
+        return result
+
+    def publish_due(self, interval):
+        """距上次写入 HA 状态已超过 interval 秒时返回 True 并记下本次写入时间"""
+        latest = self.latest()
+        if latest is None:
+            return False
+        if self.last_published is not None and latest[0] - self.last_published < interval:
+            return False
+        self.last_published = latest[0]
+        return True
+
+
+class EnergyLoop:
+    """一个计量回路的共享状态
+
+    继电器开关实体和它的电压、电流、功率、电量四个传感器在创建时拿到同一个对象并注册监听，
+    收到能耗帧时更新一次，五个实体都从这里取值，不需要按 unique_id 查找实体注册表。
+    """
+
+    def __init__(self, record_interval):
+        self.record_interval = record_interval
+        self.state = None
+        self.voltage = None
+        self.current = None
+        self.power = None
+        self.energy = None
+        self.history = EnergyHistory()
+        self.publish = False  # 本次读数是否需要写入计量传感器的状态（降采样）
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """注册 listener(loop)，返回取消注册的函数"""
+        self._listeners.append(listener)
+
+        def remove():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return remove
+
+    def update(self, frame, timestamp):
+        """用一个 EnergyFrame 更新读数，并通知所有实体"""
+        self.state = frame.state
+        self.voltage = frame.voltage
+        self.current = frame.current
+        self.power = frame.power
+        self.energy = frame.energy
+        self.history.append(timestamp, frame.voltage, frame.current, frame.power, frame.energy)
+        self.publish = self.history.publish_due(self.record_interval)
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                _LOGGER.exception("计量回路 %s_%s 的实体处理读数出错", frame.module_address, frame.loop_address)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+
+from .const import (
+    DEFAULT_ENERGY_POLL_INTERVAL,
+    DEFAULT_ENERGY_POLL_MIN_INTERVAL,
+    DEFAULT_ENERGY_POLL_MAX_INTERVAL,
+    ENERGY_POLL_AFTER_TOGGLE,
+    ENERGY_POWER_TOLERANCE,
+    PRIORITY_BACKGROUND,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EnergyPollScheduler:
+    """switch_with_energy 模块的自适应计量轮询
+
+    原来心跳任务每 60 秒扫描一遍 hass.data，按固定节奏查询所有计量模块。现在每个模块有自己的
+    下次轮询时间和间隔：读数稳定时间隔逐次加倍到 max_interval，功率变化或继电器刚动作时回到
+    min_interval。每轮开始时各模块的轮询时间均匀分布在基础间隔内，几十个模块不会同时查询。
+    """
+
+    def __init__(self, send, interval=DEFAULT_ENERGY_POLL_INTERVAL,
+                 min_interval=DEFAULT_ENERGY_POLL_MIN_INTERVAL, max_interval=DEFAULT_ENERGY_POLL_MAX_INTERVAL):
+        self._send = send  # async (data, priority)，发出查询帧
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self._queries = {}  # 模块地址 -> 计量查询帧
+        self._intervals = {}  # 模块地址 -> 当前轮询间隔
+        self._due = {}  # 模块地址 -> 下次轮询时间（事件循环时间）
+        self._changed = set()  # 上次轮询后读数有变化的模块
+        self._compared = set()  # 上次轮询后收到过可比较读数的模块
+        self._readings = {}  # (模块, 回路) -> (开关状态, 功率)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.polls = 0
+
+    @property
+    def modules(self):
+        """需要轮询的模块地址"""
+        return self._queries.keys()
+
+    def set_modules(self, devices):
+        """按设备列表更新需要轮询的模块，新增的模块分散加入，已删除的模块不再轮询"""
+        queries = {}
+        for device in devices:
+            if device.get("type") != "switch_with_energy":
+                continue
+            module = int(device.get("module_address"))
+            if module not in queries:
+                host = int(device.get("host").split('.')[-1])
+                queries[module] = bytes((0xAC, host, 0x00, 0xB0, module, 0x01, 0x00, 0x01, 0x14, 0xCA))
+        added = [module for module in queries if module not in self._queries]
+        for module in list(self._queries):
+            if module not in queries:
+                self._intervals.pop(module, None)
+                self._due.pop(module, None)
+                self._changed.discard(module)
+                self._compared.discard(module)
+        self._queries = queries
+        if self._task is not None:
+            self._spread(added)
+
+    def _spread(self, modules):
+        """把一组模块的下次轮询时间均匀分布在基础间隔内"""
+        if not modules:
+            return
+        now = asyncio.get_running_loop().time()
+        step = self.interval / len(modules)
+        for index, module in enumerate(modules):
+            self._intervals[module] = self.interval
+            self._due[module] = now + index * step
+        self._wakeup.set()
+
+    def start(self):
+        """连接建立后开始新一轮轮询"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._spread(list(self._queries))
+
+    def stop(self):
+        """连接断开或关闭时停止轮询"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._due.clear()
+
+    def _reschedule(self, module, delay):
+        """让模块在 delay 秒内被查询，并回到最小间隔"""
+        if module not in self._due:
+            return
+        self._intervals[module] = self.min_interval
+        due = asyncio.get_running_loop().time() + delay
+        if due < self._due[module]:
+            self._due[module] = due
+            self._wakeup.set()
+
+    def notify_command(self, data):
+        """出站控制帧经过时调用，计量模块的继电器动作后很快补查一次"""
+        if len(data) >= 13 and data[2] == 0x00 and data[3] == 0x10 and data[4] in self._queries:
+            self._reschedule(data[4], ENERGY_POLL_AFTER_TOGGLE)
+
+    def record(self, frame):
+        """收到 EnergyFrame，与上次读数比较判断是否正在变化"""
+        module = frame.module_address
+        if module not in self._queries:
+            return
+        key = (module, frame.loop_address)
+        previous = self._readings.get(key)
+        power = frame.power or 0.0
+        self._readings[key] = (frame.state, power)
+        if previous is None:
+            return
+        self._compared.add(module)
+        state, previous_power = previous
+        if state != frame.state or abs(power - previous_power) > max(power, previous_power) * ENERGY_POWER_TOLERANCE:
+            self._changed.add(module)
+            self._reschedule(module, self.min_interval)
+
+    def _next_interval(self, module):
+        """读数有变化用最小间隔，读数稳定则加倍直到最大间隔，没有收到应答则保持不变"""
+        interval = self._intervals.get(module, self.interval)
+        changed = module in self._changed
+        compared = module in self._compared
+        self._changed.discard(module)
+        self._compared.discard(module)
+        if changed:
+            return self.min_interval
+        if not compared:
+            return interval
+        return min(interval * 2, self.max_interval)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._due:
+                await self._wakeup.wait()
+                continue
+            module = min(self._due, key=self._due.get)
+            delay = self._due[module] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            interval = self._intervals[module] = self._next_interval(module)
+            self._due[module] = loop.time() + interval
+            self.polls += 1
+            _LOGGER.debug("查询计量模块 %s，下次间隔 %s 秒", module, interval)
+            try:
+                await self._send(self._queries[module], PRIORITY_BACKGROUND)
+            except Exception as e:
+                _LOGGER.error("查询计量模块 %s 失败: %s", module, e)
+
+    def diagnostics(self):
+        """诊断信息"""
+        return {
+            "energy_modules": len(self._queries),
+            "energy_polls": self.polls,
+            "energy_poll_intervals": {str(module): interval for module, interval in self._intervals.items()},
+        }
@@ -7,6 +7,9 @@ from homeassistant.const import STATE_ON, STATE_OFF
 from datetime import timedelta
 
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
+from .frame_record import HvacType
 from .command_helper import FreshAirCommand
 from .send_command import *
 
@@ -17,25 +20,28 @@ SUPPORTED_PRESET_MODES = ["low", "medium", "high", "auto"]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Fresh Air entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
+    await async_setup_platform(hass, entry, "fan", create_entities, async_add_entities)
 
-    fresh_airs = [
+def create_entities(device, tcp_manager):
+    """按设备配置创建新风实体，选项流程增加设备时也调用"""
+    if device["type"] != "fresh_air":
+        return []
+    return [
         SavantFreshAirFan(
             name=device["name"],
             module_address=device["module_address"],
             loop_address=device["loop_address"],
             host=device["host"],
             port=device["port"],
-            tcp_manager=config["tcp_manager"]
+            tcp_manager=tcp_manager
         )
-        for device in devices if device["type"] == "fresh_air"
     ]
-    async_add_entities(fresh_airs, update_before_add=True)
 
-class SavantFreshAirFan(FanEntity):
+class SavantFreshAirFan(StateWriteMixin, FanEntity):
     """Representation of a Savant Fresh Air Fan."""
 
+    _written_fields = ("_state", "_preset_mode")
+
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
         """Initialize the fresh air fan."""
         self._attr_name = name
@@ -46,9 +52,12 @@ class SavantFreshAirFan(FanEntity):
         self._state = True
         self._preset_mode = "auto"
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("fresh_air", self.update_state)
         self.command = FreshAirCommand(host, module_address, loop_address)
 
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+
     @property
     def unique_id(self):
         """Return a unique ID for this fan."""
@@ -89,14 +98,14 @@ class SavantFreshAirFan(FanEntity):
         self._state = True
         self._preset_mode = 'auto'
         hex_command = self._command_to_hex(STATE_ON, self._preset_mode)
-        await self.tcp_manager.send_command_list(hex_command)
+        await self.tcp_manager.send_command_list(hex_command, context=self._context)
         self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs):
         """Turn the fan off."""
         self._state = False
         hex_command = self._command_to_hex(STATE_OFF)
-        await self.tcp_manager.send_command_list(hex_command)
+        await self.tcp_manager.send_command_list(hex_command, context=self._context)
         self.async_write_ha_state()
 
     async def async_set_preset_mode(self, preset_mode: str):
@@ -105,7 +114,7 @@ class SavantFreshAirFan(FanEntity):
             self._state = True
             self._preset_mode = preset_mode
             hex_command = self._command_to_hex(STATE_ON, preset_mode)
-            await self.tcp_manager.send_command_list(hex_command)
+            await self.tcp_manager.send_command_list(hex_command, context=self._context)
             self.async_write_ha_state()
 
     def _command_to_hex(self, action: str, speed: str = None) -> bytes:
@@ -137,22 +146,20 @@ class SavantFreshAirFan(FanEntity):
         module_bytes = bytes.fromhex(module_hex)
         return [host_bytes + module_bytes + bytes.fromhex(cmd) for cmd in command_list]
 
-    def update_state(self, response_dict):
-        print('新风收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict['hvac_type'] == "hvac_07":
-            if response_dict["data1"] == 0x00:
-                device._state = False
-        elif response_dict['hvac_type'] == "hvac_08":
-            device._state = True
-            if response_dict["data1"] == 0x01:
-                device._preset_mode = 'low'
-            elif response_dict["data1"] == 0x02:
-                device._preset_mode = 'medium'
-            elif response_dict["data1"] == 0x03:
-                device._preset_mode = 'high'
-            elif response_dict["data1"] == 0x00:
-                device._preset_mode = 'auto'
-        device.async_write_ha_state()
-        print(device._preset_mode)
+    def update_state(self, frame):
+        _LOGGER.debug("新风收到状态响应: %s", frame)
+        if frame.hvac_type == HvacType.FRESH_AIR_MODE:
+            if frame.data1 == 0x00:
+                self._state = False
+        elif frame.hvac_type == HvacType.FRESH_AIR_SPEED:
+            self._state = True
+            if frame.data1 == 0x01:
+                self._preset_mode = 'low'
+            elif frame.data1 == 0x02:
+                self._preset_mode = 'medium'
+            elif frame.data1 == 0x03:
+                self._preset_mode = 'high'
+            elif frame.data1 == 0x00:
+                self._preset_mode = 'auto'
+        self.async_write_ha_state_if_changed()
 
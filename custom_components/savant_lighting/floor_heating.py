@@ -10,6 +10,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .frame_record import HvacType
 from .command_helper import ClimateCommand
 from .send_command import *
 
@@ -19,9 +21,11 @@ SCAN_INTERVAL = timedelta(seconds=60)
 SUPPORTED_HVAC_MODES = [HVACMode.OFF, HVACMode.HEAT]
 SUPPORTED_FAN_MODES = [FAN_LOW, FAN_MEDIUM, FAN_HIGH, FAN_AUTO]
 
-class SavantFloorHeating(ClimateEntity):
+class SavantFloorHeating(StateWriteMixin, ClimateEntity):
     """Representation of a Savant Climate (AC)."""
 
+    _written_fields = ("_state", "_target_temperature", "_current_temperature")
+
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
         """Initialize the climate entity."""
         self._attr_name = name
@@ -34,13 +38,13 @@ class SavantFloorHeating(ClimateEntity):
         self._target_temperature = 24.0
         self._fan_mode = "auto"
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("floor_heating", self.update_state)
         self.command = ClimateCommand(host,module_address,loop_address)
         
     async def async_added_to_hass(self):
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
         self.hass.async_create_task(self.async_update())
         self.async_write_ha_state()
-        
+
     @property
     def unique_id(self):
         """Return a unique ID for this climate entity."""
@@ -113,9 +117,7 @@ class SavantFloorHeating(ClimateEntity):
         if hvac_mode in SUPPORTED_HVAC_MODES:
             self._state = hvac_mode
             command = self.command.floor_heat_mode(hvac_mode)
-            for cmd in command:
-                await self.tcp_manager.send_command(cmd)
-                await asyncio.sleep(0.5)
+            await self.tcp_manager.send_command_list(command, context=self._context)
             self.async_write_ha_state()
 
     async def async_set_temperature(self, **kwargs):
@@ -123,23 +125,21 @@ class SavantFloorHeating(ClimateEntity):
         if temperature is not None:
             self._target_temperature = temperature
             command = self.command.floor_heat_temperature(f"temp:{temperature}")
-            await self.tcp_manager.send_command(command)
-            await asyncio.sleep(0.5)
+            await self.tcp_manager.send_command(command, context=self._context)
             self.async_write_ha_state()
 
     async def async_update(self):
         return
 
-    def update_state(self, response_dict):
-        print('地暖收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict['hvac_type'] == "hvac_05":
-            if response_dict["data1"] == 0x00:
-                device._state = HVACMode.OFF
-            elif response_dict["data1"] in (0X01,0X11):
-                device._state = HVACMode.HEAT
-        elif response_dict['hvac_type'] == "hvac_06":
-            device._target_temperature = response_dict["data1"]
-        elif response_dict['hvac_type'] == "hvac_09":
-            device._current_temperature = response_dict["data1"]
-        device.async_write_ha_state()
+    def update_state(self, frame):
+        _LOGGER.debug("地暖收到状态响应: %s", frame)
+        if frame.hvac_type == HvacType.FLOOR_MODE:
+            if frame.data1 == 0x00:
+                self._state = HVACMode.OFF
+            elif frame.data1 in (0X01,0X11):
+                self._state = HVACMode.HEAT
+        elif frame.hvac_type == HvacType.FLOOR_SET_POINT:
+            self._target_temperature = frame.data1
+        elif frame.hvac_type == HvacType.CURRENT_TEMP:
+            self._current_temperature = frame.data1
+        self.async_write_ha_state_if_changed()
@@ -0,0 +1,112 @@
+from collections import namedtuple
+
+from .frame_record import HvacType
+
+# 单帧（13 字节）状态响应的分类表
+#
+# 原来 _parse_response 每次都重建十个地址列表，再用一长串 elif 做线性查找。
+# 这里在导入时把所有规则展开成字典，键为 (data4, data2, data3, 回路地址)，
+# 其中 None 表示该位置不参与匹配。分类时按固定顺序最多查 6 次字典，
+# 与支持的设备种类数量无关。
+
+ANY = None
+
+FrameRule = namedtuple(
+    "FrameRule",
+    ["device_type", "sub_device_type", "hvac_type", "redirect_type", "loop_transform"],
+)
+
+
+# 回路地址转换，参数为 (回路地址, data2, data3)，返回 (回路地址, 按键序号)
+def _loop_same(loop, data2, data3):
+    return loop, ""
+
+
+def _loop_minus_1(loop, data2, data3):
+    return loop - 1, ""
+
+
+def _loop_minus_2(loop, data2, data3):
+    return loop - 2, ""
+
+
+def _loop_shade(loop, data2, data3):
+    return (loop - 17) // 3, ""
+
+
+def _loop_from_data2(loop, data2, data3):
+    return data2, ""
+
+
+def _loop_from_data3(loop, data2, data3):
+    return data3, ""
+
+
+def _loop_8button(loop, data2, data3):
+    return data3, data2
+
+
+def _rule(device_type, sub_device_type="", hvac_type=HvacType.NONE, redirect_type=None, loop_transform=_loop_same):
+    return FrameRule(device_type, sub_device_type, hvac_type, redirect_type, loop_transform)
+
+
+# 空调/地暖/新风每个内机占 9 个地址，第 k 个内机的第 n 项为 9 * k + n
+def _hvac_addresses(offset):
+    return [9 * k + offset for k in range(16)]
+
+
+SHADE_ADDRESSES = [0x14 + 3 * k for k in range(15)]
+
+HVAC_RULES = [
+    # (data4, 规则)，地址偏移即 HvacType 的数值
+    (0x20, _rule("climate", hvac_type=HvacType.OFF, loop_transform=_loop_from_data3)),
+    (0x20, _rule("climate", hvac_type=HvacType.MODE, loop_transform=_loop_from_data3)),
+    (0x20, _rule("climate", hvac_type=HvacType.FAN, loop_transform=_loop_from_data3)),
+    (0x20, _rule("climate", hvac_type=HvacType.SET_POINT, loop_transform=_loop_from_data3)),
+    (0x20, _rule("climate", hvac_type=HvacType.CURRENT_TEMP, redirect_type="floor_heating", loop_transform=_loop_from_data3)),
+    (0x21, _rule("floor_heating", hvac_type=HvacType.FLOOR_MODE, loop_transform=_loop_from_data3)),
+    (0x21, _rule("floor_heating", hvac_type=HvacType.FLOOR_SET_POINT, loop_transform=_loop_from_data3)),
+    (0x22, _rule("fresh_air", hvac_type=HvacType.FRESH_AIR_MODE, loop_transform=_loop_from_data3)),
+    (0x22, _rule("fresh_air", hvac_type=HvacType.FRESH_AIR_SPEED, loop_transform=_loop_from_data3)),
+]
+
+
+def _build_table():
+    table = {
+        # 继电器状态，同时转给带计量的继电器
+        (0x00, 0x00, 0x00, ANY): _rule("switch", redirect_type="switch_with_energy"),
+        # 人体感应，回路地址在 data2
+        (0x00, ANY, 0x00, 0x00): _rule("person_sensor", loop_transform=_loop_from_data2),
+        # 8 键开关，按键序号在 data2，回路地址在 data3
+        (0x00, ANY, ANY, 0x00): _rule("8button", loop_transform=_loop_8button),
+        (0x11, 0x00, 0x00, ANY): _rule("light", sub_device_type="DALI-01"),
+        (0x12, 0x00, 0x00, ANY): _rule("light", sub_device_type="DALI-01", loop_transform=_loop_minus_1),
+        (0x15, ANY, ANY, ANY): _rule("light", sub_device_type="DALI-02"),
+        (0x13, ANY, ANY, ANY): _rule("light", sub_device_type="rgb", loop_transform=_loop_minus_2),
+        (0x10, 0x00, 0x00, ANY): _rule("light", sub_device_type="0603D"),
+    }
+    for loop in SHADE_ADDRESSES:
+        table[(0x00, 0x04, 0x00, loop)] = _rule("curtain", loop_transform=_loop_shade)
+    for data4, rule in HVAC_RULES:
+        for loop in _hvac_addresses(rule.hvac_type):
+            table[(data4, 0x00, ANY, loop)] = rule
+    return table
+
+
+FRAME_TABLE = _build_table()
+
+
+def classify_frame(data2, data3, data4, loop_address):
+    """返回单帧对应的分类规则，无法识别时返回 None
+
+    查找顺序与原 elif 链的优先级一致：越具体的键越先匹配。
+    """
+    table = FRAME_TABLE
+    return (
+        table.get((data4, data2, data3, loop_address))
+        or table.get((data4, data2, data3, ANY))
+        or table.get((data4, ANY, data3, loop_address))
+        or table.get((data4, ANY, ANY, loop_address))
+        or table.get((data4, data2, ANY, loop_address))
+        or table.get((data4, ANY, ANY, ANY))
+    )
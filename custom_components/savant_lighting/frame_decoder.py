@@ -0,0 +1,83 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_HEAD = 0xAC
+FRAME_TAIL = 0xCA
+HEADER_LENGTH = 8          # AC 主机 xx xx 模块 回路 xx 长度
+LENGTH_OFFSET = 7          # 数据长度字节位置
+MIN_PAYLOAD_LENGTH = 4     # 状态帧至少有 d1~d4，更短的是网关回显的 B0 查询帧
+MAX_PAYLOAD_LENGTH = 0x50  # 目前最长的是 0x50 能耗帧
+MAX_BUFFER_SIZE = 4096
+
+
+class FrameDecoder:
+    """网关 TCP 数据流的增量帧解码器
+
+    网关在高负载时会把多个帧合并到一个 TCP 段，或把一个帧拆到多个段中。
+    feed() 把收到的字节追加到缓冲区，按 AC...CA 帧头帧尾和偏移 7 的长度字节
+    切出完整帧，以 memoryview 切片的形式逐个返回，不完整的尾部留到下次拼接。
+    数据不足 4 字节的帧（查询帧回显）不返回，解析时不必再检查长度。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.discarded_bytes = 0
+
+    def feed(self, data):
+        """追加收到的数据，并逐个返回其中的完整帧"""
+        buffer = self._buffer
+        buffer += data
+        view = memoryview(buffer)
+        size = len(buffer)
+        pos = 0
+        try:
+            while pos < size:
+                start = buffer.find(FRAME_HEAD, pos)
+                if start < 0:
+                    # 没有帧头，整段都是无效数据（如心跳回显）
+                    self.discarded_bytes += size - pos
+                    pos = size
+                    break
+                if start > pos:
+                    self.discarded_bytes += start - pos
+                    pos = start
+                if size - pos < HEADER_LENGTH:
+                    break
+                length = buffer[pos + LENGTH_OFFSET]
+                if length > MAX_PAYLOAD_LENGTH:
+                    # 长度不合理，说明这个 AC 不是帧头，跳过后重新同步
+                    self.discarded_bytes += 1
+                    pos += 1
+                    continue
+                end = pos + HEADER_LENGTH + length + 1
+                if end > size:
+                    break
+                if buffer[end - 1] != FRAME_TAIL:
+                    self.discarded_bytes += 1
+                    pos += 1
+                    continue
+                if length < MIN_PAYLOAD_LENGTH:
+                    # 格式完整但没有状态数据（如我们发出的查询帧的回显），整帧丢弃
+                    self.discarded_bytes += end - pos
+                    pos = end
+                    continue
+                yield view[pos:end]
+                pos = end
+        finally:
+            # 剩余的半帧复制到新的缓冲区，已返回的切片继续引用旧缓冲区，不会失效
+            remainder = buffer[pos:]
+            if len(remainder) > MAX_BUFFER_SIZE:
+                _LOGGER.warning("接收缓冲区超过 %s 字节，丢弃未完成的数据", MAX_BUFFER_SIZE)
+                self.discarded_bytes += len(remainder)
+                remainder = bytearray()
+            self._buffer = remainder
+
+    def reset(self):
+        """清空缓冲区，重新连接时调用"""
+        self._buffer = bytearray()
+
+    @property
+    def pending(self):
+        """缓冲区中等待拼接的字节数"""
+        return len(self._buffer)
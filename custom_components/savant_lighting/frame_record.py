@@ -0,0 +1,99 @@
+from enum import IntEnum
+
+
+class HvacType(IntEnum):
+    """空调/地暖/新风帧的子类型，数值即地址偏移（第 k 个内机的第 n 项为 9 * k + n）"""
+    NONE = 0
+    OFF = 1               # hvac_01 空调开关
+    MODE = 2              # hvac_02 空调模式
+    FAN = 3               # hvac_03 空调风速
+    SET_POINT = 4         # hvac_04 空调设定温度
+    FLOOR_MODE = 5        # hvac_05 地暖开关
+    FLOOR_SET_POINT = 6   # hvac_06 地暖设定温度
+    FRESH_AIR_MODE = 7    # hvac_07 新风开关
+    FRESH_AIR_SPEED = 8   # hvac_08 新风风速
+    CURRENT_TEMP = 9      # hvac_09 室温
+
+
+class Frame:
+    """解析后的单个回路状态，替代原来每帧构建的 response_dict"""
+
+    __slots__ = (
+        "module_address",
+        "loop_address",
+        "data1",
+        "data2",
+        "data3",
+        "data4",
+        "device_type",
+        "sub_device_type",
+        "hvac_type",
+        "button_index",
+        "redirect_type",
+    )
+
+    def __init__(self, module_address, loop_address, data1, data2, data3, data4,
+                 device_type="", sub_device_type="", hvac_type=HvacType.NONE,
+                 button_index="", redirect_type=None):
+        self.module_address = module_address
+        self.loop_address = loop_address
+        self.data1 = data1
+        self.data2 = data2
+        self.data3 = data3
+        self.data4 = data4
+        self.device_type = device_type
+        self.sub_device_type = sub_device_type
+        self.hvac_type = hvac_type
+        self.button_index = button_index
+        self.redirect_type = redirect_type
+
+    @property
+    def unique_id(self):
+        """对应实体的 unique_id"""
+        if self.device_type == "8button":
+            return f"{self.module_address}_{self.loop_address}_{self.button_index}_{self.device_type}"
+        return f"{self.module_address}_{self.loop_address}_{self.device_type}"
+
+    def __repr__(self):
+        return (
+            f"Frame({self.device_type} {self.module_address}_{self.loop_address} "
+            f"data={self.data1:02X}{self.data2:02X}{self.data3:02X}{self.data4:02X} "
+            f"hvac={self.hvac_type.name})"
+        )
+
+
+class EnergyFrame:
+    """0x50 能耗帧中单个回路的开关状态和计量值"""
+
+    __slots__ = (
+        "module_address",
+        "loop_address",
+        "device_type",
+        "state",
+        "voltage",
+        "current",
+        "power",
+        "energy",
+    )
+
+    def __init__(self, module_address, loop_address, state=False,
+                 voltage=0.0, current=0.0, power=0.0, energy=0.0):
+        self.module_address = module_address
+        self.loop_address = loop_address
+        self.device_type = "switch_with_energy"
+        self.state = state
+        self.voltage = voltage
+        self.current = current
+        self.power = power
+        self.energy = energy
+
+    @property
+    def unique_id(self):
+        """对应实体的 unique_id"""
+        return f"{self.module_address}_{self.loop_address}_{self.device_type}"
+
+    def __repr__(self):
+        return (
+            f"EnergyFrame({self.module_address}_{self.loop_address} state={self.state} "
+            f"V={self.voltage} A={self.current} W={self.power} kWh={self.energy})"
+        )
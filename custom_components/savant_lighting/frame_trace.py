@@ -0,0 +1,26 @@
+import time
+from collections import deque
+
+TX = "TX"
+RX = "RX"
+
+
+class FrameTrace:
+    """收发帧的有界二进制记录
+
+    替代逐帧 print / 调试日志：只保存原始字节和时间戳，不做任何格式化，
+    满了丢弃最早的记录；导出诊断信息时才转成十六进制文本。
+    """
+
+    def __init__(self, size):
+        self._frames = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def record(self, direction, data):
+        self._frames.append((time.time(), direction, bytes(data)))
+
+    def dump(self):
+        """按时间顺序导出为 "时间戳 方向 十六进制帧" 文本"""
+        return [f"{timestamp:.3f} {direction} {data.hex().upper()}" for timestamp, direction, data in self._frames]
@@ -11,6 +11,8 @@ from homeassistant.const import ATTR_TEMPERATURE,UnitOfTemperature
 from datetime import timedelta
 
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .frame_record import HvacType
 from .command_helper import FreshAirCommand
 from .send_command import *
 
@@ -22,9 +24,11 @@ SCAN_INTERVAL = timedelta(seconds=60)
 SUPPORTED_SPEEDS = [FAN_AUTO,FAN_HIGH,FAN_LOW,FAN_MEDIUM]
 SUPPORTED_MODES = [HVACMode.OFF, HVACMode.FAN_ONLY]
 
-class SavantFreshAirAC(ClimateEntity):
+class SavantFreshAirAC(StateWriteMixin, ClimateEntity):
     """Representation of a Savant Fresh Air AC."""
 
+    _written_fields = ("_state", "_speed")
+
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
         """Initialize the climate entity."""
         self._attr_name = name
@@ -37,9 +41,12 @@ class SavantFreshAirAC(ClimateEntity):
         self._attr_temperature_unit = None
         self._attr_current_temperature = None
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("fresh_air_ac", self.update_state)
         self.command = FreshAirCommand(host,module_address,loop_address)
 
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+
     @property
     def unique_id(self):
         """Return a unique ID for this AC."""
@@ -98,7 +105,7 @@ class SavantFreshAirAC(ClimateEntity):
             self._state = hvac_mode
             self._speed = FAN_AUTO
             hex_command = self._command_to_hex(STATE_ON, self._speed)
-        await self.tcp_manager.send_command_list(hex_command)
+        await self.tcp_manager.send_command_list(hex_command, context=self._context)
         self.async_write_ha_state()
             
     async def async_set_fan_mode(self, fan_mode: str):
@@ -107,7 +114,7 @@ class SavantFreshAirAC(ClimateEntity):
             self._speed = fan_mode
             if self._state == HVACMode.FAN_ONLY:
                 hex_command = self._command_to_hex(STATE_ON, self._speed)
-                await self.tcp_manager.send_command_list(hex_command)
+                await self.tcp_manager.send_command_list(hex_command, context=self._context)
             self.async_write_ha_state()
         else:
             _LOGGER.error(f"Unsupported fan mode: {fan_mode}")
@@ -142,30 +149,26 @@ class SavantFreshAirAC(ClimateEntity):
         module_bytes = bytes.fromhex(module_hex)
         return [host_bytes + module_bytes + bytes.fromhex(cmd) for cmd in command_list]
 
-    def update_state(self, response_dict):
-        print('新风收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict['hvac_type'] == "hvac_07":
-            if response_dict["data1"] == 0x00:
-                device._state = False
-        elif response_dict['hvac_type'] == "hvac_08":
-            device._state = True
-            if response_dict["data1"] == 0x01:
-                device._speed = 'low'
-                device._speed_percentage = 20
-            elif response_dict["data1"] == 0x02:
-                device._speed = 'medium'
-                device._speed_percentage = 50
-            elif response_dict["data1"] == 0x03:
-                device._speed = 'high'
-                device._speed_percentage = 80
-            elif response_dict["data1"] == 0x00:
-                device._speed = 'auto'
-                device._speed_percentage = 0
-        device.async_write_ha_state()
-        print(device._speed)
-        print(device._speed_percentage)
-        print('')
+    def update_state(self, frame):
+        _LOGGER.debug("新风收到状态响应: %s", frame)
+        if frame.hvac_type == HvacType.FRESH_AIR_MODE:
+            if frame.data1 == 0x00:
+                self._state = False
+        elif frame.hvac_type == HvacType.FRESH_AIR_SPEED:
+            self._state = True
+            if frame.data1 == 0x01:
+                self._speed = 'low'
+                self._speed_percentage = 20
+            elif frame.data1 == 0x02:
+                self._speed = 'medium'
+                self._speed_percentage = 50
+            elif frame.data1 == 0x03:
+                self._speed = 'high'
+                self._speed_percentage = 80
+            elif frame.data1 == 0x00:
+                self._speed = 'auto'
+                self._speed_percentage = 0
+        self.async_write_ha_state_if_changed()
         # """Update the state of the fan based on the response."""
         # _LOGGER.debug(f"Fresh Air Fan received state response: {response_dict}")
         # self._is_on = response_dict.get("state") == STATE_ON
@@ -6,6 +6,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
 from .command_helper import LightCommand
 from .send_command import *
 
@@ -14,10 +16,13 @@ SCAN_INTERVAL = timedelta(seconds=60)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Light entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
+    await async_setup_platform(hass, entry, "light", create_entities, async_add_entities)
 
-    lights = [
+def create_entities(device, tcp_manager):
+    """按设备配置创建灯光实体，选项流程增加设备时也调用"""
+    if device["type"] != "light":
+        return []
+    return [
         SavantLight(
             name=device["name"],
             module_address=device["module_address"],
@@ -26,15 +31,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
             host=device["host"],
             port=device["port"],
             sub_device_type=device["sub_device_type"],
-            tcp_manager=config["tcp_manager"]
+            tcp_manager=tcp_manager
         )
-        for device in devices if device["type"] == "light"
     ]
-    async_add_entities(lights, update_before_add=True)
 
-class SavantLight(LightEntity):
+class SavantLight(StateWriteMixin, LightEntity):
     """Representation of a Savant Light."""
 
+    _written_fields = ("_state", "_brightness", "_color_temp_kelvin", "_rgb_color")
+
     def __init__(self, name, module_address, loop_address, gradient_time, host, port, sub_device_type, tcp_manager):
         """Initialize the Savant Light."""
         self._attr_name = name
@@ -49,7 +54,6 @@ class SavantLight(LightEntity):
         self._last_known_state = None
         self._is_online = True
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("light", self.update_state)
         self.command = LightCommand(host,module_address,loop_address,gradient_time)
         if self._sub_device_type == "rgb":
             self._color_temp_mireds = 370
@@ -69,12 +73,15 @@ class SavantLight(LightEntity):
             self._color_temp_kelvin = int(1000000 / 370)  # converting mireds to kelvin
             self._attr_min_color_temp_kelvin = int(1000000 / 667)  # converting max mireds to kelvin
             self._attr_max_color_temp_kelvin = int(1000000 / 152)  # converting min mireds to kelvin
+            self._color_mode = ColorMode.COLOR_TEMP
             self._supported_color_modes = {ColorMode.COLOR_TEMP}
         elif self._sub_device_type in ("single", "0603D"):
+            self._color_mode = ColorMode.BRIGHTNESS
             self._supported_color_modes = {ColorMode.BRIGHTNESS}
 
     async def async_added_to_hass(self):
         """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
         self.hass.async_create_task(self.async_update())
         self.async_write_ha_state()
 
@@ -175,13 +182,13 @@ class SavantLight(LightEntity):
             command_list.append(hex_command)
 
         self.async_write_ha_state()
-        await self.tcp_manager.send_command_list(command_list)
+        await self.tcp_manager.send_batch(command_list, context=self._context)
 
 
     async def async_turn_off(self, **kwargs):
         self._state = False
         self.async_write_ha_state()
-        await self.tcp_manager.send_command(self.command.turnonoff("off"))
+        await self.tcp_manager.send_command(self.command.turnonoff("off"), context=self._context)
 
 
     async def async_update(self):
@@ -189,45 +196,43 @@ class SavantLight(LightEntity):
         # self.async_write_ha_state()
         return
 
-    def update_state(self, response_dict):
-        print('DALI收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
+    def update_state(self, frame):
+        _LOGGER.debug("DALI收到状态响应: %s", frame)
 
-        if response_dict['sub_device_type'] == 'DALI-01' and response_dict['data4'] == 0x11:
-            device._brightness = response_dict['data1'] * 255 / 100
-            if response_dict['data1'] == 0x00:
-                device._state = False
+        if frame.sub_device_type == 'DALI-01' and frame.data4 == 0x11:
+            self._brightness = frame.data1 * 255 / 100
+            if frame.data1 == 0x00:
+                self._state = False
             else:
-                device._state = True
-
-        elif response_dict['sub_device_type'] == 'DALI-01' and response_dict['data4'] == 0x12:
-            if response_dict['data1'] != 0x00:
-                device._color_temp_mireds = 1000000/(response_dict['data1']*100)
-                device._color_temp_kelvin = int(1000000 / device._color_temp_mireds)
-
-        elif response_dict['sub_device_type'] == 'rgb' and response_dict['data4'] == 0x13:
-            if response_dict['data1'] != 0x00:
-                device._rgb_color = (
-                response_dict['data1'],  # R 值
-                response_dict['data2'],  # G 值
-                response_dict['data3']   # B 值
+                self._state = True
+
+        elif frame.sub_device_type == 'DALI-01' and frame.data4 == 0x12:
+            if frame.data1 != 0x00:
+                self._color_temp_mireds = 1000000/(frame.data1*100)
+                self._color_temp_kelvin = int(1000000 / self._color_temp_mireds)
+
+        elif frame.sub_device_type == 'rgb' and frame.data4 == 0x13:
+            if frame.data1 != 0x00:
+                self._rgb_color = (
+                frame.data1,  # R 值
+                frame.data2,  # G 值
+                frame.data3   # B 值
                 )
-                device._state = True
-                device.async_write_ha_state()
-        elif response_dict['sub_device_type'] == 'DALI-02' and response_dict['data4'] == 0x15:
-            device._brightness = response_dict['data1'] * 255 / 100
-            if response_dict['data1'] == 0x00:
-                device._state = False
+                self._state = True
+        elif frame.sub_device_type == 'DALI-02' and frame.data4 == 0x15:
+            self._brightness = frame.data1 * 255 / 100
+            if frame.data1 == 0x00:
+                self._state = False
             else:
-                device._state = True
-            if response_dict['data2'] != 0x00:
-                device._color_temp_mireds = 1000000/(response_dict['data2']*100)
-                device._color_temp_kelvin = int(1000000 / device._color_temp_mireds)
-
-        elif response_dict['sub_device_type'] == '0603D' and response_dict['data4'] == 0x10:
-            device._brightness = response_dict['data1'] * 255 / 100
-            if response_dict['data1'] == 0x00:
-                device._state = False
+                self._state = True
+            if frame.data2 != 0x00:
+                self._color_temp_mireds = 1000000/(frame.data2*100)
+                self._color_temp_kelvin = int(1000000 / self._color_temp_mireds)
+
+        elif frame.sub_device_type == '0603D' and frame.data4 == 0x10:
+            self._brightness = frame.data1 * 255 / 100
+            if frame.data1 == 0x00:
+                self._state = False
             else:
-                device._state = True
-        device.async_write_ha_state()
+                self._state = True
+        self.async_write_ha_state_if_changed()
@@ -2,7 +2,25 @@ from homeassistant import config_entries
 import voluptuous as vol
 from homeassistant.core import callback
 from homeassistant.helpers import device_registry as dr, entity_registry as er, selector
-from .const import DOMAIN
+from .const import (
+    CONF_ACK_PACING,
+    CONF_COLLECT_WINDOW_MS,
+    CONF_ENERGY_POLL_INTERVAL,
+    CONF_ENERGY_POLL_MAX_INTERVAL,
+    CONF_ENERGY_POLL_MIN_INTERVAL,
+    CONF_ENERGY_RECORD_INTERVAL,
+    CONF_FRAME_GAP_MS,
+    CONF_FRAME_TRACE_SIZE,
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_MODULE_MAX,
+    DISCOVERY_MODULE_MIN,
+    DOMAIN,
+)
+from .connection_pool import CONNECTION_DEFAULTS, connection_options
+from .device_catalog import device_param
+from .discovery import discover
+from .device_manifest import FORMAT_CSV, FORMAT_YAML, ManifestError, dump_manifest, parse_manifest
+from .topology import async_add_device, async_add_devices, async_remove_device, async_update_device, entry_catalog
 from homeassistant.components.light import ColorMode
 import logging
 
@@ -18,6 +36,7 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         self.port = config_entry.data.get("port")
         self.device_type = None  # 用于存储当前正在配置的设备类型
         self.sub_device_type = None # 用于存储当前正在配置的设备子类型
+        self.manifest = ""  # 批量导入的预填清单，发现扫描的结果
 
     async def async_step_init(self, user_input=None):
         """Manage the options for devices: add or manage devices."""
@@ -66,6 +85,10 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
                 "curtain_menu": "管理窗帘",
                 "person_sensor_menu": "管理人体传感器",
                 "scene_switch_menu": "管理场景开关",
+                "discover": "扫描总线发现设备",
+                "bulk_import": "批量导入设备",
+                "bulk_export": "导出设备清单",
+                "connection_settings": "连接与轮询设置",
             },
             description_placeholders={"desc": "选择操作来管理子设备"},
         )
@@ -143,29 +166,19 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
             entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
             if not entry:
                 raise ValueError("Configuration entry not found")
-            devices = entry.data.get("devices", [])
+            catalog = entry_catalog(self.hass, entry)
 
              # 检查是否有重复的 module_address 和 loop_address
             if self.device_type == 'scene_switch':
                 user_input["module_address"] = 'scene' + str(user_input['scene_number'])
                 user_input["loop_address"] = 'scene' + str(user_input['scene_number'])
 
-            for exist_device in devices:
-                if self.device_type in ['fresh_air', 'floor_heating', 'climate', 'switch_with_energy','switch']:
-                    if (exist_device["module_address"] == user_input["module_address"] \
-                        and exist_device["loop_address"] == user_input["loop_address"]) \
-                        and (exist_device["type"] == self.device_type):
-                    # 发现重复，返回提示信息
-                        return self.async_abort(
-                            reason=f"地址重复，当前已分配[{exist_device['type']}：{exist_device['name']}], 请更改后重试。",
-                        )
-                else:
-                    if (exist_device["module_address"] == user_input["module_address"] \
-                        and exist_device["loop_address"] == user_input["loop_address"]):
-                        # 发现重复，返回提示信息
-                        return self.async_abort(
-                            reason=f"地址重复，当前已分配[{exist_device['type']}：{exist_device['name']}], 请更改后重试。",
-                        )
+            exist_device = catalog.conflict(self.device_type, user_input["module_address"], user_input["loop_address"])
+            if exist_device is not None:
+                # 发现重复，返回提示信息
+                return self.async_abort(
+                    reason=f"地址重复，当前已分配[{exist_device['type']}：{exist_device['name']}], 请更改后重试。",
+                )
 
             device_data = {
                 "type": self.device_type,
@@ -183,13 +196,8 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
             if self.device_type == 'scene_switch':
                 device_data["scene_number"] = user_input["scene_number"]
 
-            devices.append(device_data)
-
-            self.hass.config_entries.async_update_entry(
-                self.config_entry, data={"devices": devices, "host": host, "port": port}
-            )
             await self._register_device_and_entity(device_data, device_type=self.device_type)
-            result = self.async_create_entry(title=f"{self.device_type.capitalize()} Added",data=device_data)
+            result = self.async_create_entry(title=f"{self.device_type.capitalize()} Added", data=self._options())
             return result
 
         if self.device_type == 'light':
@@ -240,13 +248,13 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         if self.device_type == 'scene_switch':
             data_schema = vol.Schema({
                 vol.Required("selected_device"): vol.In(
-                    {f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}": f"{device['name']} (场景号：{device['scene_number']})" for device in devices}
+                    {device_param(device): f"{device['name']} (场景号：{device['scene_number']})" for device in devices}
                 )
             })
         else:
             data_schema = vol.Schema({
                 vol.Required("selected_device"): vol.In(
-                    {f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}": f"{device['name']} (模块地址：{device['module_address']}, 回路地址：{device['loop_address']})" for device in devices}
+                    {device_param(device): f"{device['name']} (模块地址：{device['module_address']}, 回路地址：{device['loop_address']})" for device in devices}
                 )
             })
 
@@ -264,18 +272,18 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             selected_device = user_input["selected_device"]
             await self._delete_device(selected_device)
-            return self.async_create_entry(title="Device Deleted", data={})
+            return self.async_create_entry(title="Device Deleted", data=self._options())
 
         if self.device_type == 'scene_switch':
             data_schema = vol.Schema({
                 vol.Required("selected_device"): vol.In(
-                    {f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}": f"{device['name']} (场景号：{device['scene_number']})" for device in devices}
+                    {device_param(device): f"{device['name']} (场景号：{device['scene_number']})" for device in devices}
                 )
             })
         else:
             data_schema = vol.Schema({
                 vol.Required("selected_device"): vol.In(
-                    {f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}": f"{device['name']} (模块地址：{device['module_address']}, 回路地址：{device['loop_address']})" for device in devices}
+                    {device_param(device): f"{device['name']} (模块地址：{device['module_address']}, 回路地址：{device['loop_address']})" for device in devices}
                 )
             })
 
@@ -307,7 +315,7 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
                 updated_device_data["selected_buttons"] = user_input["selected_buttons"]
             # 更新设备数据到配置条目中
             await self._update_device_config(selected_device_data, updated_device_data)
-            return self.async_create_entry(title="Device Configured", data={})
+            return self.async_create_entry(title="Device Configured", data=self._options())
 
         # 预填充当前设备数据
         if self.device_type == "light":
@@ -346,10 +354,134 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
             description_placeholders=description_placeholders
         )
 
-    async def _register_device_and_entity(self, device_data, device_type):
+    async def async_step_bulk_import(self, user_input=None):
+        """Import devices from a CSV or YAML manifest."""
+        errors = {}
+        placeholders = {"errors": ""}
+        if user_input is not None:
+            entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
+            if not entry:
+                raise ValueError("Configuration entry not found")
+            try:
+                devices = parse_manifest(user_input["manifest"], self.host, self.port, entry_catalog(self.hass, entry))
+            except ManifestError as e:
+                errors["manifest"] = "invalid_manifest"
+                placeholders["errors"] = "\n".join(e.errors[:20])
+            else:
+                # 整份清单校验通过后一次写入配置条目，不逐个添加、也不重新加载
+                for device_data in devices:
+                    self._register_device(device_data, device_data["type"])
+                await async_add_devices(self.hass, entry, devices)
+                return self.async_create_entry(title=f"{len(devices)} Devices Imported", data=self._options())
+
+        return self.async_show_form(
+            step_id="bulk_import",
+            data_schema=vol.Schema({
+                vol.Required("manifest", default=(user_input or {}).get("manifest", self.manifest)): selector.TextSelector(
+                    selector.TextSelectorConfig(multiline=True)
+                ),
+            }),
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_discover(self, user_input=None):
+        """Sweep a module address range and pre-fill the bulk import with the devices found."""
+        errors = {}
+        if user_input is not None:
+            entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
+            if not entry:
+                raise ValueError("Configuration entry not found")
+            config = self.hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if config is None or not config["tcp_manager"].is_connected:
+                errors["base"] = "cannot_connect"
+            elif user_input["module_start"] > user_input["module_end"]:
+                errors["base"] = "invalid_range"
+            else:
+                devices = await discover(
+                    config["tcp_manager"],
+                    range(user_input["module_start"], user_input["module_end"] + 1),
+                    concurrency=user_input["concurrency"],
+                )
+                # 已配置的地址不再列出
+                catalog = entry_catalog(self.hass, entry)
+                devices = [device for device in devices if catalog.conflict(device["type"], device["module_address"], device["loop_address"]) is None]
+                if not devices:
+                    return self.async_abort(reason="未发现新的设备")
+                self.manifest = dump_manifest(devices)
+                return await self.async_step_bulk_import()
+
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema({
+                vol.Required("module_start", default=DISCOVERY_MODULE_MIN): vol.All(int, vol.Range(min=1, max=255)),
+                vol.Required("module_end", default=DISCOVERY_MODULE_MAX): vol.All(int, vol.Range(min=1, max=255)),
+                vol.Required("concurrency", default=DISCOVERY_CONCURRENCY): vol.All(int, vol.Range(min=1, max=16)),
+            }),
+            errors=errors,
+        )
+
+    async def async_step_connection_settings(self, user_input=None):
+        """Tune frame pacing, the collect window, energy polling and the frame trace."""
+        errors = {}
+        if user_input is not None:
+            if not (
+                user_input[CONF_ENERGY_POLL_MIN_INTERVAL]
+                <= user_input[CONF_ENERGY_POLL_INTERVAL]
+                <= user_input[CONF_ENERGY_POLL_MAX_INTERVAL]
+            ):
+                errors["base"] = "invalid_poll_interval"
+            else:
+                # 帧间隔留空时不保存，按网关应答时间自动校准；保存后由更新监听重新加载配置条目
+                options = {key: value for key, value in self._options().items() if key not in CONNECTION_DEFAULTS}
+                options.update(user_input)
+                return self.async_create_entry(title="Connection Settings", data=options)
+
+        current = {**connection_options(self.config_entry), **(user_input or {})}
+        return self.async_show_form(
+            step_id="connection_settings",
+            data_schema=vol.Schema({
+                vol.Optional(CONF_FRAME_GAP_MS, description={"suggested_value": current[CONF_FRAME_GAP_MS]}): vol.All(int, vol.Range(min=0, max=1000)),
+                vol.Required(CONF_ACK_PACING, default=current[CONF_ACK_PACING]): bool,
+                vol.Required(CONF_COLLECT_WINDOW_MS, default=current[CONF_COLLECT_WINDOW_MS]): vol.All(int, vol.Range(min=0, max=100)),
+                vol.Required(CONF_ENERGY_POLL_INTERVAL, default=current[CONF_ENERGY_POLL_INTERVAL]): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_ENERGY_POLL_MIN_INTERVAL, default=current[CONF_ENERGY_POLL_MIN_INTERVAL]): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_ENERGY_POLL_MAX_INTERVAL, default=current[CONF_ENERGY_POLL_MAX_INTERVAL]): vol.All(int, vol.Range(min=1)),
+                vol.Required(CONF_ENERGY_RECORD_INTERVAL, default=current[CONF_ENERGY_RECORD_INTERVAL]): vol.All(int, vol.Range(min=0)),
+                vol.Required(CONF_FRAME_TRACE_SIZE, default=current[CONF_FRAME_TRACE_SIZE]): vol.All(int, vol.Range(min=0, max=10000)),
+            }),
+            errors=errors,
+        )
+
+    def _options(self):
+        """配置条目当前的选项，设备管理步骤结束时原样保存"""
+        entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
+        return dict((entry or self.config_entry).options)
+
+    async def async_step_bulk_export(self, user_input=None):
+        """Export the device list as a manifest that bulk_import accepts."""
+        entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
+        if not entry:
+            raise ValueError("Configuration entry not found")
+        if user_input is not None and "manifest" in user_input:
+            return self.async_create_entry(title="Devices Exported", data=self._options())
+        fmt = (user_input or {}).get("format", FORMAT_CSV)
+        # 第一次选择格式，之后在文本框中显示清单，复制后提交即可结束
+        schema = {
+            vol.Required("format", default=fmt): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=[FORMAT_CSV, FORMAT_YAML], mode=selector.SelectSelectorMode.LIST)
+            ),
+        }
+        if user_input is not None:
+            manifest = dump_manifest(entry_catalog(self.hass, entry), fmt)
+            schema[vol.Optional("manifest", default=manifest)] = selector.TextSelector(
+                selector.TextSelectorConfig(multiline=True)
+            )
+        return self.async_show_form(step_id="bulk_export", data_schema=vol.Schema(schema))
+
+    def _register_device(self, device_data, device_type):
         """Register device in Home Assistant's device registry."""
         device_registry = dr.async_get(self.hass)
-        entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
         if not isinstance(device_type, str) or device_type not in ["light", "switch","climate","floor_heating","fresh_air","8button","curtain","person_sensor","scene_switch","switch_with_energy"]:
             raise ValueError(f"Invalid device type provided: {device_type}")
         model_name = device_type.capitalize()
@@ -361,20 +493,25 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
             model=model_name,
             sw_version="1.0",
         )
-        await self.hass.config_entries.async_reload(entry.entry_id)
+
+    async def _register_device_and_entity(self, device_data, device_type):
+        """Register the device and create its entities."""
+        entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
+        self._register_device(device_data, device_type)
+        # 只为新设备创建实体，不重新加载整个配置条目
+        await async_add_device(self.hass, entry, device_data)
 
     async def _update_device_config(self, old_device_data, new_device_data):
         """Update the configuration of an existing device."""
         entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
         if not entry:
             raise ValueError("Configuration entry not found")
-        devices = entry.data.get("devices", [])
-        for index, device in enumerate(devices):
+        catalog = entry_catalog(self.hass, entry)
+        changed = []
+        for device in catalog.at(new_device_data["module_address"], new_device_data["loop_address"]):
             if (
                 device["type"] == new_device_data["type"] and
-                device["sub_device_type"] == new_device_data["sub_device_type"] and
-                device["module_address"] == new_device_data["module_address"] and
-                device["loop_address"] == new_device_data["loop_address"]
+                device["sub_device_type"] == new_device_data["sub_device_type"]
             ):
                 updated_device = {**device, **new_device_data}
                 updated_device["name"] = new_device_data.get("name", device["name"])
@@ -386,11 +523,11 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
                     buttons_to_add = set(new_selected_buttons) - set(old_selected_buttons)
                     buttons_to_remove = set(old_selected_buttons) - set(new_selected_buttons)
                     updated_device['selected_buttons'] = new_selected_buttons
-                devices[index] = updated_device
+                changed.append((device, updated_device))
 
-        updated_data = {**entry.data, "devices": devices}
-        self.hass.config_entries.async_update_entry(entry, data=updated_data)
-        await self.hass.config_entries.async_reload(entry.entry_id)
+        # 只重建被修改设备的实体
+        for device, updated_device in changed:
+            await async_update_device(self.hass, entry, device, updated_device)
 
     async def _delete_device(self, device_param):
         """Delete a device and its entities from the config entry and registries."""
@@ -398,19 +535,17 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         if not entry:
             raise ValueError("Configuration entry not found")
 
-        devices = entry.data.get("devices", [])
-        _LOGGER.debug(f"Current devices in config entry: {devices}")
-
-        device_to_delete = None
-        for device in devices:
-            if f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}" == device_param:
-                device_to_delete = device
-                break
+        catalog = entry_catalog(self.hass, entry)
+        _LOGGER.debug(f"Current devices in config entry: {len(catalog)}")
 
+        device_to_delete = catalog.by_param(device_param)
         if not device_to_delete:
             _LOGGER.warning(f"Device with param {device_param} not found")
             return
 
+        # 先更新配置条目中的设备列表（删除条目），再移除运行中的实体
+        await async_remove_device(self.hass, entry, device_to_delete)
+
         device_registry = dr.async_get(self.hass)
         entity_registry = er.async_get(self.hass)
         device_id = None
@@ -439,23 +574,15 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         else:
             _LOGGER.warning("No matching device found for deletion")
 
-        # 更新配置条目中的设备列表（删除条目）
-        updated_devices = [device for device in devices if f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}" != device_param]
-        updated_data = {**entry.data, "devices": updated_devices}
-        self.hass.config_entries.async_update_entry(entry, data=updated_data)
-        await self.hass.config_entries.async_reload(entry.entry_id)
-
     def _get_devices_of_type(self, device_type):
         """Retrieve devices of a specific type from the config entry."""
         entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
         if not entry:
             return []
-        # 从配置条目中获取设备列表
-        devices = entry.data.get("devices", [])
         # 根据设备类型筛选设备
-        filtered_devices = [device for device in devices if device["type"] == device_type]
+        filtered_devices = entry_catalog(self.hass, entry).of_type(device_type)
         if self.sub_device_type is not None:
-            filtered_devices = [device for device in devices if device["sub_device_type"] == self.sub_device_type]
+            filtered_devices = [device for device in filtered_devices if device["sub_device_type"] == self.sub_device_type]
         return filtered_devices
 
     def _get_device_by_name(self, device_param):
@@ -463,8 +590,4 @@ class SavantLightingOptionsFlowHandler(config_entries.OptionsFlow):
         entry = self.hass.config_entries.async_get_entry(self.config_entry.entry_id)
         if not entry:
             return None
-        devices = entry.data.get("devices", [])
-        for device in devices:
-            if f"{device['name']}|{device['module_address']}|{device['loop_address']}|{device['type']}" == device_param:
-                return device
-        return None
+        return entry_catalog(self.hass, entry).by_param(device_param)
@@ -1,33 +1,31 @@
 # import asyncio
 import logging
-from .tcp_manager import TCPConnectionManager
+from .connection_pool import pool
 
 
 _LOGGER = logging.getLogger(__name__)
 
 async def send_tcp_command(host, port, data):
-    manager = TCPConnectionManager(host, port)
-
-    # 发送命令
-    response, online = await manager.send_command(data)
+    # 使用连接池中该网关的连接，没有时建立一个，用完后由连接池延迟关闭
+    async with pool.connection(host, port) as manager:
+        # 发送命令
+        response, online = await manager.send_command(data)
 
     if online:
-        _LOGGER.info(f"设备响应: {response}")
+        _LOGGER.info("设备响应: %s", response)
     else:
         _LOGGER.warning("设备离线")
 
     return response, online
 
 async def send_tcp_command_array(host, port, data_array):
-    manager = TCPConnectionManager(host, port)
-
-    # 发送命令
-    for command in data_array:
-        response, online = await manager.send_command(command)
-        if online:
-            _LOGGER.info(f"设备响应: {response}")
-        else:
-            _LOGGER.warning("设备离线")
+    async with pool.connection(host, port) as manager:
+        # 发送命令
+        response, online = await manager.send_command_list(data_array)
+    if online:
+        _LOGGER.info("设备响应: %s", response)
+    else:
+        _LOGGER.warning("设备离线")
     return  online
 
 # async def send_tcp_command(host, port, data):
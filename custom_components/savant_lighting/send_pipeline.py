@@ -0,0 +1,299 @@
+import asyncio
+import logging
+from collections import deque
+
+from .const import (
+    ACK_TIMEOUT_MS,
+    DEFAULT_ACK_PACING,
+    DEFAULT_FRAME_GAP_MS,
+    FRAME_GAP_MAX_MS,
+    FRAME_GAP_MIN_MS,
+    PRIORITY_BACKGROUND,
+    PRIORITY_USER,
+    STARVATION_MS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# 统计发送速率时保留的最近帧数
+RATE_WINDOW = 64
+# 应答往返时间滑动平均中新样本的权重
+RTT_SMOOTHING = 0.2
+
+
+def frame_count(data):
+    """一次写入包含的帧数，批量写入由多条 13 字节控制帧拼接而成"""
+    if len(data) > 13 and len(data) % 13 == 0:
+        return len(data) // 13
+    return 1
+
+
+def coalesce_key(data):
+    """控制帧的 (模块, 回路, 寄存器) 键，同键的排队帧只需发送最新一帧
+
+    控制帧格式为 AC host 00 10 模块 回路 00 04 d1 d2 d3 d4 CA，d4 区分寄存器类型。
+    DALI 调光帧 (d4=0x10) 用 FF 表示该字段不变，亮度帧和色温帧靠 FF 的位置区分。
+    批量写入的键是各帧键的集合，改动同一组寄存器的新批量替换排队中的旧批量。
+    查询帧、场景帧和心跳不合并，返回 None；批量中有任何一帧不能合并时整批也不合并。
+    """
+    if len(data) > 13 and len(data) % 13 == 0:
+        keys = frozenset(_frame_key(data[start:start + 13]) for start in range(0, len(data), 13))
+        if None in keys:
+            return None
+        return keys
+    return _frame_key(data)
+
+
+def _frame_key(data):
+    if len(data) != 13 or data[2] != 0x00 or data[3] != 0x10:
+        return None
+    register = data[11]
+    if register == 0x10:
+        register |= (data[8] == 0xFF) << 8 | (data[10] == 0xFF) << 9
+    return data[4], data[5], register
+
+
+class SendPipeline:
+    """出站帧发送管道
+
+    原来 send_command_list 每发一帧固定 sleep(1)。现在所有出站帧进入按优先级分开的队列，
+    由唯一的发送任务按最小帧间隔（毫秒）依次写出：用户操作最先，自动化其次，后台轮询最后，
+    同一优先级内保持先进先出。低优先级帧排队超过 STARVATION_MS 后提前发送。
+    发往同一回路同一寄存器的控制帧在排队期间被新值替换，拖动滑块时只发送最终值，
+    改动同一组寄存器的批量写入同样整批替换。
+    开启应答节拍后，网关回报上一帧所在模块的状态时立即发送下一帧，超时未回报则按帧间隔继续。
+    frame_gap_ms 为 None 时帧间隔按测得的应答往返时间自动校准。
+    """
+
+    def __init__(self, write, frame_gap_ms=DEFAULT_FRAME_GAP_MS, ack_pacing=DEFAULT_ACK_PACING,
+                 ack_timeout_ms=ACK_TIMEOUT_MS, starvation_ms=STARVATION_MS):
+        self._write = write  # async (data) -> bool，实际写入 socket
+        self.calibrate = frame_gap_ms is None
+        self.frame_gap = (DEFAULT_FRAME_GAP_MS if frame_gap_ms is None else frame_gap_ms) / 1000
+        self.ack_pacing = ack_pacing
+        self.ack_timeout = ack_timeout_ms / 1000
+        self.starvation = starvation_ms / 1000
+        # 每个优先级一个队列，元素为 [帧, future, 入队时间, 合并键]，被替换的帧置为 None
+        self._queues = [deque() for _ in range(PRIORITY_BACKGROUND + 1)]
+        self._pending = {}  # 合并键 -> 仍在排队的元素
+        self._superseded = 0  # 队列中已被替换、待跳过的元素数
+        self._wakeup = asyncio.Event()
+        self._online = asyncio.Event()  # 断线期间暂停发送，帧留在队列中
+        self._task = None
+        self._ack_module = None
+        self._ack_event = asyncio.Event()
+        self.ack_rtt = None  # 控制帧写出到同一模块回报的往返时间的滑动平均（秒）
+        self._rtt_module = None
+        self._rtt_sent = 0.0
+        self._last_sent = 0.0
+        self._sent_times = deque(maxlen=RATE_WINDOW)
+        self.frames_sent = 0
+        self.ack_timeouts = 0
+        self.promotions = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def start(self):
+        """启动（或在重连后恢复）发送任务"""
+        self._online.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def pause(self):
+        """连接断开时暂停发送，新提交的帧继续排队"""
+        self._online.clear()
+
+    async def stop(self):
+        """停止发送任务，未发送的帧全部以失败结束"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in self._queues:
+            while queue:
+                future = queue.popleft()[1]
+                if not future.done():
+                    future.set_result(False)
+        self._pending.clear()
+        self._superseded = 0
+
+    def submit(self, data, priority=PRIORITY_USER):
+        """帧入队，返回写出后完成的 future（结果为是否写出成功）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [data, future, loop.time(), coalesce_key(data)]
+        key = entry[3]
+        if key is not None:
+            previous = self._pending.get(key)
+            if previous is not None:
+                # 旧值不再发送，新帧排到队尾以保持与其他寄存器的先后顺序，等待时长从旧帧算起
+                previous[0] = None
+                previous[1].set_result(True)
+                entry[2] = previous[2]
+                self._superseded += 1
+                self.coalesced += 1
+            self._pending[key] = entry
+        self._queues[priority].append(entry)
+        self._wakeup.set()
+        return future
+
+    async def send(self, data, priority=PRIORITY_USER):
+        """发送单帧并等待写出"""
+        return await self.submit(data, priority)
+
+    async def send_list(self, data_list, priority=PRIORITY_USER):
+        """按顺序发送多帧并等待全部写出"""
+        futures = [self.submit(data, priority) for data in data_list]
+        results = await asyncio.gather(*futures)
+        return all(results)
+
+    async def _wait_ready(self):
+        """等待任一队列中有帧"""
+        while not self.queue_depth:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def _skip_superseded(self):
+        """丢掉队首已被新值替换的元素"""
+        for queue in self._queues:
+            while queue and queue[0][0] is None:
+                queue.popleft()
+                self._superseded -= 1
+
+    def _forget(self, entry):
+        key = entry[3]
+        if key is not None and self._pending.get(key) is entry:
+            del self._pending[key]
+
+    def drop_oldest(self):
+        """丢弃等待最久的一帧，用于限制断线期间的缓存"""
+        self._skip_superseded()
+        queues = [queue for queue in self._queues if queue]
+        if not queues:
+            return
+        entry = min(queues, key=lambda queue: queue[0][2]).popleft()
+        self._forget(entry)
+        entry[1].set_result(False)
+        self.dropped += 1
+
+    def _pop(self, now):
+        """取出下一帧：优先发送等待过久的低优先级帧，否则取最高优先级"""
+        self._skip_superseded()
+        entry = None
+        for queue in self._queues[1:]:
+            if queue and now - queue[0][2] > self.starvation:
+                self.promotions += 1
+                entry = queue.popleft()
+                break
+        else:
+            for queue in self._queues:
+                if queue:
+                    entry = queue.popleft()
+                    break
+        self._forget(entry)
+        return entry
+
+    def notify_frame(self, frame):
+        """收到网关上报的帧，用于应答节拍和测量应答往返时间"""
+        if len(frame) <= 4:
+            return
+        if self._rtt_module is not None and frame[4] == self._rtt_module:
+            self._rtt_module = None
+            self._record_rtt(asyncio.get_running_loop().time() - self._rtt_sent)
+        if self._ack_module is not None and frame[4] == self._ack_module:
+            self._ack_event.set()
+
+    def _record_rtt(self, sample):
+        """更新往返时间的滑动平均，自动校准时帧间隔随之调整"""
+        if self.ack_rtt is None:
+            self.ack_rtt = sample
+        else:
+            self.ack_rtt += RTT_SMOOTHING * (sample - self.ack_rtt)
+        if self.calibrate:
+            self.frame_gap = min(max(self.ack_rtt, FRAME_GAP_MIN_MS / 1000), FRAME_GAP_MAX_MS / 1000)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._online.wait()
+            await self._wait_ready()
+            # 先等够帧间隔再选帧，间隔期间新到的用户命令可以插到前面
+            wait = self._last_sent + self.frame_gap - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not self._online.is_set() or not self.queue_depth:
+                continue
+            data, future, _, _ = self._pop(loop.time())
+            if future.done():
+                continue
+
+            # 只有带模块地址的命令帧才等待应答，心跳 FF 不等待
+            expect_ack = self.ack_pacing and len(data) >= 13
+            if expect_ack:
+                self._ack_module = data[4]
+                self._ack_event.clear()
+
+            ok = await self._write(data)
+            self._last_sent = loop.time()
+            if ok:
+                if len(data) >= 13:
+                    self._rtt_module = data[4]
+                    self._rtt_sent = self._last_sent
+                count = frame_count(data)
+                self.frames_sent += count
+                self._sent_times.extend([self._last_sent] * count)
+            if not future.done():
+                future.set_result(ok)
+
+            if expect_ack and ok:
+                try:
+                    await asyncio.wait_for(self._ack_event.wait(), self.ack_timeout)
+                except asyncio.TimeoutError:
+                    self.ack_timeouts += 1
+                    _LOGGER.debug("模块 %02X 应答超时", data[4])
+            self._ack_module = None
+
+    @property
+    def queue_depth(self):
+        """等待发送的帧数"""
+        return sum(len(queue) for queue in self._queues) - self._superseded
+
+    def drain_time(self):
+        """按当前队列深度估算发完队列的最长时间（秒），开启应答节拍时每帧按应答超时计"""
+        per_frame = self.frame_gap + (self.ack_timeout if self.ack_pacing else 0)
+        return self.queue_depth * per_frame
+
+    @property
+    def queued_frames(self):
+        """等待发送的帧数，批量写入按其中的帧数计算"""
+        return sum(frame_count(entry[0]) for queue in self._queues for entry in queue if entry[0] is not None)
+
+    @property
+    def frames_per_second(self):
+        """最近一段时间实际达到的发送速率"""
+        if len(self._sent_times) < 2:
+            return 0.0
+        elapsed = self._sent_times[-1] - self._sent_times[0]
+        if elapsed <= 0:
+            return 0.0
+        return (len(self._sent_times) - 1) / elapsed
+
+    def diagnostics(self):
+        """诊断信息"""
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_priority": [sum(entry[0] is not None for entry in queue) for queue in self._queues],
+            "frames_per_second": round(self.frames_per_second, 2),
+            "frames_sent": self.frames_sent,
+            "ack_timeouts": self.ack_timeouts,
+            "starvation_promotions": self.promotions,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "frame_gap_ms": round(self.frame_gap * 1000),
+            "frame_gap_calibrated": self.calibrate,
+            "ack_rtt_ms": round(self.ack_rtt * 1000, 1) if self.ack_rtt is not None else None,
+            "ack_pacing": self.ack_pacing,
+        }
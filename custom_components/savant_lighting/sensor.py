@@ -5,6 +5,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from .tcp_manager import *
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
 from .command_helper import SwitchCommand
 from .switch_8_button import SavantSwitch8Button
 from .switch_scene import SavantSwitchScene
@@ -15,24 +17,24 @@ SCAN_INTERVAL = timedelta(seconds=60)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Light entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
-    tcp_manager=config["tcp_manager"]
-    entities = []
-    for device in devices:
-        if device["type"] == "switch_with_energy":
-            module_address = device["module_address"]
-            loop_address = device["loop_address"]
-            name = device["name"]
-            # Create and append voltage, current, and power sensors
-            entities.append(SavantVoltageSensor(name, module_address, loop_address, tcp_manager))
-            entities.append(SavantCurrentSensor(name, module_address, loop_address, tcp_manager))
-            entities.append(SavantPowerSensor(name, module_address, loop_address, tcp_manager))
-            entities.append(SavantEnergySensor(name, module_address, loop_address, tcp_manager))
-
-    async_add_entities(entities, update_before_add=True)
-
-class SavantVoltageSensor(SensorEntity):
+    await async_setup_platform(hass, entry, "sensor", create_entities, async_add_entities)
+
+def create_entities(device, tcp_manager):
+    """按设备配置创建计量传感器实体，选项流程增加设备时也调用"""
+    if device["type"] != "switch_with_energy":
+        return []
+    module_address = device["module_address"]
+    loop_address = device["loop_address"]
+    name = device["name"]
+    # Create voltage, current, power and energy sensors
+    return [
+        SavantVoltageSensor(name, module_address, loop_address, tcp_manager),
+        SavantCurrentSensor(name, module_address, loop_address, tcp_manager),
+        SavantPowerSensor(name, module_address, loop_address, tcp_manager),
+        SavantEnergySensor(name, module_address, loop_address, tcp_manager),
+    ]
+
+class SavantVoltageSensor(StateWriteMixin, SensorEntity):
     """Representation of a voltage sensor."""
 
     def __init__(self, name, module_address, loop_address, tcp_manager):
@@ -42,7 +44,11 @@ class SavantVoltageSensor(SensorEntity):
         self._loop_address = loop_address
         self._state = 0.0
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch_with_energy_voltage_sensor", self.update_state)
+        self._energy = tcp_manager.energy_loop(module_address, loop_address)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self._energy.add_listener(self.update_state))
 
     @property
     def unique_id(self):
@@ -70,11 +76,13 @@ class SavantVoltageSensor(SensorEntity):
             "identifiers": {(DOMAIN, f"{self._module_address}_{self._loop_address}_switch_with_energy")},
         }
 
-    def update_state(self, response_dict):
-        self._state = response_dict.get("voltage", 0.0)
-        self.async_write_ha_state()
+    def update_state(self, energy):
+        if not energy.publish:
+            return
+        self._state = energy.voltage
+        self.async_write_ha_state_if_changed()
 
-class SavantCurrentSensor(SensorEntity):
+class SavantCurrentSensor(StateWriteMixin, SensorEntity):
     """Representation of a current sensor."""
 
     def __init__(self, name, module_address, loop_address, tcp_manager):
@@ -84,7 +92,11 @@ class SavantCurrentSensor(SensorEntity):
         self._loop_address = loop_address
         self._state = 0.0
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch_with_energy_current_sensor", self.update_state)
+        self._energy = tcp_manager.energy_loop(module_address, loop_address)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self._energy.add_listener(self.update_state))
 
     @property
     def unique_id(self):
@@ -112,11 +124,13 @@ class SavantCurrentSensor(SensorEntity):
             "identifiers": {(DOMAIN, f"{self._module_address}_{self._loop_address}_switch_with_energy")},
         }
 
-    def update_state(self, response_dict):
-        self._state = response_dict.get("current", 0.0)
-        self.async_write_ha_state()
+    def update_state(self, energy):
+        if not energy.publish:
+            return
+        self._state = energy.current
+        self.async_write_ha_state_if_changed()
 
-class SavantPowerSensor(SensorEntity):
+class SavantPowerSensor(StateWriteMixin, SensorEntity):
     """Representation of a power sensor."""
 
     def __init__(self, name, module_address, loop_address, tcp_manager):
@@ -126,7 +140,11 @@ class SavantPowerSensor(SensorEntity):
         self._loop_address = loop_address
         self._state = 0.0
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch_with_energy_power_sensor", self.update_state)
+        self._energy = tcp_manager.energy_loop(module_address, loop_address)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self._energy.add_listener(self.update_state))
 
     @property
     def unique_id(self):
@@ -147,6 +165,20 @@ class SavantPowerSensor(SensorEntity):
     def icon(self):
         return "mdi:power-plug"
 
+    @property
+    def extra_state_attributes(self):
+        """内存历史中的功率统计"""
+        history = self._energy.history
+        stats = history.stats("power")
+        if stats is None:
+            return None
+        return {
+            "power_min": stats["min"],
+            "power_max": stats["max"],
+            "power_mean": round(stats["mean"], 3),
+            "samples": len(history),
+        }
+
     @property
     def device_info(self):
         """Return device information to link this entity with the device registry."""
@@ -154,11 +186,13 @@ class SavantPowerSensor(SensorEntity):
             "identifiers": {(DOMAIN, f"{self._module_address}_{self._loop_address}_switch_with_energy")},
         }
 
-    def update_state(self, response_dict):
-        self._state = response_dict.get("power", 0.0)
-        self.async_write_ha_state()
+    def update_state(self, energy):
+        if not energy.publish:
+            return
+        self._state = energy.power
+        self.async_write_ha_state_if_changed()
 
-class SavantEnergySensor(SensorEntity):
+class SavantEnergySensor(StateWriteMixin, SensorEntity):
     """Representation of a power sensor."""
 
     def __init__(self, name, module_address, loop_address, tcp_manager):
@@ -168,7 +202,11 @@ class SavantEnergySensor(SensorEntity):
         self._loop_address = loop_address
         self._state = 0.0
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch_with_energy_energy_sensor", self.update_state)
+        self._energy = tcp_manager.energy_loop(module_address, loop_address)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self._energy.add_listener(self.update_state))
 
     @property
     def unique_id(self):
@@ -196,6 +234,8 @@ class SavantEnergySensor(SensorEntity):
             "identifiers": {(DOMAIN, f"{self._module_address}_{self._loop_address}_switch_with_energy")},
         }
 
-    def update_state(self, response_dict):
-        self._state = response_dict.get("power", 0.0)
-        self.async_write_ha_state()
+    def update_state(self, energy):
+        if not energy.publish:
+            return
+        self._state = energy.energy
+        self.async_write_ha_state_if_changed()
@@ -0,0 +1,109 @@
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .frame_record import Frame, HvacType
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10  # 秒，状态变化合并后延迟写盘
+
+# 按键和人体感应是瞬时事件，重启后不回放
+NO_RESTORE_TYPES = ("8button", "person_sensor")
+
+
+def storage_key(host, port):
+    """网关的状态缓存：连接池中同一网关的配置条目共用，不随其中某个配置条目的删除而失效"""
+    return f"{DOMAIN}.{host}_{int(port)}.states"
+
+
+def legacy_storage_key(entry_id):
+    """早期版本按配置条目命名的状态缓存"""
+    return f"{DOMAIN}.{entry_id}.states"
+
+
+class FrameStore:
+    """每个回路最后一次收到的状态帧，保存在 HA 存储中，启动时先回放给实体
+
+    同一实体可能由多种帧更新（如 DALI-01 的亮度帧和色温帧、空调的各项参数），
+    所以按 unique_id 和寄存器 (data4, hvac_type) 分别保存。
+
+    写盘是延迟合并的：只有内容变化时才标记为脏并安排一次延迟保存，
+    轮询带回的相同状态不会触发写盘；卸载配置条目时立即写出未保存的变化。
+    缓存按网关 host:port 命名，legacy_entry_id 的旧缓存在第一次载入时迁移过来并删除。
+    """
+
+    def __init__(self, hass, host, port, legacy_entry_id=None):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, storage_key(host, port))
+        self._legacy_entry_id = legacy_entry_id
+        self._states = {}  # unique_id -> {寄存器: 帧字段列表}
+        self._load_task = None
+        self._dirty = False
+
+    async def async_load(self):
+        """载入缓存状态，各平台的 async_setup_entry 都会调用，只读一次盘"""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+        await self._load_task
+
+    async def _async_load(self):
+        data = await self._store.async_load()
+        if data is None and self._legacy_entry_id is not None:
+            legacy = Store(self.hass, STORAGE_VERSION, legacy_storage_key(self._legacy_entry_id))
+            data = await legacy.async_load()
+            if data is not None:
+                await self._store.async_save(data)
+                await legacy.async_remove()
+        # 载入前已经记录的帧更新，以它们为准
+        self._states = {**(data or {}), **self._states}
+        _LOGGER.debug(f"已载入 {len(self._states)} 个实体的缓存状态")
+
+    def record(self, frame):
+        """记录一帧，内容变化时安排延迟写盘"""
+        if not isinstance(frame, Frame) or frame.device_type in NO_RESTORE_TYPES:
+            return
+        register = f"{frame.data4}:{int(frame.hvac_type)}"
+        fields = [
+            frame.module_address, frame.loop_address,
+            frame.data1, frame.data2, frame.data3, frame.data4,
+            frame.device_type, frame.sub_device_type, int(frame.hvac_type), frame.button_index,
+        ]
+        states = self._states.setdefault(frame.unique_id, {})
+        if states.get(register) == fields:
+            return
+        states[register] = fields
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def async_flush(self):
+        """立即写出未保存的变化"""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self):
+        """删除缓存文件，取消尚未执行的延迟写盘"""
+        self._states = {}
+        self._dirty = False
+        await self._store.async_remove()
+
+    def has_state(self, unique_id):
+        return unique_id in self._states
+
+    def frames(self, unique_id):
+        """重建该实体缓存的全部帧"""
+        frames = []
+        for fields in self._states.get(unique_id, {}).values():
+            module, loop, data1, data2, data3, data4, device_type, sub_device_type, hvac_type, button_index = fields
+            frames.append(Frame(
+                module, loop, data1, data2, data3, data4,
+                device_type=device_type, sub_device_type=sub_device_type,
+                hvac_type=HvacType(hvac_type), button_index=button_index,
+            ))
+        return frames
+
+    def _data_to_save(self):
+        self._dirty = False
+        return self._states
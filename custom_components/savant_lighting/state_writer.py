@@ -0,0 +1,28 @@
+class StateWriteMixin:
+    """只在实体解码出的状态与上次写入的不同时才写入
+
+    轮询和批量状态帧会反复上报相同的状态，update_state 解码后调用
+    async_write_ha_state_if_changed，与上次写入时的可用性、_written_fields 列出的解码字段
+    和 extra_state_attributes 比较。不计算 HA 的完整属性字典，每帧的开销只是几次取属性。
+    比较对象是上次写入的结果而不是解码前的属性：乐观更新后没有写入的状态由确认帧写入。
+    """
+
+    # 参与比较的解码字段，各实体类按 update_state 写入的属性覆盖
+    _written_fields = ("_state",)
+    _written_state = None
+
+    def _current_ha_state(self):
+        fields = tuple(getattr(self, name, None) for name in self._written_fields)
+        return self.available, fields, self.extra_state_attributes
+
+    def async_write_ha_state(self):
+        self._written_state = self._current_ha_state()
+        super().async_write_ha_state()
+
+    def async_write_ha_state_if_changed(self):
+        """状态有变化时写入并返回 True，否则计入连接的 suppressed_writes"""
+        if self._current_ha_state() == self._written_state:
+            self.tcp_manager.suppressed_writes += 1
+            return False
+        self.async_write_ha_state()
+        return True
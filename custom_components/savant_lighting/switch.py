@@ -5,6 +5,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from .tcp_manager import *
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
+from .topology import async_setup_platform
 from .command_helper import SwitchCommand
 from .switch_8_button import SavantSwitch8Button
 from .switch_scene import SavantSwitchScene
@@ -15,64 +17,63 @@ SCAN_INTERVAL = timedelta(seconds=60)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up Savant Light entities from a config entry."""
-    config = hass.data[DOMAIN].get(entry.entry_id, {})
-    devices = config.get("devices", [])
-    switchs = [
-        SavantSwitch(
-            name=device["name"],
-            module_address=device["module_address"],
-            loop_address=device["loop_address"],
-            host=device["host"],
-            port=device["port"],
-            tcp_manager=config["tcp_manager"]
-        )
-        for device in devices if device["type"] == "switch"
-    ]
-
-    eight_buttons = []
-    for device in devices:
-        if device["type"] == "8button":  # 检查设备类型是否为 8 键开关
-            for button_index in device['selected_buttons']:  # 为每个按键创建一个实体
-                eight_buttons.append(
-                    SavantSwitch8Button(
-                        name=f"{device['name']}",
-                        module_address=device["module_address"],
-                        loop_address=device["loop_address"],
-                        button_index=button_index,
-                        host=device["host"],
-                        port=device["port"],
-                        tcp_manager=config["tcp_manager"],
-                    )
-                )
-
-    scene_switchs = [
-        SavantSwitchScene(
-            name=device["name"],
-            module_address=device["module_address"],
-            loop_address=device["loop_address"],
-            scene_number=device["scene_number"],
-            host=device["host"],
-            port=device["port"],
-            tcp_manager=config["tcp_manager"]
-        )
-        for device in devices if device["type"] == "scene_switch"
-    ]
-
-    energy_switches = [
-        SavantEnergySwitch(
-            name=device["name"],
-            module_address=device["module_address"],
-            loop_address=device["loop_address"],
-            host=device["host"],
-            port=device["port"],
-            tcp_manager=config["tcp_manager"]
-        )
-        for device in devices if device["type"] == "switch_with_energy"
-    ]
-
-    async_add_entities(switchs + eight_buttons + scene_switchs + energy_switches, update_before_add=True)
-
-class SavantSwitch(SwitchEntity):
+    await async_setup_platform(hass, entry, "switch", create_entities, async_add_entities)
+
+def create_entities(device, tcp_manager):
+    """按设备配置创建开关类实体，选项流程增加设备时也调用"""
+    if device["type"] == "switch":
+        return [
+            SavantSwitch(
+                name=device["name"],
+                module_address=device["module_address"],
+                loop_address=device["loop_address"],
+                host=device["host"],
+                port=device["port"],
+                tcp_manager=tcp_manager
+            )
+        ]
+
+    if device["type"] == "8button":  # 检查设备类型是否为 8 键开关
+        return [  # 为每个按键创建一个实体
+            SavantSwitch8Button(
+                name=f"{device['name']}",
+                module_address=device["module_address"],
+                loop_address=device["loop_address"],
+                button_index=button_index,
+                host=device["host"],
+                port=device["port"],
+                tcp_manager=tcp_manager,
+            )
+            for button_index in device['selected_buttons']
+        ]
+
+    if device["type"] == "scene_switch":
+        return [
+            SavantSwitchScene(
+                name=device["name"],
+                module_address=device["module_address"],
+                loop_address=device["loop_address"],
+                scene_number=device["scene_number"],
+                host=device["host"],
+                port=device["port"],
+                tcp_manager=tcp_manager
+            )
+        ]
+
+    if device["type"] == "switch_with_energy":
+        return [
+            SavantEnergySwitch(
+                name=device["name"],
+                module_address=device["module_address"],
+                loop_address=device["loop_address"],
+                host=device["host"],
+                port=device["port"],
+                tcp_manager=tcp_manager
+            )
+        ]
+    return []
+
+class SavantSwitch(StateWriteMixin, SwitchEntity):
     """Representation of a Savant Switch."""
 
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
@@ -86,18 +87,17 @@ class SavantSwitch(SwitchEntity):
         self._last_known_state = None  # 用于存储最后已知状态
         self._is_online = True  # 在线状态初始化为
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch", self.update_state)
         self.command = SwitchCommand(host,module_address,loop_address)
 
     async def async_added_to_hass(self):
         """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
         # 延迟更新设备状态，以避免阻塞 setup
         self.hass.async_create_task(self.async_update())
         self.async_write_ha_state()
         # query_command = self._generate_query_command()
         # await self.tcp_manager.send_command(query_command)
 
-
     @property
     def unique_id(self):
         """Return a unique ID for this light."""
@@ -126,11 +126,11 @@ class SavantSwitch(SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         self._state = True
-        await self.tcp_manager.send_command(self.command.turnonoff("on"))
+        await self.tcp_manager.send_command(self.command.turnonoff("on"), context=self._context)
 
     async def async_turn_off(self, **kwargs):
         self._state = True
-        await self.tcp_manager.send_command(self.command.turnonoff("off"))
+        await self.tcp_manager.send_command(self.command.turnonoff("off"), context=self._context)
 
     async def async_update(self):
         self._state = True
@@ -144,13 +144,11 @@ class SavantSwitch(SwitchEntity):
         base_command = bytes.fromhex(host_hex + module_hex)
         return base_command + b'\x01\x00\x01\x08\xCA'
 
-    def update_state(self, response_dict):
-        print('继电器收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        if response_dict["switch_type"] == "num0":
-            if response_dict["data1"] == 0x00:
-                device._state = False
-            else:
-                device._state = True
+    def update_state(self, frame):
+        _LOGGER.debug("继电器收到状态响应: %s", frame)
+        if frame.data1 == 0x00:
+            self._state = False
+        else:
+            self._state = True
 
-        device.async_write_ha_state()
\ No newline at end of file
+        self.async_write_ha_state_if_changed()
\ No newline at end of file
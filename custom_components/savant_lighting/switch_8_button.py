@@ -21,9 +21,12 @@ class SavantSwitch8Button(SwitchEntity):
         self._port = port
         self._state = False
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("8button", self.update_state)
         self.command = SwitchCommand(host, module_address, loop_address)
 
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+
     @property
     def unique_id(self):
         """Return a unique ID for this switch button."""
@@ -61,24 +64,23 @@ class SavantSwitch8Button(SwitchEntity):
 
     async def _send_state_to_device(self, command):
         """Send the command to the device."""
-        print(f"Sending command to device: {command}")
+        _LOGGER.debug("Sending command to device: %s", command)
         
-    def update_state(self, response_dict):
+    def update_state(self, frame):
         """Update the state of the device based on the response."""
-        print('按键收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
+        _LOGGER.debug("按键收到状态响应: %s", frame)
         
-        if response_dict["data1"] == 0x01:
-            device._state = True
-            device.async_write_ha_state()
+        if frame.data1 == 0x01:
+            self._state = True
+            self.async_write_ha_state()
             # Schedule to set the state to False after 1 second
-            asyncio.create_task(self._set_state_false_after_delay(device))
+            asyncio.create_task(self._set_state_false_after_delay())
         else:
-            device._state = False
-            device.async_write_ha_state()
+            self._state = False
+            self.async_write_ha_state()
 
-    async def _set_state_false_after_delay(self, device):
+    async def _set_state_false_after_delay(self):
         """Set the state to False after a delay."""
         await asyncio.sleep(1)  # Wait for 1 second
-        device._state = False
-        device.async_write_ha_state()
\ No newline at end of file
+        self._state = False
+        self.async_write_ha_state()
\ No newline at end of file
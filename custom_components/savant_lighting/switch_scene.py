@@ -3,11 +3,13 @@ from datetime import timedelta
 from homeassistant.components.switch import SwitchEntity
 from .command_helper import SwitchSceneCommand
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(seconds=60)
 
-class SavantSwitchScene(SwitchEntity):
+class SavantSwitchScene(StateWriteMixin, SwitchEntity):
+    _written_fields = ("_is_on",)
 
     def __init__(self, name, module_address, loop_address, scene_number, host, port, tcp_manager):
         self._attr_name = name
@@ -18,10 +20,13 @@ class SavantSwitchScene(SwitchEntity):
         self._port = port
         self._is_on = False
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("scene_switch", self.update_state)
         self.command = SwitchSceneCommand(host, scene_number)
         
 
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+
     @property
     def unique_id(self):
         """Return a unique ID for this switch button."""
@@ -44,14 +49,13 @@ class SavantSwitchScene(SwitchEntity):
         
     async def async_turn_on(self, **kwargs):
         self._state = True
-        await self.tcp_manager.send_command(self.command.turnonoff("on"))
+        await self.tcp_manager.send_command(self.command.turnonoff("on"), context=self._context)
 
     async def async_turn_off(self, **kwargs):
         self._state = True
-        await self.tcp_manager.send_command(self.command.turnonoff("off"))
+        await self.tcp_manager.send_command(self.command.turnonoff("off"), context=self._context)
         
-    def update_state(self, response_dict):
-        print('开关收到状态响应: ' + str(response_dict).replace('\\x', ''))
-        device = response_dict['device']
-        device._state = self._parse_device_state(response_dict['response_str'])
-        device.async_write_ha_state()
\ No newline at end of file
+    def update_state(self, frame):
+        _LOGGER.debug("开关收到状态响应: %s", frame)
+        self._is_on = frame.data1 != 0x00
+        self.async_write_ha_state_if_changed()
\ No newline at end of file
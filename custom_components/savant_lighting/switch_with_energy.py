@@ -7,12 +7,13 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from .tcp_manager import *
 from .const import DOMAIN
+from .state_writer import StateWriteMixin
 from .command_helper import SwitchCommand
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(seconds=60)
 
-class SavantEnergySwitch(SwitchEntity):
+class SavantEnergySwitch(StateWriteMixin, SwitchEntity):
     """Representation of a Savant Switch with Energy Monitoring."""
 
     def __init__(self, name, module_address, loop_address, host, port, tcp_manager):
@@ -24,8 +25,13 @@ class SavantEnergySwitch(SwitchEntity):
         self._port = port
         self._state = False
         self.tcp_manager = tcp_manager
-        self.tcp_manager.register_callback("switch_with_energy", self.update_state)
         self.command = SwitchCommand(host, module_address, loop_address)
+        self._energy = tcp_manager.energy_loop(module_address, loop_address)
+
+    async def async_added_to_hass(self):
+        """Callback when entity is added to hass."""
+        self.async_on_remove(self.tcp_manager.subscribe(self.unique_id, self.update_state))
+        self.async_on_remove(self._energy.add_listener(self.update_energy))
 
     @property
     def unique_id(self):
@@ -50,24 +56,12 @@ class SavantEnergySwitch(SwitchEntity):
     async def async_turn_on(self, **kwargs):
         _LOGGER.debug(f"Turning on {self._attr_name}")
         self._state = True
-        await self.tcp_manager.send_command(self.command.turnonoff("on"))
+        await self.tcp_manager.send_command(self.command.turnonoff("on"), context=self._context)
 
     async def async_turn_off(self, **kwargs):
         _LOGGER.debug(f"Turning off {self._attr_name}")
         self._state = False
-        await self.tcp_manager.send_command(self.command.turnonoff("off"))
-
-    def get_sensor_entity(self, sensor_unique_id):
-        entity_registry = async_get_entity_registry(self.hass)
-        entity_entry = None
-        for entry in entity_registry.entities.values():
-            if entry.unique_id == sensor_unique_id:
-                entity_entry = entry
-                break
-        entity_id = entity_entry.entity_id
-        sensor = self.hass.data['sensor'].get_entity(entity_id)
-        return sensor
-
+        await self.tcp_manager.send_command(self.command.turnonoff("off"), context=self._context)
 
     async def async_update(self):
         self._state = True
@@ -82,31 +76,16 @@ class SavantEnergySwitch(SwitchEntity):
         base_command = bytes.fromhex(host_hex + module_hex)
         return base_command + b'\x01\x00\x01\x14\xCA'
 
-    def update_state(self, response_dict):
-        # _LOGGER.debug('Switch state update received: %s', response_dict)
-        device = response_dict['device']
-        device._state = response_dict["state"]
-        device.async_write_ha_state()
-
-        if response_dict['current_sensor'] is not None:
-            sensor = self.get_sensor_entity(f"{device._module_address}_{device._loop_address}_switch_with_energy_current_sensor")
-            sensor._state = response_dict['current_sensor']
-            sensor.async_write_ha_state()
-
-        if response_dict['voltage_sensor'] is not None:
-            sensor = self.get_sensor_entity(f"{device._module_address}_{device._loop_address}_switch_with_energy_voltage_sensor")
-            sensor._state = response_dict['voltage_sensor']
-            sensor.async_write_ha_state()
-
-        if response_dict['power_sensor'] is not None:
-            sensor = self.get_sensor_entity(f"{device._module_address}_{device._loop_address}_switch_with_energy_power_sensor")
-            sensor._state = response_dict['power_sensor']
-            sensor.async_write_ha_state()
+    def update_state(self, frame):
+        """普通继电器状态帧转发过来的，只有开关状态"""
+        # _LOGGER.debug('Switch state update received: %s', frame)
+        self._state = frame.data1 != 0x00
+        self.async_write_ha_state_if_changed()
 
-        if response_dict['energy_sensor'] is not None:
-            sensor = self.get_sensor_entity(f"{device._module_address}_{device._loop_address}_switch_with_energy_energy_sensor")
-            sensor._state = response_dict['energy_sensor']
-            sensor.async_write_ha_state()
+    def update_energy(self, energy):
+        """能耗帧中的开关状态，计量值由传感器自己从共享状态读取"""
+        self._state = energy.state
+        self.async_write_ha_state_if_changed()
 
     def _parse_response(self, response_str):
         pass
@@ -1,14 +1,49 @@
 import asyncio
 import logging
-from .const import DOMAIN
-from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
-from custom_components.savant_lighting import sensor, switch_with_energy
+import random
+import struct
+import time
+from .const import (
+    DOMAIN,
+    DEFAULT_ACK_PACING,
+    DEFAULT_COLLECT_WINDOW_MS,
+    PRIORITY_USER,
+    PRIORITY_SCHEDULED,
+    PRIORITY_BACKGROUND,
+    RECONNECT_MIN_DELAY,
+    RECONNECT_MAX_DELAY,
+    OFFLINE_BUFFER_SIZE,
+    MAX_BATCH_FRAMES,
+    SYNC_CONCURRENCY,
+    SYNC_TIMEOUT,
+    DEFAULT_ENERGY_POLL_INTERVAL,
+    DEFAULT_ENERGY_POLL_MIN_INTERVAL,
+    DEFAULT_ENERGY_POLL_MAX_INTERVAL,
+    DEFAULT_ENERGY_RECORD_INTERVAL,
+    ENERGY_DIAGNOSTICS_WINDOW,
+    DEFAULT_FRAME_TRACE_SIZE,
+)
+from .energy_poller import EnergyPollScheduler
+from .energy_history import FIELDS, STAT_FIELDS, EnergyLoop
+from .frame_decoder import FrameDecoder, HEADER_LENGTH
+from .frame_trace import FrameTrace, TX, RX
+from .send_pipeline import SendPipeline, coalesce_key
+from .frame_classifier import classify_frame
+from .frame_record import Frame, EnergyFrame, HvacType
 
 _LOGGER = logging.getLogger(__name__)
 
+# 0x50 能耗帧的数据区是 20 个 4 字节字，每 4 个一组依次为 4 个回路的开关状态、电流、电压、功率，
+# 各取字的首字节；最后一组是电量，取字的前两字节（小端，除以 100）
+_ENERGY_BLOCK = struct.Struct("<" + "B3x" * 16 + "H2x" * 4)
+
 class TCPConnectionManager:
     """管理与设备的TCP连接"""
-    def __init__(self, host, port):
+    def __init__(self, host, port, frame_gap_ms=None, ack_pacing=DEFAULT_ACK_PACING,
+                 collect_window_ms=DEFAULT_COLLECT_WINDOW_MS, energy_poll_interval=DEFAULT_ENERGY_POLL_INTERVAL,
+                 energy_poll_min_interval=DEFAULT_ENERGY_POLL_MIN_INTERVAL,
+                 energy_poll_max_interval=DEFAULT_ENERGY_POLL_MAX_INTERVAL,
+                 energy_record_interval=DEFAULT_ENERGY_RECORD_INTERVAL, frame_trace_size=DEFAULT_FRAME_TRACE_SIZE):
         self.host = host
         self.port = port
         self.hass = None
@@ -18,153 +53,417 @@ class TCPConnectionManager:
         self.response_queue = asyncio.Queue()  # 用于缓存响应
         self.command_no = 0
         self._keep_alive_task = None  # 定时发送任务
-        self._callbacks = {}
+        self._listen_task = None  # 接收任务，连接断开时结束
+        self._supervisor_task = None  # 断线重连守护任务
+        self._open_lock = asyncio.Lock()  # 同一时间只打开一个 socket
+        self._wake = asyncio.Event()  # 唤醒退避中的守护任务立即重连
+        self._attempt = None  # 被唤醒的这次重连的结果，connect() 等待它
+        self._closing = False
+        self._entries = {}  # 共用这个连接的配置条目：entry_id -> entry
+        self.reconnect_min_delay = RECONNECT_MIN_DELAY
+        self.reconnect_max_delay = RECONNECT_MAX_DELAY
+        self.reconnect_count = 0
+        self._subscribers = {}  # unique_id -> 实体的 update_state，由实体在加入/移除时维护
+        self._decoder = FrameDecoder()  # 接收数据的拼帧缓冲
+        self._pipeline = SendPipeline(self._write, frame_gap_ms, ack_pacing)  # 出站帧发送管道
+        self.collect_window = collect_window_ms / 1000
+        self._window = {}  # 收集窗口内的命令：优先级 -> 帧列表
+        self._window_handle = None
+        self._store = None  # 最后状态缓存，由 set_state_store 设置
+        self._queries = {}  # 模块地址 -> 状态查询帧
+        self._synced_modules = set()  # 本次连接中已查询过的模块
+        self._module_waiters = {}  # 模块地址 -> 等待该模块应答的事件
+        self._sync_semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+        self._probes = {}  # 模块地址 -> (收到的数组应答帧, 事件)，发现扫描时使用
+        self._sync_tasks = set()
+        # 计量开关模块的轮询
+        self._energy_poller = EnergyPollScheduler(
+            self.send_command, energy_poll_interval, energy_poll_min_interval, energy_poll_max_interval,
+        )
+        self._energy_loops = {}  # (模块, 回路) -> 计量回路的共享状态
+        self.energy_record_interval = energy_record_interval  # 计量传感器写入状态的最小间隔（秒）
+        self._trace = FrameTrace(frame_trace_size) if frame_trace_size else None  # 收发帧记录，默认关闭
+        self.suppressed_writes = 0  # 状态没有变化而跳过的 async_write_ha_state 次数
 
     def set_hass(self, hass):
         """设置 Home Assistant 的核心对象"""
         self.hass = hass
 
+    def set_state_store(self, store):
+        """设置最后状态缓存，实体订阅时先回放缓存的状态"""
+        self._store = store
+
+    @property
+    def is_connected(self):
+        return self._is_connected
+
+    @property
+    def state_store(self):
+        return self._store
+
     async def connect(self, entry=None):
-        """建立TCP连接"""
+        """建立TCP连接，并启动断线重连的守护任务
+
+        连接已存在时（连接池中的共享连接、配置条目重新加载）只更新设备列表，
+        已查询过的模块不再查询，新增设备的模块在其实体订阅时查询。
+        """
+        if entry is not None:
+            self._entries[entry.entry_id] = entry
         if self._is_connected:
             _LOGGER.debug("连接已存在，复用现有连接")
+            self._refresh_devices()
             return True
+        self._closing = False
+        if self._supervisor_task is None or self._supervisor_task.done():
+            connected = await self._open()
+            self._supervisor_task = asyncio.create_task(self._supervise())
+        else:
+            # 守护任务正在退避等待，唤醒它立即重连，不另开 socket
+            connected = await self._reconnect_now()
+        if not self._keep_alive_task:
+            self._keep_alive_task = asyncio.create_task(self._send_keep_alive())
+        return connected
+
+    async def _reconnect_now(self):
+        """唤醒守护任务立即重连并等待结果"""
+        if self._attempt is None:
+            self._attempt = asyncio.get_running_loop().create_future()
+        attempt = self._attempt
+        self._wake.set()
+        return await asyncio.shield(attempt)
+
+    def _resolve_attempt(self, connected):
+        self._wake.clear()
+        attempt, self._attempt = self._attempt, None
+        if attempt is not None and not attempt.done():
+            attempt.set_result(connected)
+
+    async def _open(self):
+        """打开 socket，启动接收任务，恢复发送并查询全部设备状态"""
+        async with self._open_lock:
+            if self._is_connected:
+                return True
+            return await self._open_locked()
+
+    async def _open_locked(self):
         try:
             self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
-            self._is_connected = True
-            _LOGGER.info(f"成功连接到 {self.host}:{self.port}")
+        except Exception as e:
+            _LOGGER.error("连接到 %s:%s 失败: %s", self.host, self.port, e)
+            self._is_connected = False
+            return False
 
-            asyncio.create_task(self._listen_for_responses())
+        self._decoder.reset()
+        self._synced_modules.clear()
+        self._is_connected = True
+        _LOGGER.info("成功连接到 %s:%s", self.host, self.port)
+        self._listen_task = asyncio.create_task(self._listen_for_responses())
+        self._pipeline.start()
+
+        # 首次连接和每次重连后都重新查询状态，断线期间的变化以网关为准，缓存的状态先顶上
+        if self._entries:
+            devices = self._devices()
+            self._track_sync(self.update_all_device_state(devices))
+            self._energy_poller.set_modules(devices)
+        self._energy_poller.start()
+        return True
 
-            devices = self.hass.data[DOMAIN][entry.entry_id].get("devices")
-            asyncio.create_task(self.update_all_device_state(devices))
+    def _devices(self):
+        """共用这个连接的全部配置条目的设备"""
+        devices = []
+        for entry_id in self._entries:
+            catalog = self.hass.data[DOMAIN].get(entry_id, {}).get("catalog")
+            if catalog is not None:
+                devices.extend(catalog)
+        return devices
+
+    def _refresh_devices(self):
+        """设备列表变化后更新状态查询和计量轮询的模块，查询已订阅但还没查询过的模块"""
+        devices = self._devices()
+        self._queries = self._state_queries(devices)
+        self._energy_poller.set_modules(devices)
+        for unique_id in self._subscribers:
+            self._schedule_module_sync(self._module_of(unique_id))
+
+    def attach(self, entry):
+        """配置条目开始使用这个连接，在创建实体之前调用"""
+        self._entries[entry.entry_id] = entry
+        if self._is_connected:
+            self._refresh_devices()
 
-            if not self._keep_alive_task:
-                self._keep_alive_task = asyncio.create_task(self._send_keep_alive())
+    def detach(self, entry_id):
+        """配置条目卸载时移除它的设备，连接本身由连接池决定是否关闭"""
+        if self._entries.pop(entry_id, None) is not None and self.hass is not None:
+            self._refresh_devices()
 
-            return True
-        except Exception as e:
-            _LOGGER.error(f"连接到 {self.host}:{self.port} 失败: {e}")
-            self._is_connected = False
-            return False
+    async def _supervise(self):
+        """守护任务：连接断开后按带抖动的指数退避重连"""
+        attempt = 0
+        try:
+            while not self._closing:
+                if self._is_connected and self._listen_task is not None:
+                    await self._listen_task
+                    if self._closing:
+                        break
+                    self._set_offline()
+                    attempt = 0
+                    continue
 
-    async def send_command(self, data):
-        """通过TCP发送命令"""
-        self.command_no = self.command_no + 1
-        _LOGGER.debug(f"发送第{self.command_no}个命令:{str(data).replace('\\x', '')}")
-        if not await self.check_connection():
-            _LOGGER.warning("连接未建立，无法发送命令")
+                delay = min(self.reconnect_max_delay, self.reconnect_min_delay * 2 ** attempt)
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                attempt += 1
+                _LOGGER.info("%.1f 秒后第 %s 次重连 %s:%s", delay, attempt, self.host, self.port)
+                try:
+                    async with asyncio.timeout(delay):
+                        await self._wake.wait()
+                except asyncio.TimeoutError:
+                    pass
+                # 退避期间连接可能已经恢复或正在关闭，重新检查后再打开
+                if self._closing or self._is_connected:
+                    self._resolve_attempt(self._is_connected)
+                    continue
+                connected = await self._open()
+                if connected:
+                    self.reconnect_count += 1
+                    attempt = 0
+                self._resolve_attempt(connected)
+        finally:
+            self._resolve_attempt(False)
+
+    def _set_offline(self):
+        """连接断开：暂停发送，关闭旧 socket，命令在队列中等待重连"""
+        self._is_connected = False
+        self._pipeline.pause()
+        self._energy_poller.stop()
+        if self.writer and not self.writer.is_closing():
+            self.writer.close()
+        _LOGGER.warning("连接到 %s:%s 已断开，等待重连", self.host, self.port)
+
+    async def send_command(self, data, priority=None, context=None):
+        """命令入队，由发送任务按优先级写出，调用方不等待写出"""
+        return self._enqueue([data], self._command_priority(priority, context))
+
+    async def send_command_list(self, data_list, priority=None, context=None):
+        """多条命令按顺序入队，帧间隔由发送任务控制"""
+        return self._enqueue(data_list, self._command_priority(priority, context))
+
+    async def send_batch(self, data_list, priority=None, context=None):
+        """批量发送控制帧：按模块分组，同一模块的帧拼接成一次写入
+
+        网关协议中每条控制帧只写一个回路，所以这里不改变帧格式，而是把同一模块的
+        多条帧（最多 MAX_BATCH_FRAMES 条）放进同一次写入，只占一个帧间隔和一次应答等待。
+        同一回路同一寄存器的多次修改只保留最后一次。
+        """
+        priority = self._command_priority(priority, context)
+        if self.collect_window > 0 and priority != PRIORITY_BACKGROUND:
+            return self._enqueue(data_list, priority)
+        return self._submit(self._build_batches(data_list), priority)
+
+    def _enqueue(self, data_list, priority):
+        """用户和自动化命令先进入收集窗口
+
+        自动化一次控制几十个实体时，HA 会在同一时刻并发调用各实体的 async_turn_on。
+        窗口结束时与 send_batch 一样按模块分组、同一寄存器只保留最后一次修改，
+        同一模块的帧拼接成一次写入，40 个回路的场景只占几个帧间隔，而不是 40 个。
+        """
+        if self.collect_window <= 0 or priority == PRIORITY_BACKGROUND:
+            return self._submit(data_list, priority)
+        self._window.setdefault(priority, []).extend(data_list)
+        if self._window_handle is None:
+            self._window_handle = asyncio.get_running_loop().call_later(self.collect_window, self._flush_window)
+        if self._is_connected:
+            return True, True
+        return None, False
+
+    def _flush_window(self):
+        """收集窗口结束，按模块拼接成批量写入后入队"""
+        self._window_handle = None
+        window, self._window = self._window, {}
+        for priority, frames in window.items():
+            self._submit(self._build_batches(frames), priority)
+
+    @staticmethod
+    def _build_batches(data_list):
+        """同一模块的帧拼接成批量写入，每次最多 MAX_BATCH_FRAMES 帧"""
+        batches = []
+        for frames in TCPConnectionManager._group_by_module(data_list):
+            for start in range(0, len(frames), MAX_BATCH_FRAMES):
+                batches.append(b"".join(frames[start:start + MAX_BATCH_FRAMES]))
+        return batches
+
+    @staticmethod
+    def _group_by_module(data_list):
+        """按模块分组，同一寄存器只保留最后一次修改，返回每个模块的帧列表"""
+        modules = {}  # 模块地址 -> {合并键: 帧}，保持首次出现的模块顺序
+        for index, data in enumerate(data_list):
+            frames = modules.setdefault(data[4] if len(data) > 4 else None, {})
+            key = coalesce_key(data)
+            if key is None:
+                key = index
+            frames.pop(key, None)  # 新值排到最后，保持与其他寄存器的先后顺序
+            frames[key] = data
+        return [list(frames.values()) for frames in modules.values()]
+
+    def _submit(self, data_list, priority):
+        """在线时直接入队；断线时缓存用户和自动化命令，重连后发送，后台轮询直接丢弃"""
+        if priority != PRIORITY_BACKGROUND and self._energy_poller.modules:
+            for data in data_list:
+                self._energy_poller.notify_command(data)
+        if self._is_connected:
+            for data in data_list:
+                self._pipeline.submit(data, priority)
+            return True, True
+
+        if priority == PRIORITY_BACKGROUND:
             return None, False
+        for data in data_list:
+            self._pipeline.submit(data, priority)
+        while self._pipeline.queued_frames > OFFLINE_BUFFER_SIZE:
+            self._pipeline.drop_oldest()
+        _LOGGER.warning("连接未建立，命令已缓存，重连后发送（当前缓存 %s 帧）", self._pipeline.queued_frames)
+        return None, False
+
+    @staticmethod
+    def _command_priority(priority, context):
+        """未指定优先级时按 HA 上下文判断：带 user_id 的是用户操作，否则是自动化或脚本"""
+        if priority is not None:
+            return priority
+        if context is not None and context.user_id is None:
+            return PRIORITY_SCHEDULED
+        return PRIORITY_USER
+
+    async def _write(self, data):
+        """发送管道的写入函数，所有出站帧都从这里写出"""
+        self.command_no = self.command_no + 1
+        if self._trace is not None:
+            self._trace.record(TX, data)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("发送第%s个命令:%s", self.command_no, data.hex().upper())
         try:
             self.writer.write(data)
             await self.writer.drain()
-            return True, True
+            return True
         except Exception as e:
-            _LOGGER.error(f"发送命令时出错: {e}")
-            self._is_connected = False  # 出错后标记为断开连接
-
-    async def send_command_list(self, data_list):
-        if not await self.check_connection():
-            _LOGGER.warning("连接未建立，无法发送命令")
-            return None, False
-        """通过TCP发送命令"""
-        for data in data_list:
-            self.command_no = self.command_no + 1
-            _LOGGER.debug(f"发送第{self.command_no}个命令:{str(data).replace('\\x', '')}")
-            try:
-                self.writer.write(data)
-                await self.writer.drain()
-                await asyncio.sleep(1)
-            except Exception as e:
-                _LOGGER.error(f"发送命令时出错: {e}")
-                self._is_connected = False  # 出错后标记为断开连接
-        return True, True
+            _LOGGER.error("发送命令时出错: %s", e)
+            # 暂停发送并关闭 socket，接收任务随之结束，由守护任务重连
+            self._pipeline.pause()
+            self.writer.close()
+            return False
 
     async def _listen_for_responses(self):
         """后台任务：监听响应并处理"""
         while self._is_connected:
             try:
-                # 等待并读取响应，假设每次响应不超过 1024 字节
+                # 等待并读取数据，一次读取可能包含多个帧，也可能只有半个帧
                 response = await asyncio.wait_for(self.reader.read(1024), timeout=5)
                 if response:
-                    response_str = bytes.fromhex(response.hex().strip())
-
-                    if len(response_str)> 13:
-                        response_dict_array = self._parse_response_array(response_str)
-                        for response_dict in response_dict_array:
-                            if response_dict['device_type'] in self._callbacks and response_dict['device']:
-                                self._callbacks[response_dict['device_type']](response_dict)
-                            elif not response_dict['device']:
-                                _LOGGER.warning(f"未识别的设备类型: {response_dict['unique_id']} {response_dict['device_type']}")
-                            else:
-                                _LOGGER.warning(f"响应处理失败: {response_dict['unique_id']} {response_dict['device']} {response_dict['device_type']}")
-
-                    response_dict = self._parse_response(response_str)
-                    if response_dict['device_type'] in self._callbacks and response_dict['device']:
-                        self._callbacks[response_dict['device_type']](response_dict)
-                        if ('redirect_type' in response_dict):
-                            response_dict['device_type'] = response_dict['redirect_type']
-                            unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["device_type"]}"
-                            device = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-                            if device:
-                                response_dict['device'] = device
-                                self._callbacks[response_dict['device_type']](response_dict)
-                            # response_dict['device'] = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-                            # self._callbacks[response_dict['device_type']](response_dict)
-                    else:
-                        _LOGGER.warning(f"未识别的设备类型: {response_dict['device_type']}")
+                    for frame in self._decoder.feed(response):
+                        if self._trace is not None:
+                            self._trace.record(RX, frame)
+                        self._pipeline.notify_frame(frame)
+                        if self._module_waiters:
+                            self._notify_module_waiter(frame)
+                        if self._probes and len(frame) > 13 and frame[4] in self._probes:
+                            responses, event = self._probes[frame[4]]
+                            responses.append(bytes(frame))
+                            event.set()
+                        self._handle_frame(frame)
                 else:
-                    _LOGGER.warning(f"连接到 {self.host}:{self.port} 关闭或断开")
-                    self._is_connected = False  # 连接关闭时标记为断开
+                    _LOGGER.warning("连接到 %s:%s 关闭或断开", self.host, self.port)
+                    break
             except asyncio.TimeoutError:
                 # 超时后继续尝试读取
                 continue
             except Exception as e:
-                _LOGGER.error(f"监听响应时出错: {e}")
-                self._is_connected = False  # 出错后标记为断开连接
+                _LOGGER.error("监听响应时出错: %s", e)
                 break
 
+    def _notify_module_waiter(self, frame):
+        """只有该模块的 B0 数组应答才算查询完成，控制上报和查询帧回显不释放并发额度"""
+        if len(frame) > 13 and frame[3] == 0xB0:
+            waiter = self._module_waiters.get(frame[4])
+            if waiter is not None:
+                waiter.set()
+
+    def _handle_frame(self, response_str):
+        """解析一个完整帧并分发给对应实体，每个帧只解析一次"""
+        if len(response_str) < 13:
+            # 解码器已丢弃数据不足的帧，这里再挡一次，越界不能结束接收任务
+            return
+        if len(response_str) > 13:
+            for frame in self.parse_response_array(response_str):
+                if isinstance(frame, EnergyFrame):
+                    # 计量读数交给回路的共享状态，由它通知继电器和四个传感器
+                    self._energy_poller.record(frame)
+                    self.energy_loop(frame.module_address, frame.loop_address).update(frame, time.time())
+                    continue
+                self._dispatch(frame)
+            return
+
+        frame = self._parse_response(response_str)
+        if not frame.device_type:
+            _LOGGER.warning("未识别的设备类型: %s", frame)
+            return
+        self._dispatch(frame)
+        if frame.redirect_type:
+            frame.device_type = frame.redirect_type
+            self._dispatch(frame)
+
+    def _dispatch(self, frame):
+        """把帧交给订阅了该地址的实体"""
+        callback = self._subscribers.get(frame.unique_id)
+        if callback is None:
+            _LOGGER.debug("没有实体订阅 %s", frame)
+            return
+        try:
+            callback(frame)
+        except Exception:
+            # 单个实体出错不能结束接收任务，否则同一网关的全部设备都会断线
+            _LOGGER.exception("实体 %s 处理状态帧出错: %s", frame.unique_id, frame)
+        if self._store is not None:
+            self._store.record(frame)
+
     async def close(self):
-        """关闭TCP连接"""
+        """关闭TCP连接，停止重连和心跳"""
+        self._closing = True
+        if self._window_handle is not None:
+            self._window_handle.cancel()
+            self._window_handle = None
+            self._window = {}
+        for task in (self._supervisor_task, self._keep_alive_task, self._listen_task, *self._sync_tasks):
+            if task is not None and not task.done():
+                task.cancel()
+        self._supervisor_task = self._keep_alive_task = self._listen_task = None
+        self._energy_poller.stop()
+        await self._pipeline.stop()
         if self.writer and not self.writer.is_closing():
             self.writer.close()
-            await self.writer.wait_closed()
-            _LOGGER.info(f"连接到 {self.host}:{self.port} 已关闭")
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            _LOGGER.info("连接到 %s:%s 已关闭", self.host, self.port)
         self._is_connected = False
 
-    async def check_connection(self):
-        """检查连接是否有效"""
-        if self.writer is None or self.writer.is_closing():
-            self._is_connected = False
-            _LOGGER.warning(f"连接到 {self.host}:{self.port} 无效，需要重新建立连接")
-            return False
-        return True
-
     async def _send_keep_alive(self):
-        """定时发送 FF 字节保持心跳"""
-        while self._is_connected:
+        """定时发送 FF 字节保持心跳，断线期间跳过，由守护任务负责重连
+
+        计量开关模块由 EnergyPollScheduler 按各自的间隔查询，这里只发心跳。
+        """
+        while not self._closing:
             try:
-                switch_with_energy_devices = []
-                # Iterate over all devices in the DOMAIN data
-                for key, data in self.hass.data[DOMAIN].items():
-                    if 'devices' not in data:
-                        break
-                    devices = data.get("devices", [])
-                    for device in devices:
-                        if device["type"] == "switch_with_energy":
-                            switch_with_energy_devices.append(device)
-
-                if switch_with_energy_devices:
-                    _LOGGER.debug("存在 switch_with_energy 设备，执行状态查询")
-                    await self.update_all_device_state_switch(switch_with_energy_devices)
-                else:
-                    _LOGGER.debug("发送保持连接的心跳包")
-                    ff_bytes = b'\xFF'
-                    await self.send_command(ff_bytes)
+                if not self._is_connected:
+                    await asyncio.sleep(60)
+                    continue
+                _LOGGER.debug("发送保持连接的心跳包")
+                ff_bytes = b'\xFF'
+                await self.send_command(ff_bytes, PRIORITY_BACKGROUND)
                 await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                _LOGGER.error(f"发送心跳包失败: {e}")
-                break
+                _LOGGER.error("发送心跳包失败: %s", e)
+                await asyncio.sleep(60)
 
     async def get_response(self):
         """获取缓存中的响应,#暂时无调用"""
@@ -174,187 +473,89 @@ class TCPConnectionManager:
         except asyncio.QueueEmpty:
             return None
 
-    def get_device_by_unique_id(self, device_type, unique_id):
-        entity_registry = async_get_entity_registry(self.hass)
-        entity_entry = None
-        for entry in entity_registry.entities.values():
-            if entry.unique_id == unique_id:
-                entity_entry = entry
-                break
-        if entity_entry is None:
-            _LOGGER.warning(f"未找到 unique_id 为 {unique_id} 的设备")
-            return None
-        entity_id = entity_entry.entity_id
-
-        if device_type in self.hass.data:
-            device = self.hass.data[device_type].get_entity(entity_id)
-        elif device_type == 'floor_heating':
-            device = self.hass.data['climate'].get_entity(entity_id)
-        elif device_type == 'fresh_air':
-            device = self.hass.data['fan'].get_entity(entity_id)
-        elif device_type == 'curtain':
-            device = self.hass.data['cover'].get_entity(entity_id)
-        elif device_type == 'switch':
-            device = self.hass.data['switch'].get_entity(entity_id)
-        elif device_type == 'scene_switch':
-            device = self.hass.data['switch'].get_entity(entity_id)
-        elif device_type == 'person_sensor':
-            device = self.hass.data['binary_sensor'].get_entity(entity_id)
-        elif device_type == '8button':
-            device = self.hass.data['switch'].get_entity(entity_id)
-        elif device_type == 'switch_with_energy':
-            device = self.hass.data['switch'].get_entity(entity_id)
-
-        if device is None:
-            _LOGGER.warning(f"未找到 entity_id 为 {entity_id} 的设备实例")
-            return None
-        return device
-
-    def register_callback(self, device_type, callback):
-        """注册回调函数"""
-        self._callbacks[device_type] = callback
-        # self._callbacks.append(callback)
+    def diagnostics(self):
+        """连接与发送管道的诊断信息"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "connected": self._is_connected,
+            "reconnect_count": self.reconnect_count,
+            "collect_window_ms": round(self.collect_window * 1000),
+            "suppressed_writes": self.suppressed_writes,
+            **self._pipeline.diagnostics(),
+            **self._energy_poller.diagnostics(),
+            "frame_trace": self._trace.dump() if self._trace is not None else None,
+            "energy_history": self.energy_diagnostics(),
+        }
 
-    def _parse_response(self, response_str):
-        _LOGGER.debug(f"接收响应：{str(response_str).replace('\\x', '')}")
-        hvac_off = [0x01, 0x0A, 0x13, 0x1C, 0x25, 0x2E, 0x37, 0x40, 0x49, 0x52, 0x5B, 0x64, 0x6D, 0x76, 0x7F, 0x88]
-        hvac_mode = [0x02, 0x0B, 0x14, 0x1D, 0x26, 0x2F, 0x38, 0x41, 0x4A, 0x53, 0x5C, 0x65, 0x6E, 0x77, 0x80, 0x89]
-        hvac_fan = [0x03, 0x0C, 0x15, 0x1E, 0x27, 0x30, 0x39, 0x42, 0x4B, 0x54, 0x5D, 0x66, 0x6F, 0x78, 0x81, 0x8A]
-        hvac_current_set_point = [0x04, 0x0D, 0x16, 0x1F, 0x28, 0x31, 0x3A, 0x43, 0x4C, 0x55, 0x5E, 0x67, 0x70, 0x79, 0x82, 0x8B]
-        floor_heat_mode = [0x05, 0x0E, 0x17, 0x20, 0x29, 0x32, 0x3B, 0x44, 0x4D, 0x56, 0x5F, 0x68, 0x71, 0x7A, 0x83, 0x8C]
-        floor_heat_temperature = [0x06, 0x0F, 0x18, 0x21, 0x2A, 0x33, 0x3C, 0x45, 0x4E, 0x57, 0x60, 0x69, 0x72, 0x7B, 0x84, 0x8D]
-        hvac_fan_mode = [0x07, 0x10, 0x19, 0x22, 0x2B, 0x34, 0x3D, 0x46, 0x4F, 0x58, 0x61, 0x6A, 0x73, 0x7C, 0x85, 0x8E]
-        hvac_fan_speed = [0x08, 0x11, 0x1A, 0x23, 0x2C, 0x35, 0x3E, 0x47, 0x50, 0x59, 0x62, 0x6B, 0x74, 0x7D, 0x86, 0x8F]
-        hvac_current_temperature = [0x09, 0x12, 0x1B, 0x24, 0x2D, 0x36, 0x3F, 0x48, 0x51, 0x5A, 0x63, 0x6C, 0x75, 0x7E, 0x87, 0x90]
-        shade_address = [0x14, 0x17, 0x1A, 0x1D, 0x20, 0x23, 0x26, 0x29, 0x2C, 0x2F, 0x32, 0x35, 0x38, 0x3B, 0x3E]
-        response_dict = {
-            "response_str": response_str,
-            "data1": response_str[8],
-            "data2": response_str[9],
-            "data3": response_str[10],
-            "data4": response_str[11],
-            "device_type":"",
-            "sub_device_type":"",
-            "hvac_type": "",
-            "switch_type":"",
-            "module_address": response_str[4],
-            "loop_address": response_str[5],
-            "unique_id":"",
-            "button_index":"",
-            "device":None
+    def energy_diagnostics(self, window=ENERGY_DIAGNOSTICS_WINDOW):
+        """每个计量回路最近 window 秒的读数和缓冲区内的统计，键为 模块_回路"""
+        since = time.time() - window
+        result = {}
+        for (module, loop), energy in sorted(self._energy_loops.items()):
+            history = energy.history
+            result[f"{module}_{loop}"] = {
+                "stats": {field: history.stats(field) for field in STAT_FIELDS},
+                "samples": [dict(zip(("time", *FIELDS), sample)) for sample in history.samples(since)],
+            }
+        return result
+
+    def energy_loop(self, module_address, loop_address):
+        """计量回路的共享状态，实体创建时或第一次收到读数时创建"""
+        key = (int(module_address), int(loop_address))
+        energy = self._energy_loops.get(key)
+        if energy is None:
+            energy = self._energy_loops[key] = EnergyLoop(self.energy_record_interval)
+        return energy
+
+    def subscribe(self, unique_id, callback):
+        """按设备地址 (unique_id) 订阅状态帧，返回取消订阅的函数
+
+        实体在 async_added_to_hass 中订阅，并通过 async_on_remove 在卸载时取消，
+        选项流程重新加载配置条目时不会留下指向旧实体的回调。
+        """
+        self._subscribers[unique_id] = callback
+        if self._store is not None:
+            for frame in self._store.frames(unique_id):
+                try:
+                    callback(frame)
+                except Exception as e:
+                    _LOGGER.warning("回放 %s 的缓存状态失败: %s", unique_id, e)
+        # 连接建立后才加入的实体（如刚启用），单独查询它所在的模块
+        if self._is_connected:
+            self._schedule_module_sync(self._module_of(unique_id))
 
-        }
-        if response_dict["data2"] == 0x00 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x00:
-            response_dict["device_type"] = "switch"
-            response_dict["switch_type"] = "num0"
-            response_dict["redirect_type"] = "switch_with_energy"
-
-        elif response_dict["data2"] == 0x04 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x00 and response_dict["loop_address"] in shade_address:
-            response_dict["loop_address"] = (response_dict["loop_address"] - 17) // 3
-            response_dict["device_type"] = "curtain"
-
-        elif response_dict["loop_address"] == 0x00 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x00:
-            response_dict["loop_address"] = response_str[9]
-            response_dict["device_type"] = "person_sensor"
-
-        elif response_dict["loop_address"] == 0x00 and response_dict["data4"] == 0x00:
-            response_dict["button_index"] = response_str[9]
-            response_dict["loop_address"] = response_str[10]
-            response_dict["device_type"] = "8button"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x11:
-            response_dict["device_type"] = "light"
-            response_dict["sub_device_type"] = "DALI-01"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x12:
-            response_dict["device_type"] = "light"
-            response_dict["sub_device_type"] = "DALI-01"
-            if response_dict["data4"] == 0x12:
-                response_dict["loop_address"] = response_dict["loop_address"] - 1
-
-        elif response_dict["data4"] == 0x15:
-            response_dict["device_type"] = "light"
-            response_dict["sub_device_type"] = "DALI-02"
-        
-        elif response_dict["data4"] == 0x13:
-            response_dict["device_type"] = "light"
-            response_dict["sub_device_type"] = "rgb"
-            if response_dict["data4"] == 0x13:
-                response_dict["loop_address"] = response_dict["loop_address"] - 2
-
-        elif response_dict["data2"] == 0x00 and response_dict["data3"] == 0x00 and response_dict["data4"] == 0x10:
-            response_dict["device_type"] = "light"
-            response_dict["sub_device_type"] = "0603D"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x20 and response_dict["loop_address"] in hvac_off:
-            response_dict["device_type"] = "climate"
-            # response_dict["loop_address"] = (response_dict["loop_address"] + 287) // 9
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_01"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x20 and response_dict["loop_address"] in hvac_mode:
-            response_dict["device_type"] = "climate"
-            # response_dict["loop_address"] = (response_dict["loop_address"] + 286) // 9
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_02"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x20 and response_dict["loop_address"] in hvac_fan:
-            response_dict["device_type"] = "climate"
-            # response_dict["loop_address"] = (response_dict["loop_address"] + 285) // 9
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_03"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x20 and response_dict["loop_address"] in hvac_current_set_point:
-            response_dict["device_type"] = "climate"
-            # response_dict["loop_address"] = (response_dict["loop_address"] + 284) // 9
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_04"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x20 and response_dict["loop_address"] in hvac_current_temperature:
-            # hvac_fhs = ["climate", "floor_heating"]
-            # for hvac_fh in hvac_fhs:
-            #     response_dict["device_type"] = hvac_fh
-            response_dict["device_type"] = "climate"
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_09"
-            response_dict["redirect_type"] = "floor_heating"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x21 and response_dict["loop_address"] in floor_heat_mode:
-            response_dict["device_type"] = "floor_heating"
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_05"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x21 and response_dict["loop_address"] in floor_heat_temperature:
-            response_dict["device_type"] = "floor_heating"
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_06"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x22 and response_dict["loop_address"] in hvac_fan_mode:
-            response_dict["device_type"] = "fresh_air"
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_07"
-
-        elif response_dict["data2"] == 0x00 and response_dict["data4"] == 0x22 and response_dict["loop_address"] in hvac_fan_speed:
-            response_dict["device_type"] = "fresh_air"
-            response_dict["loop_address"] = response_dict["data3"]
-            response_dict["hvac_type"] = "hvac_08"
-
-        # todo: switch_with_energy 类型判断
-        elif response_dict["device_type"] == "switch_with_energy":
-            response_dict["device_type"] = "switch_with_energy"
-            unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_switch_with_energy"
-
-        if response_dict["device_type"] == "8button":
-            unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["button_index"]}_{response_dict["device_type"]}"
-        else:
-            unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["device_type"]}"
+        def unsubscribe():
+            if self._subscribers.get(unique_id) is callback:
+                del self._subscribers[unique_id]
 
-        response_dict['device'] = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-        return response_dict
+        return unsubscribe
 
-    def _parse_response_array(self, response_str):
-        _LOGGER.debug(f"接收响应：{str(response_str).replace('\\x', '')}")
-        response_dict_array = []
+    def _parse_response(self, response_str):
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("接收响应：%s", response_str.hex().upper())
+        frame = Frame(
+            response_str[4],
+            response_str[5],
+            response_str[8],
+            response_str[9],
+            response_str[10],
+            response_str[11],
+        )
+        rule = classify_frame(frame.data2, frame.data3, frame.data4, frame.loop_address)
+        if rule is not None:
+            frame.device_type = rule.device_type
+            frame.sub_device_type = rule.sub_device_type
+            frame.hvac_type = rule.hvac_type
+            frame.redirect_type = rule.redirect_type
+            frame.loop_address, frame.button_index = rule.loop_transform(frame.loop_address, frame.data2, frame.data3)
+        return frame
+
+    def parse_response_array(self, response_str):
+        """把一个 B0 数组应答帧解码为各回路的 Frame / EnergyFrame 列表，发现扫描也使用"""
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("接收响应：%s", response_str.hex().upper())
+        frame_array = []
         module_address = response_str[4]
         response_start = response_str[5]
         response_length = response_str[7]
@@ -364,59 +565,20 @@ class TCPConnectionManager:
             for idx,response in enumerate(response_array):
                 if idx == 8:
                     break
-                response_dict = {
-                    "response_str": response_str,
-                    "data1": response[0],
-                    "data2": response[1],
-                    "data3": response[2],
-                    "data4": response[3],
-                    "device_type":"switch",
-                    "sub_device_type":"",
-                    "switch_type": "num0",
-                    "module_address": module_address,
-                    "loop_address": idx +1,
-                    "unique_id":"",
-                    "button_index":"",
-                    "device":None
-                }
-                unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["device_type"]}"
-                response_dict['device'] = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-                if response_dict['device']:
-                    response_dict_array.append(response_dict)
+                frame = Frame(module_address, idx + 1, response[0], response[1], response[2], response[3], device_type="switch")
+                frame_array.append(frame)
 
         elif response_length == 0x40:
             response_array = [response_str[i:i+4] for i in range(8, len(response_str), 4)]
             for idx,response in enumerate(response_array):
                 if idx == 16:
                     break
-                # response_start = 1
-                if response_start == 0x01:
-                    response_start = 1
-                elif response_start == 0x11:
-                    response_start = 17
-                elif response_start == 0x21:
-                    response_start = 33
-                elif response_start == 0x31:
-                    response_start = 49
-                # len = 9 if response_start == 0x21 else 1
-                response_dict = {
-                    "response_str": response_str,
-                    "data1": response[0],
-                    "data2": response[1],
-                    "data3": response[2],
-                    "data4": response[3],
-                    "device_type":"light",
-                    "sub_device_type":"DALI-02",
-                    "hvac_type": "",
-                    "module_address": module_address,
-                    "loop_address": str(idx+response_start),
-                    "unique_id":"",
-                    "button_index":"",
-                    "device":None
-                }
-                unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["device_type"]}"
-                response_dict['device'] = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-                response_dict_array.append(response_dict)
+                # 起始回路 0x01/0x11/0x21/0x31 即 1/17/33/49
+                frame = Frame(
+                    module_address, idx + response_start, response[0], response[1], response[2], response[3],
+                    device_type="light", sub_device_type="DALI-02",
+                )
+                frame_array.append(frame)
 
         elif response_length == 0x24:
             response_array = [response_str[i:i+4] for i in range(8, len(response_str), 4)]
@@ -426,204 +588,150 @@ class TCPConnectionManager:
             for idx,response in enumerate(response_array):
                 if idx == 9:
                     break
-                response_dict = {
-                    "response_str": response_str,
-                    "data1": response[0],
-                    "data2": response[1],
-                    "data3": response[2],
-                    "data4": response[3],
-                    "device_type":"",
-                    "sub_device_type":"",
-                    "hvac_type": "",
-                    "module_address": module_address,
-                    "loop_address": str(idx+response_start),
-                    "unique_id":"",
-                    "button_index":"",
-                    "device":None
-                }
-                if response_dict["data4"] == 0x20 and idx == 0:
-                    response_dict["device_type"] = "climate"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_01"
-                elif response_dict["data4"] == 0x20 and idx == 1 and hvac1_state != 0x00:
-                    response_dict["device_type"] = "climate"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_02"
-                elif response_dict["data4"] == 0x20 and idx == 2 and hvac1_state != 0x00:
-                    response_dict["device_type"] = "climate"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_03"
-                elif response_dict["data4"] == 0x20 and idx == 3 and hvac1_state != 0x00:
-                    response_dict["device_type"] = "climate"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_04"
-                elif response_dict["data4"] == 0x21 and idx == 4:
-                    response_dict["device_type"] = "floor_heating"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_05"
-                elif response_dict["data4"] == 0x21 and idx == 5  and hvac2_state != 0x00:
-                    response_dict["device_type"] = "floor_heating"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_06"
-                elif response_dict["data4"] == 0x22 and idx == 6:
-                    response_dict["device_type"] = "fresh_air"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_07"
-                elif response_dict["data4"] == 0x22 and idx == 7 and hvac3_state != 0x00:
-                    response_dict["device_type"] = "fresh_air"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_08"
-                elif response_dict["data4"] == 0x20 and idx == 8:
-                    response_dict["device_type"] = "climate"
-                    response_dict["loop_address"] = response_dict["data3"]
-                    response_dict["hvac_type"] = "hvac_09"
-                    response_dict["redirect_type"] = "floor_heating"
+                data4 = response[3]
+                if data4 == 0x20 and idx == 0:
+                    device_type, hvac_type = "climate", HvacType.OFF
+                elif data4 == 0x20 and idx == 1 and hvac1_state != 0x00:
+                    device_type, hvac_type = "climate", HvacType.MODE
+                elif data4 == 0x20 and idx == 2 and hvac1_state != 0x00:
+                    device_type, hvac_type = "climate", HvacType.FAN
+                elif data4 == 0x20 and idx == 3 and hvac1_state != 0x00:
+                    device_type, hvac_type = "climate", HvacType.SET_POINT
+                elif data4 == 0x21 and idx == 4:
+                    device_type, hvac_type = "floor_heating", HvacType.FLOOR_MODE
+                elif data4 == 0x21 and idx == 5  and hvac2_state != 0x00:
+                    device_type, hvac_type = "floor_heating", HvacType.FLOOR_SET_POINT
+                elif data4 == 0x22 and idx == 6:
+                    device_type, hvac_type = "fresh_air", HvacType.FRESH_AIR_MODE
+                elif data4 == 0x22 and idx == 7 and hvac3_state != 0x00:
+                    device_type, hvac_type = "fresh_air", HvacType.FRESH_AIR_SPEED
+                elif data4 == 0x20 and idx == 8:
+                    device_type, hvac_type = "climate", HvacType.CURRENT_TEMP
                 else:
                     continue
-                unique_id = f"{response_dict["module_address"]}_{response_dict["loop_address"]}_{response_dict["device_type"]}"
-                response_dict['device'] = self.get_device_by_unique_id(response_dict["device_type"],unique_id)
-                response_dict_array.append(response_dict)
+                # 空调类的回路地址在 data3
+                frame = Frame(
+                    module_address, response[2], response[0], response[1], response[2], data4,
+                    device_type=device_type, hvac_type=hvac_type,
+                )
+                if hvac_type == HvacType.CURRENT_TEMP:
+                    frame.redirect_type = "floor_heating"
+                frame_array.append(frame)
 
         elif response_length == 0x50:
-            response_array = [response_str[i:i+4] for i in range(8, len(response_str), 4)]
-            response_start = response_str[5]
-            device_dict = {}
-            devices_list = []
-
-            for idx,response in enumerate(response_array):
-                if idx == 20:
-                    break
-                if idx < 4 and idx >=0:
-                    loop_address = idx + response_start
-                    device_dict = {
-                        "device_type":"switch_with_energy",
-                        "module_address": module_address,
-                        "loop_address": loop_address,
-                        "unique_id":"",
-                        "device":None,
-                        "state": False,
-                        "voltage_sensor":0.0,
-                        "current_sensor":0.0,
-                        "power_sensor":0.0,
-                        "energy_sensor":0.0
-                    }
-                    unique_id = f"{module_address}_{loop_address}_switch_with_energy"
-                    device_dict['unique_id'] = unique_id
-                    device_dict['device'] = self.get_device_by_unique_id("switch_with_energy",unique_id)
-                    if device_dict['device']:
-                        if response[0] == 0x00:
-                            device_dict['state'] = False
-                        else:
-                            device_dict['state'] = True
-                        devices_list.append(device_dict)
-
-
-                if idx < 8 and idx >=4 :
-                    loop_address = idx - 3
-                    device_dict = next((d for d in devices_list if d.get("loop_address") == loop_address), None)
-                    if device_dict:
-                        device_dict['current_sensor'] = response[0] / 1000
-
-                if idx < 12 and idx >=8:
-                    loop_address = idx - 7
-                    device_dict = next((d for d in devices_list if d.get("loop_address") == loop_address), None)
-                    if device_dict:
-                        device_dict['voltage_sensor'] = response[0]
-
-                if idx < 16 and idx >=12:
-                    loop_address = idx - 11
-                    device_dict = next((d for d in devices_list if d.get("loop_address") == loop_address), None)
-                    if device_dict:
-                        device_dict['power_sensor'] = response[0] / 1000
-
-                if idx < 20 and idx >=16:
-                    loop_address = idx - 15
-                    device_dict = next((d for d in devices_list if d.get("loop_address") == loop_address), None)
-                    if device_dict:
-                        hex_part1 = format(response[1], "02x")
-                        hex_part2 = format(response[0], "02x")
-                        combined_hex = hex_part1 + hex_part2
-                        decimal_value = int(combined_hex, 16) / 100
-                        device_dict['energy_sensor'] = decimal_value
-            if devices_list:
-                response_dict_array = response_dict_array + devices_list
-        return response_dict_array
-
-    async def update_all_device_state(self, devices):
-        command_list = []
-        processed_types = ["light","switch","climate"]
-        queryed_device = []
+            # 一次解出 4 个回路的全部计量值，回路地址从起始回路依次递增
+            values = _ENERGY_BLOCK.unpack_from(response_str, HEADER_LENGTH)
+            for idx in range(4):
+                frame_array.append(EnergyFrame(
+                    module_address, response_start + idx,
+                    state=values[idx] != 0x00,
+                    current=values[4 + idx] / 1000,
+                    voltage=values[8 + idx],
+                    power=values[12 + idx] / 1000,
+                    energy=values[16 + idx] / 100,
+                ))
+        return frame_array
+
+    def _state_queries(self, devices):
+        """按模块生成状态查询帧，模块地址 -> 帧列表，每个模块按第一个设备的类型查询"""
+        queries = {}
         for device in devices:
             device_type = device.get("type")
             sub_device_type = device.get("sub_device_type")
-            host = device.get("host")
-            module_address = device.get('module_address')
-            loop_address = device.get('loop_address')
-
-            if device_type not in processed_types:
+            if device_type not in ("light", "switch", "climate"):
                 continue
-            if module_address in queryed_device:
+            module_address = int(device.get('module_address'))
+            if module_address in queries:
                 continue
-            queryed_device.append(module_address)
-
-            self.host_hex = f"AC{int(host.split('.')[-1]):02X}00B0"
-            self.module_hex = f"{int(module_address):02X}"
-            self.loop_hex = f"{int(loop_address):02X}"
-            self.host_bytes = bytes.fromhex(self.host_hex)
-            self.module_bytes = bytes.fromhex(self.module_hex)
-            self.loop_bytes = bytes.fromhex(self.loop_hex)
+
+            header = bytes((0xAC, int(device.get("host").split('.')[-1]), 0x00, 0xB0, module_address))
             if device_type == "light" and sub_device_type == "DALI-02":
-                for cmd in [
-                    f"{self.module_hex}01000110CA",
-                    f"{self.module_hex}11000110CA",
-                    f"{self.module_hex}21000110CA",
-                    f"{self.module_hex}31000110CA"
-                ]:
-                    command_bytes = bytes.fromhex(cmd)
-                    command_list.append(self.host_bytes + command_bytes)
+                commands = [header + bytes((start, 0x00, 0x01, 0x10, 0xCA)) for start in (0x01, 0x11, 0x21, 0x31)]
             elif device_type == "light" and sub_device_type == "0603D":
-                command_hex = f'{self.module_hex}01000106CA'
-                command_bytes = bytes.fromhex(command_hex)
-                command_list.append(self.host_bytes + command_bytes)
+                commands = [header + b"\x01\x00\x01\x06\xCA"]
             elif device_type == "switch":
-                command_hex = f'{self.module_hex}01000108CA'
-                command_bytes = bytes.fromhex(command_hex)
-                command_list.append(self.host_bytes + command_bytes)
+                commands = [header + b"\x01\x00\x01\x08\xCA"]
             elif device_type == "climate":
-                command_hex = f'{self.module_hex}01000109CA'
-                command_bytes = bytes.fromhex(command_hex)
-                command_list.append(self.host_bytes + command_bytes)
-            elif device_type == "switch_with_energy":
-                command_hex = f'{self.module_hex}01000114CA'
-                command_bytes = bytes.fromhex(command_hex)
-                command_list.append(self.host_bytes + command_bytes)
-
-        await self.send_command_list(command_list)
-        _LOGGER.debug("已查询所有设备状态")
-
-    async def update_all_device_state_switch(self, devices):
-        command_list = []
-        processed_types = ["switch_with_energy"]
-        for device in devices:
-            device_type = device.get("type")
-            sub_device_type = device.get("sub_device_type")
-            host = device.get("host")
-            module_address = device.get('module_address')
-            loop_address = device.get('loop_address')
-
-            if device_type not in processed_types:
-                continue
-
-            host_hex = f"AC{int(host.split('.')[-1]):02X}00B0"
-            module_hex = f"{int(module_address):02X}"
-            loop_hex = f"{int(loop_address):02X}"
-            host_bytes = bytes.fromhex(host_hex)
-            module_bytes = bytes.fromhex(module_hex)
-            loop_bytes = bytes.fromhex(loop_hex)
-
-            if device_type == "switch_with_energy":
-                command_hex = f'{module_hex}01000114CA'
-                command_bytes = bytes.fromhex(command_hex)
-                command_list.append(host_bytes + command_bytes)
+                commands = [header + b"\x01\x00\x01\x09\xCA"]
+            else:
+                commands = []
+            queries[module_address] = commands
+        return queries
+
+    @staticmethod
+    def _module_of(unique_id):
+        """unique_id 以 模块_回路_ 开头"""
+        try:
+            return int(unique_id.split("_", 1)[0])
+        except ValueError:
+            return None
 
-        await self.send_command_list(command_list)
\ No newline at end of file
+    async def update_all_device_state(self, devices):
+        """连接后同步状态
+
+        只查询有实体订阅的模块，没有缓存状态的模块排在前面；其余模块在实体订阅时再查询。
+        查询在 SYNC_CONCURRENCY 的并发额度内进行：每个模块的查询发出后等待该模块应答
+        （最多 SYNC_TIMEOUT 秒）再释放额度，启动时间不再随模块数线性增长，也不会挤占用户命令。
+        """
+        self._queries = self._state_queries(devices)
+        visible = {}
+        for unique_id in self._subscribers:
+            module = self._module_of(unique_id)
+            if module in self._queries:
+                cached = self._store is not None and self._store.has_state(unique_id)
+                visible[module] = visible.get(module, True) and cached
+        # False（有实体没有缓存）排在 True 前面
+        modules = sorted(visible, key=lambda module: visible[module])
+        await asyncio.gather(*(self._sync_module(module) for module in modules))
+        _LOGGER.debug("已查询 %s 个模块的状态", len(modules))
+
+    async def probe_module(self, module, commands, timeout):
+        """以后台优先级发送查询，收集该模块的数组应答帧，收齐 len(commands) 帧或第一帧查询写出 timeout 秒后返回"""
+        if not self._is_connected or module in self._probes:
+            return []
+        responses, event = self._probes[module] = ([], asyncio.Event())
+        futures = [self._pipeline.submit(data, PRIORITY_BACKGROUND) for data in commands]
+        try:
+            # 等待时间从该模块的第一帧查询写出时算起，排在前面的帧（含应答节拍的等待）不计入；
+            # 等待写出的时间按队列深度估算上限，断线暂停时不会一直挂起
+            async with asyncio.timeout(timeout + self._pipeline.drain_time()):
+                if not await futures[0]:
+                    return responses
+            async with asyncio.timeout(timeout):
+                while len(responses) < len(commands):
+                    event.clear()
+                    await event.wait()
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            del self._probes[module]
+        return responses
+
+    def _track_sync(self, coro):
+        """同步任务随连接关闭一起取消"""
+        task = asyncio.create_task(coro)
+        self._sync_tasks.add(task)
+        task.add_done_callback(self._sync_tasks.discard)
+
+    def _schedule_module_sync(self, module):
+        if module in self._queries and module not in self._synced_modules:
+            self._track_sync(self._sync_module(module))
+
+    async def _sync_module(self, module):
+        """查询一个模块并等待其应答"""
+        if module in self._synced_modules:
+            return
+        self._synced_modules.add(module)
+        async with self._sync_semaphore:
+            commands = self._queries.get(module)
+            if not commands or not self._is_connected:
+                return
+            waiter = self._module_waiters[module] = asyncio.Event()
+            for data in commands:
+                self._pipeline.submit(data, PRIORITY_BACKGROUND)
+            try:
+                await asyncio.wait_for(waiter.wait(), SYNC_TIMEOUT)
+            except asyncio.TimeoutError:
+                _LOGGER.debug("模块 %s 状态查询超时", module)
+            finally:
+                self._module_waiters.pop(module, None)
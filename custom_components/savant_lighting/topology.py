@@ -0,0 +1,114 @@
+import logging
+
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN, PLATFORM_DEVICE_TYPES
+from .device_catalog import DeviceCatalog, device_key, unique_ids
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_platform(hass, entry, platform, create_entities, async_add_entities):
+    """平台的 async_setup_entry：按设备创建实体，并登记创建函数供选项流程增量增删设备
+
+    create_entities(device, tcp_manager) 返回该设备在本平台的实体列表。
+    """
+    config = hass.data[DOMAIN][entry.entry_id]
+    await config["state_store"].async_load()  # 实体加入时回放上次保存的状态
+    config["platforms"][platform] = (create_entities, async_add_entities)
+    entities = []
+    for device in config["catalog"].for_platform(platform):
+        created = create_entities(device, config["tcp_manager"])
+        if created:
+            config["entities"].setdefault(device_key(device), []).extend(created)
+            entities.extend(created)
+    async_add_entities(entities, update_before_add=True)
+
+
+def entry_catalog(hass, entry):
+    """配置条目的设备目录；配置条目未加载时按 entry.data 临时建立"""
+    config = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if config is not None:
+        return config["catalog"]
+    return DeviceCatalog(entry.data.get("devices", []))
+
+
+def _save(hass, entry, catalog):
+    """设备目录变化后写回配置条目，并更新连接的状态查询、计量轮询"""
+    hass.config_entries.async_update_entry(entry, data={**entry.data, "devices": catalog.devices})
+    config = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if config is not None:
+        config["tcp_manager"].attach(entry)
+    return config
+
+
+async def async_add_device(hass, entry, device):
+    """加入设备并只为它创建实体，新实体订阅时只查询它所在的模块，不重新加载配置条目"""
+    await async_add_devices(hass, entry, [device])
+
+
+async def async_add_devices(hass, entry, devices):
+    """批量加入设备：配置条目只写一次，每个平台只调用一次 async_add_entities"""
+    catalog = entry_catalog(hass, entry)
+    for device in devices:
+        catalog.add(device)
+    config = _save(hass, entry, catalog)
+    _add_entities(config, devices)
+
+
+def _add_entities(config, devices):
+    """在设备所属的平台上创建实体"""
+    if config is None:
+        return
+    for platform, (create_entities, async_add_entities) in config["platforms"].items():
+        device_types = PLATFORM_DEVICE_TYPES.get(platform, ())
+        entities = []
+        for device in devices:
+            if device["type"] not in device_types:
+                continue
+            created = create_entities(device, config["tcp_manager"])
+            if created:
+                config["entities"].setdefault(device_key(device), []).extend(created)
+                entities.extend(created)
+        if entities:
+            async_add_entities(entities, update_before_add=True)
+
+
+async def _remove_entities(hass, config, device, remove_from_registry):
+    """移除一个设备的实体，取消订阅随实体移除完成"""
+    if config is None:
+        return []
+    entities = config["entities"].pop(device_key(device), [])
+    entity_registry = er.async_get(hass)
+    for entity in entities:
+        entity_id = entity.entity_id
+        await entity.async_remove(force_remove=True)
+        if remove_from_registry and entity_id and entity_registry.async_get(entity_id):
+            entity_registry.async_remove(entity_id)
+    _LOGGER.debug("已移除设备 %s 的 %s 个实体", device_key(device), len(entities))
+    return entities
+
+
+async def async_remove_device(hass, entry, device):
+    """删除设备及其实体"""
+    catalog = entry_catalog(hass, entry)
+    catalog.remove(device)
+    config = _save(hass, entry, catalog)
+    return await _remove_entities(hass, config, device, remove_from_registry=True)
+
+
+async def async_update_device(hass, entry, old_device, new_device):
+    """设备配置修改后重建该设备的实体，保留仍然存在的实体注册信息（实体 ID、自定义名称等）"""
+    catalog = entry_catalog(hass, entry)
+    catalog.replace(old_device, new_device)
+    config = _save(hass, entry, catalog)
+    removed = await _remove_entities(hass, config, old_device, remove_from_registry=False)
+    if config is None:
+        return
+    current = set(unique_ids(new_device))
+    entity_registry = er.async_get(hass)
+    for entity in removed:
+        # 例如 8 键开关取消勾选的按键
+        if entity.unique_id not in current and entity.entity_id and entity_registry.async_get(entity.entity_id):
+            entity_registry.async_remove(entity.entity_id)
+    _add_entities(config, [new_device])
@@ -0,0 +1,60 @@
+import asyncio
+
+
+class FakeGateway:
+    """本地模拟网关：记录收到的数据，可以主动断开和恢复监听"""
+
+    def __init__(self, host="127.0.0.1"):
+        self.host = host
+        self.port = 0
+        self.received = bytearray()
+        self.connections = 0
+        self._server = None
+        self._writers = []
+        self._data_event = asyncio.Event()
+        self.responses = {}  # 查询帧 -> 应答帧，模拟网关对 B0 状态查询的应答
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.append(writer)
+        try:
+            while data := await reader.read(1024):
+                self.received += data
+                self._data_event.set()
+                for query, response in self.responses.items():
+                    if query in data:
+                        writer.write(response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def kill(self):
+        """停止监听并断开所有客户端，模拟网关掉线"""
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+        await self._server.wait_closed()
+
+    async def restore(self):
+        """在原端口重新监听，模拟网关恢复"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def push(self, frame):
+        """向所有客户端推送一帧状态上报"""
+        for writer in self._writers:
+            writer.write(frame)
+            await writer.drain()
+
+    async def wait_for(self, data, timeout=5):
+        """等待收到包含 data 的字节流"""
+        async with asyncio.timeout(timeout):
+            while data not in self.received:
+                self._data_event.clear()
+                await self._data_event.wait()
@@ -0,0 +1,48 @@
+import pytest
+from homeassistant.components.climate.const import HVACMode
+from custom_components.savant_lighting.command_helper import (
+    ClimateCommand,
+    LightCommand,
+    SwitchCommand,
+    SwitchSceneCommand,
+)
+
+HOST = "192.168.1.10"
+LIGHT = LightCommand(HOST, 7, 3, 2)
+SWITCH = SwitchCommand(HOST, 5, 4)
+CLIMATE = ClimateCommand(HOST, 10, 33)
+
+
+@pytest.mark.parametrize(
+    "command, expected",
+    [
+        (LIGHT.turnonoff("on"), "AC0A00100703000401000001CA"),
+        (LIGHT.brightness(None), "AC0A0010070300040002FF10CA"),
+        (LIGHT.brightness(55), "AC0A0010070300043702FF10CA"),
+        (LIGHT.dali01_brightness(100), "AC0A00100703000464020010CA"),
+        (LIGHT.dali01_color_temp("27"), "AC0A0010070400041B000000CA"),
+        (LIGHT.dali02_color_temp("40"), "AC0A001007030004FF002810CA"),
+        (LIGHT.rgb_color_temp("30"), "AC0A0010070400041E000012CA"),
+        (LIGHT.rgb_color(300, -1, 16), "AC0A001007050004FF001013CA"),
+        (LIGHT.query_dali02_04_state(), "AC0A0010B00731000120CA"),
+        (SWITCH.turnonoff("off"), "AC0A00100504000400000000CA"),
+        (SWITCH.query_state(), "AC0A00100501000108CA"),
+        (CLIMATE.temperature("temp:25.5"), "AC0A00100A0D000419000000CA"),
+        (CLIMATE.fan_mode("medium"), "AC0A00100A0C000402000000CA"),
+        (CLIMATE.floor_heat_temperature("temp:28"), "AC0A00100A0F00041C000000CA"),
+        (SwitchSceneCommand(HOST, 9).turnonoff("off"), "AC0A10100009000401000000CA"),
+    ],
+)
+def test_command_bytes(command, expected):
+    """预计算前缀后生成的帧与原十六进制拼接结果一致。"""
+    assert command.hex().upper() == expected
+
+
+def test_hvac_mode_frames():
+    """空调模式先开机再设模式，关机只发一帧。"""
+    assert [cmd.hex().upper() for cmd in CLIMATE.hvac_mode(HVACMode.HEAT)] == [
+        "AC0A00100A0A000401000000CA",
+        "AC0A00100A0B000408002020CA",
+    ]
+    assert [cmd.hex().upper() for cmd in CLIMATE.hvac_mode(HVACMode.OFF)] == ["AC0A00100A0A000400002020CA"]
+    assert CLIMATE.hvac_mode(HVACMode.FAN_ONLY) == []
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from custom_components.savant_lighting.connection_pool import ConnectionPool, connection_options
+from custom_components.savant_lighting.const import DOMAIN
+from custom_components.savant_lighting.device_catalog import DeviceCatalog
+from tests.fake_gateway import FakeGateway
+from tests.test_reconnect import DEVICES, SWITCH_ON, SWITCH_QUERY
+
+
+@pytest.mark.asyncio
+async def test_reload_reuses_live_connection():
+    """释放后在保持时间内重新取得连接，复用在线的 socket，不再重新查询状态。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    pool = ConnectionPool(linger=5)
+    entry = SimpleNamespace(entry_id="entry")
+    hass = SimpleNamespace(data={DOMAIN: {"entry": {"catalog": DeviceCatalog(DEVICES)}}})
+    options = {"frame_gap_ms": 0}
+    try:
+        manager = await pool.acquire(gateway.host, gateway.port, options)
+        manager.set_hass(hass)
+        manager.subscribe("5_3_switch", lambda frame: None)
+        manager.attach(entry)
+        assert await manager.connect(entry)
+        await gateway.wait_for(SWITCH_QUERY)
+
+        # send_command.py 的辅助函数共用同一个连接
+        async with pool.connection(gateway.host, gateway.port) as shared:
+            assert shared is manager
+            await shared.send_command(SWITCH_ON)
+        await gateway.wait_for(SWITCH_ON)
+
+        # 模拟重新加载：卸载时释放，加载时重新取得
+        await pool.release(manager, "entry")
+        gateway.received.clear()
+        again = await pool.acquire(gateway.host, gateway.port, options)
+        assert again is manager and manager.is_connected
+        again.attach(entry)
+        assert await again.connect(entry)
+        await asyncio.sleep(0.1)
+        assert gateway.connections == 1
+        assert SWITCH_QUERY not in gateway.received
+    finally:
+        pool.linger = 0
+        await pool.release(manager, "entry")
+        await gateway.kill()
+
+
+@pytest.mark.asyncio
+async def test_last_release_closes_connection():
+    """最后一个使用者释放且不保持时关闭连接。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    pool = ConnectionPool(linger=0)
+    try:
+        async with pool.connection(gateway.host, gateway.port) as manager:
+            assert manager.is_connected
+        assert not manager.is_connected
+        assert pool.get(gateway.host, gateway.port) is None
+    finally:
+        await gateway.kill()
+
+
+def test_connection_options_prefer_entry_options():
+    """连接设置取自选项流程保存的 entry.options，早期写在 entry.data 中的值仍然有效，帧间隔默认自动校准。"""
+    entry = SimpleNamespace(
+        data={"host": "192.168.1.10", "ack_pacing": True, "collect_window_ms": 20},
+        options={"collect_window_ms": 0, "energy_poll_interval": 30, "name": "旧版本写入的设备数据"},
+    )
+    options = connection_options(entry)
+    assert options["frame_gap_ms"] is None
+    assert options["ack_pacing"] is True
+    assert options["collect_window_ms"] == 0
+    assert options["energy_poll_interval"] == 30
+    assert "name" not in options and "host" not in options
@@ -0,0 +1,58 @@
+from custom_components.savant_lighting.device_catalog import DeviceCatalog, device_param
+
+
+def _device(device_type, module, loop, name="设备", **extra):
+    return {"type": device_type, "sub_device_type": None, "name": name,
+            "module_address": module, "loop_address": loop, "host": "192.168.1.10", "port": 8080, **extra}
+
+
+def test_lookups():
+    """按类型、平台、模块、地址、unique_id 和选择值查找。"""
+    light = _device("light", 1, 1, gradient_time=2)
+    buttons = _device("8button", 2, 1, selected_buttons=["1", "3"])
+    energy = _device("switch_with_energy", 3, 2)
+    catalog = DeviceCatalog([light, buttons, energy])
+
+    assert catalog.of_type("light") == [light]
+    assert catalog.for_platform("sensor") == [energy]
+    assert catalog.for_platform("switch") == [buttons, energy]
+    assert catalog.in_module("3") == [energy]
+    assert catalog.at(2, 1) == [buttons]
+    assert catalog.by_unique_id("2_1_3_8button") is buttons
+    assert catalog.by_unique_id("2_1_2_8button") is None
+    assert catalog.by_unique_id("3_2_switch_with_energy_voltage_sensor") is energy
+    assert catalog.by_param(device_param(light)) is light
+    assert list(catalog) == [light, buttons, energy]
+
+
+def test_conflict_rules():
+    """switch 等类型只与同类型设备冲突，其余类型与同地址的任何设备冲突。"""
+    switch = _device("switch", 5, 3)
+    catalog = DeviceCatalog([switch])
+
+    assert catalog.conflict("switch", 5, 3) is switch
+    assert catalog.conflict("climate", 5, 3) is None
+    assert catalog.conflict("light", 5, 3) is switch
+    assert catalog.conflict("light", 5, 4) is None
+
+
+def test_mutations_keep_indices_consistent():
+    """增删改之后索引与设备列表一致，devices 每次返回新列表。"""
+    old = _device("8button", 2, 1, name="旧", selected_buttons=["1", "2"])
+    catalog = DeviceCatalog([old])
+    devices = catalog.devices
+
+    new = {**old, "name": "新", "selected_buttons": ["2"]}
+    catalog.replace(old, new)
+    assert catalog.devices == [new]
+    assert catalog.devices is not devices
+    assert catalog.by_unique_id("2_1_1_8button") is None
+    assert catalog.by_unique_id("2_1_2_8button") is new
+    assert catalog.by_param(device_param(old)) is None
+    assert catalog.by_param(device_param(new)) is new
+
+    assert catalog.remove(new) is new
+    assert len(catalog) == 0
+    assert catalog.of_type("8button") == []
+    assert catalog.at(2, 1) == []
+    assert list(catalog.modules) == []
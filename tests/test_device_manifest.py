@@ -0,0 +1,47 @@
+import pytest
+
+from custom_components.savant_lighting.device_manifest import (
+    FORMAT_YAML,
+    ManifestError,
+    dump_manifest,
+    parse_manifest,
+)
+
+HOST = "192.168.1.10"
+PORT = 8080
+
+CSV = """type,sub_type,module,loop,name,gradient_time,buttons,scene
+light,DALI-01,1,1,客厅灯,2,,
+switch,,2,3,走廊,,,
+climate,,2,3,客厅空调,,,
+8button,,4,1,玄关面板,,1 3,
+scene_switch,,,,回家,,,5
+"""
+
+
+@pytest.mark.parametrize("fmt", ["csv", FORMAT_YAML])
+def test_round_trip(fmt):
+    """导出的清单可以原样导入，得到相同的设备。"""
+    devices = parse_manifest(CSV, HOST, PORT)
+    assert [device["type"] for device in devices] == ["light", "switch", "climate", "8button", "scene_switch"]
+    assert devices[3]["selected_buttons"] == ["1", "3"]
+    assert devices[4]["module_address"] == "scene5"
+    assert parse_manifest(dump_manifest(devices, fmt), HOST, PORT) == devices
+
+
+def test_collisions_reported_in_one_pass():
+    """清单内部和与已有设备的地址冲突、字段错误一次全部列出，不返回任何设备。"""
+    existing = parse_manifest(CSV, HOST, PORT)
+    manifest = """type,sub_type,module,loop,name,gradient_time,buttons,scene
+switch,,2,3,重复开关,,,
+light,single,9,9,新灯,,,
+light,single,9,8,新灯2,1,,
+person_sensor,,9,8,冲突,,,
+"""
+    with pytest.raises(ManifestError) as info:
+        parse_manifest(manifest, HOST, PORT, existing)
+    errors = info.value.errors
+    assert len(errors) == 3
+    assert errors[0].startswith("第 1 行: 地址重复")
+    assert "gradient_time" in errors[1]
+    assert errors[2].startswith("第 4 行: 地址重复")
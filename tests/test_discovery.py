@@ -0,0 +1,84 @@
+import struct
+
+import pytest
+
+from custom_components.savant_lighting.discovery import discover, probe_commands
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+from tests.fake_gateway import FakeGateway
+
+
+def _array(module, start, payload):
+    """数组应答帧：AC 主机 00 B0 模块 起始回路 00 长度 数据 CA"""
+    return bytes((0xAC, 0x01, 0x00, 0xB0, module, start, 0x00, len(payload))) + payload + b"\xCA"
+
+
+def _switch(module):
+    return _array(module, 0x01, bytes(0x20))
+
+
+def _dali(module, start, assigned):
+    payload = b"".join(bytes((0x32, 0x00, 0x20, 0x10)) if idx in assigned else bytes(4) for idx in range(16))
+    return _array(module, start, payload)
+
+
+def _energy(module):
+    payload = struct.pack("<" + "B3x" * 16 + "H2x" * 4, *([0] * 16), *([0] * 4))
+    return _array(module, 0x01, payload)
+
+
+def _hvac(module, unit):
+    entries = [(0x01, 0x00, unit, 0x20)] + [(0x00, 0x00, unit, 0x20)] * 3 + [(0x01, 0x00, unit, 0x21)] + [(0x00, 0x00, unit, 0x21)] + [(0x00, 0x00, 0x00, 0x00)] * 3
+    return _array(module, 0x01, b"".join(bytes(entry) for entry in entries))
+
+
+@pytest.mark.asyncio
+async def test_discover_against_simulated_gateway():
+    """按应答帧的形状识别继电器、计量继电器、DALI-02 灯光和空调/地暖，不应答的模块超时跳过。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    gateway.responses = {
+        probe_commands(gateway.host, 2)[0]: _switch(2),
+        # 计量继电器也应答继电器查询
+        probe_commands(gateway.host, 3)[0]: _switch(3),
+        probe_commands(gateway.host, 3)[6]: _energy(3),
+        probe_commands(gateway.host, 4)[1]: _dali(4, 0x01, {0, 5}),
+        probe_commands(gateway.host, 4)[2]: _dali(4, 0x11, {}),
+        probe_commands(gateway.host, 5)[5]: _hvac(5, 2),
+    }
+    manager = TCPConnectionManager(gateway.host, gateway.port, frame_gap_ms=0)
+    try:
+        assert await manager.connect()
+        devices = await discover(manager, range(1, 7), concurrency=3, timeout=0.3)
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+    found = [(device["type"], device["sub_device_type"], device["module_address"], device["loop_address"]) for device in devices]
+    assert found == (
+        [("switch", None, 2, loop) for loop in range(1, 9)]
+        + [("switch_with_energy", None, 3, loop) for loop in range(1, 5)]
+        + [("light", "DALI-02", 4, 1), ("light", "DALI-02", 4, 6)]
+        + [("climate", None, 5, 2), ("floor_heating", None, 5, 2)]
+    )
+    assert all(device["port"] == gateway.port for device in devices)
+
+
+@pytest.mark.asyncio
+async def test_discover_with_ack_pacing():
+    """应答节拍下排在前面的命令帧等待应答超时，模块的等待时间从其第一帧查询写出时算起。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    gateway.responses = {probe_commands(gateway.host, 2)[0]: _switch(2)}
+    manager = TCPConnectionManager(gateway.host, gateway.port, frame_gap_ms=0, ack_pacing=True, collect_window_ms=0)
+    try:
+        assert await manager.connect()
+        # 发给不存在模块的命令帧没有应答，每帧等满应答超时后才发送后面的查询
+        for loop in (1, 2):
+            await manager.send_command(bytes.fromhex(f"AC01001030{loop:02X}000401000000CA"))
+        devices = await discover(manager, (2,), timeout=0.3)
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+    assert [(device["type"], device["loop_address"]) for device in devices] == [("switch", loop) for loop in range(1, 9)]
+    assert manager.diagnostics()["ack_timeouts"] == 2
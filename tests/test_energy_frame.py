@@ -0,0 +1,70 @@
+import random
+import pytest
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+# 模块 7 起始回路 1 的 0x50 能耗帧：回路 1、3 开启
+ENERGY_FRAME = bytes.fromhex(
+    "AC0A00B007010050"
+    "01000000" "00000000" "01000000" "00000000"  # 开关状态
+    "9A000000" "00000000" "2D000000" "00000000"  # 电流
+    "DC000000" "DB000000" "DC000000" "DD000000"  # 电压
+    "21000000" "00000000" "0A000000" "00000000"  # 功率
+    "34120000" "05000000" "E8030000" "00000000"  # 电量
+    "CA"
+)
+
+
+def legacy_decode(response_str):
+    """原来的逐字解析，起始回路为 1 时作为对照"""
+    words = [response_str[i:i + 4] for i in range(8, 88, 4)]
+    result = []
+    for loop in range(4):
+        result.append((
+            response_str[4], loop + 1, words[loop][0] != 0x00, words[8 + loop][0], words[4 + loop][0] / 1000,
+            words[12 + loop][0] / 1000, int(format(words[16 + loop][1], "02x") + format(words[16 + loop][0], "02x"), 16) / 100,
+        ))
+    return result
+
+
+def decode(response_str):
+    frames = TCPConnectionManager("192.168.1.10", 8080).parse_response_array(memoryview(response_str))
+    return [
+        (frame.module_address, frame.loop_address, frame.state, frame.voltage, frame.current, frame.power, frame.energy)
+        for frame in frames
+    ]
+
+
+def test_captured_energy_frame():
+    """一次解出 4 个回路的开关状态和计量值。"""
+    assert decode(ENERGY_FRAME) == [
+        (7, 1, True, 220, 0.154, 0.033, 46.6),
+        (7, 2, False, 219, 0.0, 0.0, 0.05),
+        (7, 3, True, 220, 0.045, 0.01, 10.0),
+        (7, 4, False, 221, 0.0, 0.0, 0.0),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_decoder(seed):
+    """随机数据区的解析结果与原实现一致。"""
+    rng = random.Random(seed)
+    frame = bytes.fromhex("AC0A00B005010050") + bytes(rng.randrange(256) for _ in range(80)) + b"\xCA"
+    assert decode(frame) == legacy_decode(frame)
+
+
+def test_energy_frame_updates_shared_loop_state():
+    """一个能耗帧更新回路共享状态，并通知所有监听的实体。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    energy = manager.energy_loop(7, 3)
+    seen = []
+    remove = energy.add_listener(lambda loop: seen.append((loop.state, loop.voltage, loop.power, loop.publish)))
+    energy.add_listener(lambda loop: seen.append(loop.energy))
+
+    manager._handle_frame(memoryview(ENERGY_FRAME))
+    manager._handle_frame(memoryview(ENERGY_FRAME))
+    assert seen == [(True, 220, 0.01, True), 10.0, (True, 220, 0.01, False), 10.0]
+    assert len(energy.history) == 2
+
+    remove()
+    manager._handle_frame(memoryview(ENERGY_FRAME))
+    assert seen[-1] == 10.0 and len(seen) == 5
@@ -0,0 +1,51 @@
+import random
+import time
+
+from custom_components.savant_lighting.energy_history import EnergyHistory
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+
+def test_rolling_stats_match_window():
+    """滚动的最小/最大/平均值与直接计算缓冲区内读数的结果一致。"""
+    history = EnergyHistory(capacity=8)
+    rng = random.Random(1)
+    readings = []
+    for step in range(50):
+        power = rng.randint(0, 255) / 1000
+        readings.append(power)
+        history.append(step, 220.0, power * 4, power, step / 100)
+        window = readings[-8:]
+        stats = history.stats("power")
+        assert stats["min"] == min(window)
+        assert stats["max"] == max(window)
+        assert abs(stats["mean"] - sum(window) / len(window)) < 1e-9
+
+    assert len(history) == 8
+    assert [sample[0] for sample in history.samples()] == list(range(42, 50))
+    assert history.latest() == (49, 220.0, readings[-1] * 4, readings[-1], 0.49)
+
+
+def test_publish_due_downsamples():
+    """读数按间隔降采样写入状态。"""
+    history = EnergyHistory(capacity=4)
+    published = []
+    for timestamp in range(0, 100, 10):
+        history.append(timestamp, 220, 0.1, 0.02, 1.0)
+        if history.publish_due(30):
+            published.append(timestamp)
+    assert published == [0, 30, 60, 90]
+
+
+def test_recent_samples_in_diagnostics(monkeypatch):
+    """诊断信息按回路导出最近窗口内的读数和统计。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    history = manager.energy_loop(5, 2).history
+    for timestamp in (100, 700, 1000):
+        history.append(timestamp, 220.0, 0.5, 0.1, 1.0)
+    monkeypatch.setattr(time, "time", lambda: 1200)
+
+    loop = manager.diagnostics()["energy_history"]["5_2"]
+
+    assert [sample["time"] for sample in loop["samples"]] == [700, 1000]
+    assert loop["samples"][-1] == {"time": 1000, "voltage": 220.0, "current": 0.5, "power": 0.1, "energy": 1.0}
+    assert loop["stats"]["power"]["max"] == 0.1
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from custom_components.savant_lighting.energy_poller import EnergyPollScheduler
+from custom_components.savant_lighting.frame_record import EnergyFrame
+
+DEVICES = [
+    {"type": "switch_with_energy", "host": "192.168.1.10", "module_address": module, "loop_address": 1}
+    for module in (1, 2, 3, 4)
+]
+
+
+@pytest.mark.asyncio
+async def test_polls_spread_across_interval():
+    """每个模块查询一次，首轮查询均匀分布在基础间隔内。"""
+    loop = asyncio.get_running_loop()
+    sent = []
+
+    async def send(data, priority):
+        sent.append((loop.time(), data[4]))
+
+    poller = EnergyPollScheduler(send, interval=0.4, min_interval=0.1, max_interval=1)
+    poller.set_modules(DEVICES + [{"type": "switch", "host": "192.168.1.10", "module_address": 9}])
+    start = loop.time()
+    poller.start()
+    await asyncio.sleep(0.35)
+    poller.stop()
+
+    assert [module for _, module in sent] == [1, 2, 3, 4]
+    offsets = [when - start for when, _ in sent]
+    assert offsets[3] > 0.25
+
+
+@pytest.mark.asyncio
+async def test_interval_adapts_to_readings():
+    """读数稳定时间隔加倍，功率变化或继电器动作后回到最小间隔。"""
+    async def send(data, priority):
+        pass
+
+    poller = EnergyPollScheduler(send, interval=60, min_interval=10, max_interval=300)
+    poller.set_modules(DEVICES)
+    poller.start()
+
+    # 还没有可比较的读数，保持基础间隔
+    assert poller._next_interval(1) == 60
+    poller._intervals[1] = 60
+    poller.record(EnergyFrame(1, 1, True, power=0.100))
+    poller.record(EnergyFrame(1, 1, True, power=0.101))
+    assert poller._next_interval(1) == 120
+
+    poller._intervals[1] = 240
+    poller.record(EnergyFrame(1, 1, True, power=0.101))
+    assert poller._next_interval(1) == 300
+
+    poller.record(EnergyFrame(1, 1, True, power=0.150))
+    assert poller._intervals[1] == 10
+    assert poller._next_interval(1) == 10
+
+    # 继电器控制帧经过后 2 秒内补查
+    due = poller._due[2]
+    poller.notify_command(bytes.fromhex("AC0A00100201000401000000CA"))
+    assert poller._due[2] <= asyncio.get_running_loop().time() + 2
+    assert poller._due[2] <= due
+    poller.stop()
@@ -0,0 +1,39 @@
+import pytest
+from custom_components.savant_lighting.frame_classifier import classify_frame
+from custom_components.savant_lighting.frame_record import HvacType
+
+
+@pytest.mark.parametrize(
+    "data2, data3, data4, loop_address, device_type, expected_loop",
+    [
+        (0x00, 0x00, 0x00, 0x03, "switch", 0x03),
+        (0x00, 0x00, 0x00, 0x00, "switch", 0x00),
+        (0x04, 0x00, 0x00, 0x17, "curtain", 2),
+        (0x04, 0x00, 0x00, 0x00, "person_sensor", 0x04),
+        (0x05, 0x02, 0x00, 0x00, "8button", 0x02),
+        (0x00, 0x00, 0x12, 0x04, "light", 0x03),
+        (0x1E, 0x00, 0x15, 0x04, "light", 0x04),
+        (0x80, 0x10, 0x13, 0x05, "light", 0x03),
+        (0x00, 0x02, 0x20, 0x0B, "climate", 0x02),
+        (0x00, 0x01, 0x21, 0x05, "floor_heating", 0x01),
+        (0x00, 0x02, 0x22, 0x11, "fresh_air", 0x02),
+    ],
+)
+def test_classify_frame(data2, data3, data4, loop_address, device_type, expected_loop):
+    """分类结果与原 elif 链的优先级一致。"""
+    rule = classify_frame(data2, data3, data4, loop_address)
+    assert rule.device_type == device_type
+    assert rule.loop_transform(loop_address, data2, data3)[0] == expected_loop
+
+
+def test_unknown_frame():
+    """不在任何规则中的帧返回 None。"""
+    assert classify_frame(0x01, 0x00, 0x11, 0x01) is None
+    assert classify_frame(0x00, 0x01, 0x20, 0x05) is None
+
+
+def test_hvac_redirect():
+    """室温帧同时转给地暖。"""
+    rule = classify_frame(0x00, 0x01, 0x20, 0x09)
+    assert rule.hvac_type == HvacType.CURRENT_TEMP
+    assert rule.redirect_type == "floor_heating"
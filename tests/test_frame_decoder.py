@@ -0,0 +1,95 @@
+import pytest
+from custom_components.savant_lighting.frame_decoder import FrameDecoder
+
+# 单回路状态帧（13 字节）
+RELAY_FRAME = bytes.fromhex("AC0A00100101000401000000CA")
+DALI_FRAME = bytes.fromhex("AC0A001002030004320A0015CA")
+# 8 路继电器状态帧（0x20 长度）
+RELAY_ARRAY_FRAME = bytes.fromhex("AC0A00B001010020" + "01000000" * 4 + "00000000" * 4 + "CA")
+STREAM = RELAY_FRAME + RELAY_ARRAY_FRAME + DALI_FRAME
+
+
+def collect(decoder, chunks):
+    frames = []
+    for chunk in chunks:
+        frames.extend(bytes(frame) for frame in decoder.feed(chunk))
+    return frames
+
+
+def test_single_segment_with_several_frames():
+    """一个 TCP 段中包含多个帧时，逐个切出。"""
+    decoder = FrameDecoder()
+    assert collect(decoder, [STREAM]) == [RELAY_FRAME, RELAY_ARRAY_FRAME, DALI_FRAME]
+    assert decoder.pending == 0
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 13, 16, 40])
+def test_arbitrary_chunking(chunk_size):
+    """帧被拆到任意多个段中时，拼接后结果一致。"""
+    decoder = FrameDecoder()
+    chunks = [STREAM[i:i + chunk_size] for i in range(0, len(STREAM), chunk_size)]
+    assert collect(decoder, chunks) == [RELAY_FRAME, RELAY_ARRAY_FRAME, DALI_FRAME]
+    assert decoder.pending == 0
+
+
+def test_resync_after_garbage():
+    """心跳回显等无效字节被丢弃，之后的帧正常解析。"""
+    decoder = FrameDecoder()
+    frames = collect(decoder, [b"\xff\xff" + RELAY_FRAME[:5], RELAY_FRAME[5:] + b"\x00" + DALI_FRAME])
+    assert frames == [RELAY_FRAME, DALI_FRAME]
+    assert decoder.discarded_bytes == 3
+
+
+def test_bad_tail_is_skipped():
+    """帧尾不是 CA 时跳过该帧头重新同步。"""
+    decoder = FrameDecoder()
+    broken = RELAY_FRAME[:-1] + b"\x00"
+    assert collect(decoder, [broken + DALI_FRAME]) == [DALI_FRAME]
+
+
+def test_frames_stay_valid_after_next_feed():
+    """已返回的 memoryview 在后续 feed 之后仍然有效。"""
+    decoder = FrameDecoder()
+    views = list(decoder.feed(RELAY_FRAME + DALI_FRAME[:4]))
+    list(decoder.feed(DALI_FRAME[4:]))
+    assert bytes(views[0]) == RELAY_FRAME
+
+
+def test_query_echo_is_dropped():
+    """网关回显的 B0 查询帧只有 1 字节数据，不返回给解析，后面的帧照常切出。"""
+    echo = bytes.fromhex("AC0A00B00501000108CA")
+    decoder = FrameDecoder()
+    assert collect(decoder, [echo]) == []
+    assert collect(decoder, [echo + RELAY_FRAME]) == [RELAY_FRAME]
+    assert decoder.discarded_bytes == 2 * len(echo)
+    assert decoder.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_query_echo_does_not_break_listener():
+    """查询帧回显无论是否经过解码器，_handle_frame 都不抛异常（原来 _parse_response 读越界，接收任务随之结束）。"""
+    from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    echo = bytes.fromhex("AC0A00B00501000108CA")
+    for frame in FrameDecoder().feed(echo):
+        manager._handle_frame(frame)
+    manager._handle_frame(memoryview(echo))
+
+
+def test_entity_error_does_not_break_listener(caplog):
+    """一个实体的 update_state 出错只记录日志，同一数组帧的其余回路照常分发。"""
+    from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    received = []
+
+    def broken(frame):
+        raise AttributeError("_color_mode")
+
+    manager.subscribe("1_1_switch", broken)
+    manager.subscribe("1_2_switch", received.append)
+    manager._handle_frame(memoryview(RELAY_ARRAY_FRAME))
+
+    assert [frame.loop_address for frame in received] == [2]
+    assert "1_1_switch" in caplog.text
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.savant_lighting.option_flow import SavantLightingOptionsFlowHandler
+
+
+def _flow(options):
+    entry = SimpleNamespace(entry_id="entry", data={"host": "192.168.1.10", "port": 8080}, options=options)
+    flow = SavantLightingOptionsFlowHandler(entry)
+    flow.hass = SimpleNamespace(config_entries=SimpleNamespace(async_get_entry=lambda entry_id: entry))
+    flow.handler = "entry"
+    flow.flow_id = "flow"
+    return flow
+
+
+SETTINGS = {
+    "ack_pacing": True,
+    "collect_window_ms": 10,
+    "energy_poll_interval": 60,
+    "energy_poll_min_interval": 10,
+    "energy_poll_max_interval": 300,
+    "energy_record_interval": 60,
+    "frame_trace_size": 0,
+}
+
+
+@pytest.mark.asyncio
+async def test_connection_settings_saved_to_options():
+    """连接设置保存到 entry.options，帧间隔留空时去掉旧值以自动校准，其他选项保留。"""
+    flow = _flow({"frame_gap_ms": 80, "other": 1})
+    result = await flow.async_step_connection_settings(dict(SETTINGS))
+    assert result["data"] == {"other": 1, **SETTINGS}
+
+    result = await flow.async_step_connection_settings({**SETTINGS, "energy_poll_min_interval": 120})
+    assert result["errors"] == {"base": "invalid_poll_interval"}
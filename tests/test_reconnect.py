@@ -0,0 +1,160 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from custom_components.savant_lighting.const import DOMAIN
+from custom_components.savant_lighting.device_catalog import DeviceCatalog
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+from tests.fake_gateway import FakeGateway
+
+SWITCH_ON = bytes.fromhex("AC0A00100503000401000000CA")
+SWITCH_QUERY = bytes.fromhex("AC0A00B00501000108CA")
+DEVICES = [{
+    "type": "switch", "sub_device_type": None, "host": "192.168.1.10",
+    "module_address": 5, "loop_address": 3,
+}]
+
+
+async def connected_manager(gateway, frames=None):
+    manager = TCPConnectionManager(gateway.host, gateway.port, frame_gap_ms=0)
+    # 只查询有实体订阅的模块
+    manager.subscribe("5_3_switch", (frames if frames is not None else []).append)
+    manager.reconnect_min_delay = 0.05
+    manager.reconnect_max_delay = 0.2
+    entry = SimpleNamespace(entry_id="entry")
+    manager.set_hass(SimpleNamespace(data={DOMAIN: {"entry": {"catalog": DeviceCatalog(DEVICES)}}}))
+    assert await manager.connect(entry)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resync_and_offline_buffer():
+    """网关掉线后自动重连，补发断线期间的命令并重新查询状态。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    manager = await connected_manager(gateway)
+    try:
+        await gateway.wait_for(SWITCH_QUERY)
+
+        await gateway.kill()
+        async with asyncio.timeout(5):
+            while manager._is_connected:
+                await asyncio.sleep(0.01)
+
+        # 断线期间的用户命令被缓存
+        assert await manager.send_command(SWITCH_ON) == (None, False)
+        await asyncio.sleep(0.05)  # 等收集窗口结束
+        assert manager.diagnostics()["queue_depth"] == 1
+
+        gateway.received.clear()
+        await gateway.restore()
+        await gateway.wait_for(SWITCH_ON)
+        await gateway.wait_for(SWITCH_QUERY)
+        assert gateway.connections == 2
+        assert manager.reconnect_count == 1
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+
+@pytest.mark.asyncio
+async def test_connect_during_backoff_wakes_supervisor():
+    """守护任务退避期间调用 connect() 只唤醒守护任务重连，不另开一个 socket。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    manager = await connected_manager(gateway)
+    try:
+        await gateway.kill()
+        async with asyncio.timeout(5):
+            while manager._is_connected:
+                await asyncio.sleep(0.01)
+        manager.reconnect_min_delay = manager.reconnect_max_delay = 10
+
+        await gateway.restore()
+        # 配置条目重新加载和连接池中的 send_command 同时要求连接
+        assert await asyncio.gather(manager.connect(), manager.connect()) == [True, True]
+        await asyncio.sleep(0.1)
+
+        assert gateway.connections == 2
+        assert manager.reconnect_count == 1
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_after_reconnect():
+    """重连后网关上报的状态仍然分发给订阅的实体。"""
+    gateway = FakeGateway()
+    await gateway.start()
+    frames = []
+    manager = await connected_manager(gateway, frames)
+    try:
+        await gateway.kill()
+        await gateway.restore()
+        async with asyncio.timeout(5):
+            while gateway.connections < 2 or not manager._is_connected:
+                await asyncio.sleep(0.01)
+        await gateway.push(SWITCH_ON)
+        async with asyncio.timeout(5):
+            while not frames:
+                await asyncio.sleep(0.01)
+        assert frames[0].data1 == 0x01
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+
+class MemoryStore:
+    """只在内存中保存的状态缓存"""
+
+    def __init__(self, frames):
+        self._frames = frames
+
+    def has_state(self, unique_id):
+        return unique_id in self._frames
+
+    def frames(self, unique_id):
+        return self._frames.get(unique_id, [])
+
+    def record(self, frame):
+        self._frames[frame.unique_id] = [frame]
+
+
+@pytest.mark.asyncio
+async def test_replay_and_uncached_modules_first():
+    """订阅时回放缓存状态；同步时先查询没有缓存状态的模块。"""
+    manager = TCPConnectionManager("192.168.1.10", 6005)
+    cached = manager._parse_response(SWITCH_ON)
+    manager.set_state_store(MemoryStore({"5_3_switch": [cached]}))
+    replayed = []
+    manager.subscribe("5_3_switch", replayed.append)
+    manager.subscribe("6_1_switch", replayed.append)
+    assert replayed == [cached]
+
+    manager._is_connected = True
+    devices = [dict(DEVICES[0]), dict(DEVICES[0], module_address=6, loop_address=1)]
+    sync = asyncio.create_task(manager.update_all_device_state(devices))
+    await asyncio.sleep(0.01)
+    queued = [entry[0][4] for entry in manager._pipeline._queues[-1]]
+    assert queued == [6, 5]
+    sync.cancel()
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_waits_for_array_reply():
+    """启动同步只在收到该模块的 B0 数组应答时释放额度，控制上报不算应答。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    manager._is_connected = True
+    manager._queries = {5: [SWITCH_QUERY]}
+    sync = asyncio.create_task(manager._sync_module(5))
+    await asyncio.sleep(0)
+    assert 5 in manager._module_waiters
+
+    manager._notify_module_waiter(bytes.fromhex("AC0A00100503000401000000CA"))
+    await asyncio.sleep(0.01)
+    assert not sync.done()
+
+    manager._notify_module_waiter(bytes.fromhex("AC0A00B005010020" + "00000000" * 8 + "CA"))
+    await asyncio.wait_for(sync, 1)
+    await manager.close()
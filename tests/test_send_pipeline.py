@@ -0,0 +1,245 @@
+import asyncio
+import pytest
+from custom_components.savant_lighting.const import PRIORITY_BACKGROUND, PRIORITY_SCHEDULED, PRIORITY_USER
+from custom_components.savant_lighting.send_pipeline import SendPipeline, frame_count
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+
+def module_frame(module, loop=3):
+    """继电器开指令"""
+    return bytes.fromhex(f"AC0A0010{module:02X}{loop:02X}000401000000CA")
+
+
+class FakeWriter:
+    def __init__(self):
+        self.times = []
+
+    async def write(self, data):
+        self.times.append(asyncio.get_running_loop().time())
+        return True
+
+
+@pytest.mark.asyncio
+async def test_frame_gap():
+    """相邻两帧之间至少间隔 frame_gap_ms。"""
+    writer = FakeWriter()
+    pipeline = SendPipeline(writer.write, frame_gap_ms=20)
+    pipeline.start()
+    assert await pipeline.send_list([module_frame(5, loop) for loop in range(1, 5)])
+    await pipeline.stop()
+    gaps = [b - a for a, b in zip(writer.times, writer.times[1:])]
+    assert min(gaps) >= 0.019
+    assert pipeline.diagnostics()["frames_sent"] == 4
+
+
+@pytest.mark.asyncio
+async def test_ack_pacing():
+    """网关回报同一模块后立即发送下一帧，不等应答超时。"""
+    writer = FakeWriter()
+
+    # 模拟网关：每写出一帧，下一轮事件循环回报该模块状态
+    async def write_and_echo(data):
+        await writer.write(data)
+        asyncio.get_running_loop().call_soon(pipeline.notify_frame, data)
+        return True
+
+    pipeline = SendPipeline(write_and_echo, frame_gap_ms=0, ack_pacing=True, ack_timeout_ms=1000)
+    pipeline.start()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await pipeline.send_list([module_frame(5, loop) for loop in range(1, 4)])
+    assert loop.time() - start < 0.5
+    await pipeline.stop()
+    assert pipeline.ack_timeouts == 0
+
+
+@pytest.mark.asyncio
+async def test_frame_gap_calibrates_to_ack_rtt():
+    """未设置帧间隔时按控制帧到同一模块回报的往返时间校准，并限制在允许范围内。"""
+    writer = FakeWriter()
+    delay = 0.03
+
+    async def write_and_echo(data):
+        await writer.write(data)
+        asyncio.get_running_loop().call_later(delay, pipeline.notify_frame, data)
+        return True
+
+    pipeline = SendPipeline(write_and_echo, frame_gap_ms=None)
+    assert pipeline.frame_gap == 0.05
+    pipeline.start()
+    assert await pipeline.send_list([module_frame(5, loop) for loop in range(1, 9)])
+    assert 0.025 < pipeline.ack_rtt < 0.05
+    assert pipeline.frame_gap == pipeline.ack_rtt
+    assert pipeline.diagnostics()["frame_gap_calibrated"] is True
+
+    delay = 0.001
+    assert await pipeline.send_list([module_frame(6, loop) for loop in range(1, 33)])
+    await pipeline.stop()
+    assert pipeline.frame_gap == 0.01
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    """用户命令先于自动化，自动化先于后台轮询。"""
+    sent = []
+
+    async def write(data):
+        sent.append(data[4])
+        return True
+
+    pipeline = SendPipeline(write, frame_gap_ms=0)
+    futures = [
+        pipeline.submit(module_frame(3), PRIORITY_BACKGROUND),
+        pipeline.submit(module_frame(2), PRIORITY_SCHEDULED),
+        pipeline.submit(module_frame(1), PRIORITY_USER),
+    ]
+    pipeline.start()
+    await asyncio.gather(*futures)
+    await pipeline.stop()
+    assert sent == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_starvation_promotion():
+    """后台帧等待超过 starvation_ms 后插到用户命令之前。"""
+    sent = []
+
+    async def write(data):
+        sent.append(data[4])
+        return True
+
+    pipeline = SendPipeline(write, frame_gap_ms=5, starvation_ms=20)
+    background = pipeline.submit(module_frame(9), PRIORITY_BACKGROUND)
+    for loop in range(1, 21):
+        pipeline.submit(module_frame(1, loop), PRIORITY_USER)
+    pipeline.start()
+    await background
+    await pipeline.stop()
+    assert sent[-1] == 9
+    assert len(sent) < 21
+    assert pipeline.promotions == 1
+
+
+@pytest.mark.asyncio
+async def test_coalesce_same_register():
+    """同一回路的亮度帧排队时只保留最新值，色温帧不受影响。"""
+    sent = []
+
+    async def write(data):
+        sent.append(data.hex().upper())
+        return True
+
+    pipeline = SendPipeline(write, frame_gap_ms=0)
+    futures = [
+        pipeline.submit(bytes.fromhex(f"AC0A001007030004{level:02X}02FF10CA"))
+        for level in (10, 20, 30, 40)
+    ]
+    futures.append(pipeline.submit(bytes.fromhex("AC0A001007030004FF001E10CA")))
+    assert pipeline.queue_depth == 2
+    pipeline.start()
+    assert all(await asyncio.gather(*futures))
+    await pipeline.stop()
+    assert sent == ["AC0A0010070300042802FF10CA", "AC0A001007030004FF001E10CA"]
+    assert pipeline.coalesced == 3
+
+
+def test_build_batches():
+    """同一模块的帧拼成一次写入，同一寄存器只保留最后一次修改。"""
+    frames = [
+        bytes.fromhex("AC0A0010070300040A02FF10CA"),
+        bytes.fromhex("AC0A00100801000401000000CA"),
+        bytes.fromhex("AC0A001007030004FF002810CA"),
+        bytes.fromhex("AC0A0010070300043202FF10CA"),
+        bytes.fromhex("AC0A0010070400043202FF10CA"),
+    ]
+    batches = TCPConnectionManager._build_batches(frames)
+    assert [batch.hex().upper() for batch in batches] == [
+        "AC0A001007030004FF002810CA" "AC0A0010070300043202FF10CA" "AC0A0010070400043202FF10CA",
+        "AC0A00100801000401000000CA",
+    ]
+    assert frame_count(batches[0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_collect_window_groups_by_module():
+    """同一时刻 40 个实体的关灯命令按模块拼接，5 个模块只占 5 次写入，排队期间仍能被新值整批替换。"""
+    manager = TCPConnectionManager("192.168.1.10", 6005, collect_window_ms=5)
+    manager._is_connected = True
+    frames = [
+        bytes.fromhex(f"AC0A0010{module:02X}{loop:02X}000400000001CA")
+        for loop in range(1, 9)
+        for module in range(1, 6)
+    ]
+    await asyncio.gather(*(manager.send_command(frame) for frame in frames))
+    assert manager._pipeline.queue_depth == 0
+    await asyncio.sleep(0.02)
+    queued = [entry[0] for entry in manager._pipeline._queues[PRIORITY_USER]]
+    assert queued == [b"".join(frame for frame in frames if frame[4] == module) for module in range(1, 6)]
+    assert manager._pipeline.queued_frames == 40
+    # 窗口之后再发的同一组回路命令替换排队中的批量
+    await asyncio.gather(*(manager.send_command(frame) for frame in frames))
+    await asyncio.sleep(0.02)
+    assert manager._pipeline.queue_depth == 5
+    assert manager._pipeline.coalesced == 5
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_collect_window_joins_commands_and_batches():
+    """收集窗口内 send_command 和 send_batch 的命令一样按模块拼接成一次写入。"""
+    manager = TCPConnectionManager("192.168.1.10", 6005, collect_window_ms=5)
+    manager._is_connected = True
+    await manager.send_command(module_frame(1))
+    await manager.send_command(module_frame(2, 4))
+    await manager.send_batch([module_frame(2, loop) for loop in range(1, 4)])
+    await asyncio.sleep(0.02)
+    queued = [entry[0] for entry in manager._pipeline._queues[PRIORITY_USER]]
+    assert queued == [module_frame(1), b"".join(module_frame(2, loop) for loop in (4, 1, 2, 3))]
+    assert manager._pipeline.queued_frames == 5
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_scene_turn_off_is_one_write_per_module():
+    """40 个继电器同时关闭，按默认帧间隔在一秒内全部写到网关。"""
+    from custom_components.savant_lighting.switch import SavantSwitch
+    from tests.fake_gateway import FakeGateway
+
+    gateway = FakeGateway()
+    await gateway.start()
+    manager = TCPConnectionManager(gateway.host, gateway.port)
+    switches = [
+        SavantSwitch("灯", module, loop, "192.168.1.10", gateway.port, manager)
+        for module in range(1, 6)
+        for loop in range(1, 9)
+    ]
+    try:
+        assert await manager.connect()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(switch.async_turn_off() for switch in switches))
+        for switch in switches:
+            await gateway.wait_for(switch.command.turnonoff("off"), timeout=1)
+        assert loop.time() - started < 1
+    finally:
+        await manager.close()
+        await gateway.kill()
+
+
+@pytest.mark.asyncio
+async def test_batches_coalesce_same_registers():
+    """同一盏灯连续两次调光调色温，排队中的旧批量被新批量整批替换。"""
+    from custom_components.savant_lighting.light import SavantLight
+
+    manager = TCPConnectionManager("192.168.1.10", 6005, collect_window_ms=0)
+    light = SavantLight("灯", 7, 3, 2, "192.168.1.10", 6005, "DALI-02", manager)
+    light.async_write_ha_state = lambda: None
+    await light.async_turn_on(brightness=128, color_temp_kelvin=3000)
+    await light.async_turn_on(brightness=255, color_temp_kelvin=5000)
+
+    pipeline = manager._pipeline
+    assert pipeline.queue_depth == 1
+    assert pipeline.coalesced == 1
+    queued = [entry[0] for queue in pipeline._queues for entry in queue if entry[0] is not None]
+    assert queued == [light.command.dali02_brightness(100) + light.command.dali02_color_temp("50")]
+    await manager.close()
@@ -0,0 +1,59 @@
+import pytest
+import pytest_asyncio
+from homeassistant.core import HomeAssistant
+from custom_components.savant_lighting.frame_record import Frame, HvacType
+from homeassistant.helpers.storage import Store
+from custom_components.savant_lighting.state_store import STORAGE_VERSION, FrameStore, legacy_storage_key
+
+
+@pytest_asyncio.fixture
+async def hass(tmp_path):
+    hass = HomeAssistant(str(tmp_path))
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.asyncio
+async def test_record_flush_and_restore(hass):
+    """变化的帧写盘后可以在下次启动时恢复，相同的帧不再标记为脏。"""
+    store = FrameStore(hass, "192.168.1.10", 8080)
+    await store.async_load()
+    brightness = Frame(7, 3, 0x32, 0x02, 0x00, 0x11, device_type="light", sub_device_type="DALI-01")
+    color_temp = Frame(7, 3, 0x1B, 0x00, 0x00, 0x12, device_type="light", sub_device_type="DALI-01")
+    temperature = Frame(10, 2, 0x18, 0x00, 0x02, 0x20, device_type="climate", hvac_type=HvacType.CURRENT_TEMP)
+    for frame in (brightness, color_temp, temperature):
+        store.record(frame)
+    await store.async_flush()
+
+    store.record(brightness)
+    assert not store._dirty
+    store.record(Frame(5, 2, 0x01, 0x05, 0x02, 0x00, device_type="8button", button_index=5))
+    assert not store.has_state("5_2_5_8button")
+
+    restored = FrameStore(hass, "192.168.1.10", 8080)
+    await restored.async_load()
+    frames = restored.frames("7_3_light")
+    assert [(f.data1, f.data4) for f in frames] == [(0x32, 0x11), (0x1B, 0x12)]
+    assert restored.frames("10_2_climate")[0].hvac_type == HvacType.CURRENT_TEMP
+
+
+@pytest.mark.asyncio
+async def test_legacy_entry_store_migrates_to_gateway(hass):
+    """旧版按配置条目命名的缓存迁移到网关缓存后删除，删除网关缓存后不再恢复。"""
+    legacy = Store(hass, STORAGE_VERSION, legacy_storage_key("entry"))
+    await legacy.async_save({"5_3_switch": {"0:0": [5, 3, 1, 0, 0, 0, "switch", "", 0, ""]}})
+
+    store = FrameStore(hass, "192.168.1.10", 8080, "entry")
+    await store.async_load()
+    assert store.has_state("5_3_switch")
+    assert await Store(hass, STORAGE_VERSION, legacy_storage_key("entry")).async_load() is None
+
+    # 另一个配置条目共用同一网关，读到同一份缓存
+    shared = FrameStore(hass, "192.168.1.10", "8080", "other")
+    await shared.async_load()
+    assert shared.frames("5_3_switch")[0].data1 == 1
+
+    await store.async_remove()
+    removed = FrameStore(hass, "192.168.1.10", 8080)
+    await removed.async_load()
+    assert not removed.has_state("5_3_switch")
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.components.climate import HVACMode
+from homeassistant.helpers.entity import Entity
+from homeassistant.util.unit_system import METRIC_SYSTEM
+
+from custom_components.savant_lighting.climate import SavantClimate
+from custom_components.savant_lighting.frame_record import Frame, HvacType
+from custom_components.savant_lighting.light import SavantLight
+from custom_components.savant_lighting.switch import SavantSwitch
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """替换 HA 的 async_write_ha_state，记录每次写入时实体的状态"""
+    written = []
+    monkeypatch.setattr(Entity, "async_write_ha_state", lambda self: written.append(self.state))
+    return written
+
+
+def test_unchanged_state_is_not_written(writes):
+    """状态没有变化的帧不触发 async_write_ha_state，并计入 suppressed_writes。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    switch = SavantSwitch("灯", 5, 3, "192.168.1.10", 8080, manager)
+
+    for data1 in (0x01, 0x01, 0x01, 0x00, 0x00):
+        switch.update_state(Frame(5, 3, data1, 0x00, 0x00, 0x00, "switch"))
+
+    assert writes == ["on", "off"]
+    assert manager.suppressed_writes == 3
+    assert manager.diagnostics()["suppressed_writes"] == 3
+
+
+@pytest.mark.asyncio
+async def test_optimistic_state_is_written_on_confirmation(writes):
+    """async_turn_on 只改 _state 不写入，确认帧与上次写入的状态不同，仍然写入。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    switch = SavantSwitch("灯", 5, 3, "192.168.1.10", 8080, manager)
+    switch.update_state(Frame(5, 3, 0x00, 0x00, 0x00, 0x00, "switch"))
+
+    await switch.async_turn_on()
+    switch.update_state(Frame(5, 3, 0x01, 0x00, 0x00, 0x00, "switch"))
+
+    assert writes == ["off", "on"]
+    assert manager.suppressed_writes == 0
+
+
+def test_light_color_change_is_written(writes):
+    """颜色变化而开关状态不变时也写入。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    light = SavantLight("灯", 5, 3, 0, "192.168.1.10", 8080, "rgb", manager)
+
+    for red in (0x10, 0x10, 0x20):
+        light.update_state(Frame(5, 3, red, 0x40, 0x80, 0x13, "light", "rgb"))
+
+    assert writes == ["on", "on"]
+    assert manager.suppressed_writes == 1
+
+
+def test_climate_attribute_change_is_written(writes):
+    """空调设定温度变化写入，重复的模式和温度帧不写入。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    climate = SavantClimate("空调", 5, 1, "192.168.1.10", 8080, manager)
+    climate.hass = SimpleNamespace(config=SimpleNamespace(units=METRIC_SYSTEM))
+
+    climate.update_state(Frame(5, 1, 0x01, 0x00, 0x00, 0x00, "climate", hvac_type=HvacType.MODE))
+    climate.update_state(Frame(5, 1, 0x01, 0x00, 0x00, 0x00, "climate", hvac_type=HvacType.MODE))
+    climate.update_state(Frame(5, 1, 26, 0x00, 0x00, 0x00, "climate", hvac_type=HvacType.SET_POINT))
+    climate.update_state(Frame(5, 1, 26, 0x00, 0x00, 0x00, "climate", hvac_type=HvacType.SET_POINT))
+
+    assert writes == [HVACMode.COOL, HVACMode.COOL]
+    assert climate.target_temperature == 26
+    assert manager.suppressed_writes == 2
+
+
+@pytest.mark.parametrize("sub_device_type", ["DALI-02", "0603D", "single"])
+def test_non_rgb_light_frames_are_compared(writes, sub_device_type):
+    """非 RGB 灯光开着时重复的状态帧不写入，亮度变化写入，颜色模式可以取到。"""
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    light = SavantLight("灯", 5, 3, 0, "192.168.1.10", 8080, sub_device_type, manager)
+    data4 = 0x15 if sub_device_type == "DALI-02" else 0x10
+    # single 回路按 0603D 的状态帧上报
+    frame_sub_type = "0603D" if sub_device_type == "single" else sub_device_type
+
+    for data1 in (0x32, 0x32, 0x64):
+        light.update_state(Frame(5, 3, data1, 0x20, 0x00, data4, "light", frame_sub_type))
+
+    assert writes == ["on", "on"]
+    assert manager.suppressed_writes == 1
+    assert light.color_mode in light.supported_color_modes
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.savant_lighting import sensor, switch
+from custom_components.savant_lighting.const import DOMAIN
+from custom_components.savant_lighting.device_catalog import DeviceCatalog
+from custom_components.savant_lighting.tcp_manager import TCPConnectionManager
+from custom_components.savant_lighting.topology import async_add_device, async_setup_platform
+
+
+class _Store:
+    async def async_load(self):
+        pass
+
+
+def _device(device_type, module, loop, **extra):
+    return {"type": device_type, "sub_device_type": None, "name": f"{device_type}{loop}",
+            "module_address": module, "loop_address": loop, "host": "192.168.1.10", "port": 8080, **extra}
+
+
+@pytest.mark.asyncio
+async def test_add_device_only_creates_its_entities():
+    """选项流程增加设备时只在相关平台创建该设备的实体，不重建已有实体。"""
+    existing = _device("switch", 5, 1)
+    entry = SimpleNamespace(entry_id="e1", data={"devices": [existing]})
+    manager = TCPConnectionManager("192.168.1.10", 8080)
+    hass = SimpleNamespace(data={DOMAIN: {"e1": {
+        "tcp_manager": manager, "state_store": _Store(), "catalog": DeviceCatalog([existing]),
+        "platforms": {}, "entities": {},
+    }}})
+    hass.config_entries = SimpleNamespace(async_update_entry=lambda entry, data: setattr(entry, "data", data))
+    added = {"switch": [], "sensor": []}
+    for name, module in (("switch", switch), ("sensor", sensor)):
+        await async_setup_platform(hass, entry, name, module.create_entities,
+                                   lambda entities, update_before_add, name=name: added[name].append(entities))
+    assert [len(batch) for batch in added["switch"]] == [1]
+    assert added["sensor"] == [[]]
+
+    new = _device("switch_with_energy", 6, 2)
+    await async_add_device(hass, entry, new)
+
+    assert [len(batch) for batch in added["switch"]] == [1, 1]
+    assert [len(batch) for batch in added["sensor"]] == [0, 4]
+    config = hass.data[DOMAIN]["e1"]
+    assert entry.data["devices"] == [existing, new]
+    assert config["catalog"].by_unique_id("6_2_switch_with_energy_power_sensor") is new
+    assert len(config["entities"]["6_2_switch_with_energy"]) == 5